@@ -0,0 +1,6 @@
+"""Benchmarks of the GP and acquisition hot paths, run with `asv
+<https://asv.readthedocs.io>`_ (see ``asv.conf.json`` at the root of the
+repository). Every benchmark builds its data from a fixed seed, so that
+results are comparable between commits. The standalone scripts in this
+directory (e.g. ``logging_overhead.py``) are meant to be run directly.
+"""
@@ -0,0 +1,185 @@
+"""Benchmarks of ``ask`` and of the initializer of the acquisition function
+optimization."""
+
+from scipy.spatial import cKDTree
+import torch
+
+from easybo.bo import ask, Asker, CUSTOM_AQ_MAPPING, _MaxVariance
+from easybo.botorch_local.optim.initializers import (
+    gen_batch_initial_conditions_nonlinear,
+    NonlinearConstraintSampler,
+)
+
+from .common import get_data, get_grid, get_model, quiet
+
+
+# Acquisition functions which require more arguments than a model
+_ACQUISITION_FUNCTION_KWARGS = {
+    "EI": dict(best_f=0.0),
+    "UCB": dict(beta=1.0),
+}
+
+# Analytic acquisition functions only support q = 1
+_BATCH_ACQUISITION_FUNCTIONS = ["qMaxVar", "qMaxVariance"]
+
+
+class Ask:
+    """Optimizing every acquisition function of ``CUSTOM_AQ_MAPPING``."""
+
+    params = (
+        list(CUSTOM_AQ_MAPPING),
+        [100, 1000],
+        [5, 20],
+        [20, 200],
+    )
+    param_names = [
+        "acquisition_function",
+        "N",
+        "num_restarts",
+        "raw_samples",
+    ]
+    timeout = 300
+
+    def setup(self, acquisition_function, N, num_restarts, raw_samples):
+        quiet()
+        self.model = get_model(N, 2)
+        self.bounds = [[0.0, 1.0], [0.0, 1.0]]
+
+    def time_ask(self, acquisition_function, N, num_restarts, raw_samples):
+        ask(
+            model=self.model,
+            bounds=self.bounds,
+            acquisition_function=acquisition_function,
+            acquisition_function_kwargs=_ACQUISITION_FUNCTION_KWARGS.get(
+                acquisition_function, dict()
+            ),
+            optimize_acqf_kwargs=dict(
+                q=1, num_restarts=num_restarts, raw_samples=raw_samples
+            ),
+        )
+
+
+class AskChoices:
+    """Choosing among the points of a discrete grid, excluding the training
+    points through a prebuilt spatial index."""
+
+    params = (["MaxVariance", "qMaxVariance"], [10**4, 10**5])
+    param_names = ["acquisition_function", "n"]
+    timeout = 300
+
+    def setup(self, acquisition_function, n):
+        quiet()
+        self.model = get_model(100, 2)
+        self.choices = cKDTree(get_grid(n, 2))
+
+    def time_ask(self, acquisition_function, n):
+        ask(
+            model=self.model,
+            acquisition_function=acquisition_function,
+            choices=self.choices,
+            exclude=self.model.train_x,
+        )
+
+
+class AskBatch:
+    """Jointly optimizing ``q`` points with Monte Carlo acquisition
+    functions."""
+
+    params = (_BATCH_ACQUISITION_FUNCTIONS, [1, 4, 8], [1, 3])
+    param_names = ["acquisition_function", "q", "d"]
+    timeout = 300
+
+    def setup(self, acquisition_function, q, d):
+        quiet()
+        self.model = get_model(500, d)
+        self.bounds = [[0.0, 1.0]] * d
+
+    def time_ask(self, acquisition_function, q, d):
+        ask(
+            model=self.model,
+            bounds=self.bounds,
+            acquisition_function=acquisition_function,
+            optimize_acqf_kwargs=dict(q=q, num_restarts=5, raw_samples=20),
+        )
+
+
+class AskSequence:
+    """Consecutive steps of a campaign, with the stateless ``ask`` or with a
+    warm-started ``Asker``."""
+
+    params = ([False, True], [20, 200])
+    param_names = ["warm_start", "raw_samples"]
+    number = 1
+    timeout = 300
+
+    def setup(self, warm_start, raw_samples):
+        quiet()
+        self.model = get_model(100, 3)
+        self.kwargs = dict(
+            bounds=[[0.0, 1.0]] * 3,
+            acquisition_function="UCB",
+            acquisition_function_kwargs=dict(beta=4.0),
+            optimize_acqf_kwargs=dict(
+                q=1, num_restarts=10, raw_samples=raw_samples
+            ),
+        )
+        self.new_x, self.new_y = get_data(10, 3, seed=789)
+
+    def time_ask_sequence(self, warm_start, raw_samples):
+        model = self.model
+        asker = Asker(**self.kwargs)
+        for new_x, new_y in zip(self.new_x, self.new_y):
+            if warm_start:
+                asker(model=model)
+            else:
+                ask(model=model, **self.kwargs)
+            model = model.tell(
+                new_x=new_x.reshape(1, -1),
+                new_y=new_y.reshape(1, -1),
+                retrain=False,
+            )
+
+
+class InitialConditionsNonlinear:
+    """Drawing initial conditions which satisfy a nonlinear constraint."""
+
+    params = ([2, 4], [100, 1000], [5, 20])
+    param_names = ["d", "raw_samples", "num_restarts"]
+
+    def setup(self, d, raw_samples, num_restarts):
+        quiet()
+        model = get_model(100, d)
+        self.acquisition_function = _MaxVariance(
+            model._get_prediction_model()
+        )
+        self.bounds = torch.stack([torch.zeros(d), torch.ones(d)])
+
+    def time_gen_batch_initial_conditions(self, d, raw_samples, num_restarts):
+        gen_batch_initial_conditions_nonlinear(
+            self.acquisition_function,
+            self.bounds,
+            q=1,
+            num_restarts=num_restarts,
+            raw_samples=raw_samples,
+            options=dict(seed=0),
+            nonlinear_constraint=lambda X: (X**2).sum(dim=-1) <= 1.0,
+        )
+
+
+class NonlinearConstraintSampling:
+    """Drawing raw samples inside a ball of decreasing radius, by rejection
+    and by hit-and-run, with a sampler reused across calls."""
+
+    params = ([2, 4], [0.3, 0.1], [False, True])
+    param_names = ["d", "radius", "hit_and_run"]
+
+    def setup(self, d, radius, hit_and_run):
+        self.sampler = NonlinearConstraintSampler(
+            torch.stack([torch.zeros(d), torch.ones(d)]).double(),
+            lambda X: ((X - 0.5) ** 2).sum(dim=-1) <= radius**2,
+            seed=0,
+            hit_and_run=hit_and_run,
+        )
+
+    def time_draw(self, d, radius, hit_and_run):
+        self.sampler.draw(100)
@@ -0,0 +1,182 @@
+"""Benchmarks of the model methods of ``EasySingleTaskGPRegressor``."""
+
+import os
+
+from easybo.gp import EasyGP
+
+from .common import get_data, get_grid, get_model, quiet
+
+
+class Train:
+    """Fitting the hyperparameters from scratch."""
+
+    params = ([100, 500, 2000], [1, 3])
+    param_names = ["N", "d"]
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, N, d):
+        quiet()
+        self.model = get_model(N, d)
+
+    def time_train(self, N, d):
+        self.model.train_()
+
+    def peakmem_train(self, N, d):
+        self.model.train_()
+
+
+class Predict:
+    """Inference on a grid, bypassing the prediction cache."""
+
+    params = ([100, 1000, 3000], [1, 3], [1000, 20000])
+    param_names = ["N", "d", "grid_size"]
+
+    def setup(self, N, d, grid_size):
+        quiet()
+        self.model = get_model(N, d)
+        self.grid = get_grid(grid_size, d)
+
+        # Factorizes the training covariance once, as any repeated use would
+        self.model.predict(grid=self.grid[:1], use_cache=False)
+
+    def time_predict(self, N, d, grid_size):
+        self.model.predict(grid=self.grid, use_cache=False)
+
+    def peakmem_predict(self, N, d, grid_size):
+        self.model.predict(grid=self.grid, use_cache=False)
+
+
+class PredictChunked:
+    """Inference on grids which are too large to be predicted on at once."""
+
+    params = ([500, 1000], [100000, 1000000])
+    param_names = ["N", "grid_size"]
+    number = 1
+    repeat = 2
+    timeout = 300
+
+    def setup(self, N, grid_size):
+        quiet()
+        self.model = get_model(N, 2)
+        self.grid = get_grid(grid_size, 2)
+        self.model.predict(grid=self.grid[:1], use_cache=False)
+
+    def time_predict(self, N, grid_size):
+        self.model.predict(grid=self.grid, use_cache=False, chunk_size=4096)
+
+    def peakmem_predict(self, N, grid_size):
+        self.model.predict(grid=self.grid, use_cache=False, chunk_size=4096)
+
+
+class Sample:
+    """Drawing joint samples of the posterior on a grid."""
+
+    params = (
+        [100, 1000],
+        [100, 1000, 10000],
+        [1, 10],
+        ["exact", "lanczos", "pathwise", "rff"],
+    )
+    param_names = ["N", "grid_size", "samples", "method"]
+
+    def setup(self, N, grid_size, samples, method):
+        if method == "exact" and grid_size > 1000:
+            raise NotImplementedError
+        quiet()
+        self.model = get_model(N, 2)
+        self.grid = get_grid(grid_size, 2)
+
+    def time_sample(self, N, grid_size, samples, method):
+        self.model.sample(
+            grid=self.grid, samples=samples, seed=0, method=method
+        )
+
+    def peakmem_sample(self, N, grid_size, samples, method):
+        self.model.sample(
+            grid=self.grid, samples=samples, seed=0, method=method
+        )
+
+
+class Tell:
+    """Conditioning on new data without retraining."""
+
+    params = ([100, 1000, 3000], [1, 10], [True, False])
+    param_names = ["N", "k", "incremental"]
+
+    def setup(self, N, k, incremental):
+        quiet()
+        self.model = get_model(N, 2)
+        self.model.predict(grid=get_grid(1, 2), use_cache=False)
+        self.new_x, self.new_y = get_data(k, 2, seed=789)
+
+    def time_tell(self, N, k, incremental):
+        self.model.tell(
+            new_x=self.new_x,
+            new_y=self.new_y,
+            retrain=False,
+            incremental=incremental,
+        )
+
+
+class Dream:
+    """Sampling a model on a grid and training a new model on the sample."""
+
+    params = ([1, 2], [5, 10])
+    param_names = ["d", "points_per_dimension"]
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, d, points_per_dimension):
+        quiet()
+        self.model = get_model(100, d)
+
+    def time_dream(self, d, points_per_dimension):
+        self.model.dream(points_per_dimension=points_per_dimension)
+
+
+class DreamPathwise:
+    """Dreams of larger grids from pathwise samples, with and without
+    retraining, compared with joint samples on the grid."""
+
+    params = (["grid", "pathwise"], [2, 4], [False, True])
+    param_names = ["method", "d", "retrain"]
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, method, d, retrain):
+        quiet()
+        self.model = get_model(100, d, train=True)
+
+    def time_dream(self, method, d, retrain):
+        # 900 and 1296 points
+        self.model.dream(
+            points_per_dimension=30 if d == 2 else 6,
+            method=method,
+            retrain=retrain,
+        )
+
+
+class Checkpoint:
+    """Restoring a fitted model from a checkpoint, then predicting, compared
+    with fitting it again."""
+
+    params = ([100, 1000, 3000], [False, True])
+    param_names = ["N", "include_factor"]
+
+    def setup(self, N, include_factor):
+        quiet()
+        self.model = get_model(N, 2, train=True)
+        self.grid = get_grid(100, 2)
+        self.path = f"checkpoint_{N}_{include_factor}.pt"
+        self.model.save(self.path, include_factor=include_factor)
+
+    def teardown(self, N, include_factor):
+        os.remove(self.path)
+
+    def time_load_predict(self, N, include_factor):
+        model = EasyGP.load(self.path)
+        model.predict(grid=self.grid, use_cache=False)
@@ -0,0 +1,38 @@
+"""Data and models shared by the benchmarks."""
+
+import numpy as np
+
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.logger import set_logger_style
+
+
+def quiet():
+    """Only logs errors, so that benchmarks do not time the console."""
+
+    set_logger_style(info=False, success=False, warning=False)
+
+
+def get_data(N, d, seed=123):
+    """A smooth test function of ``d`` inputs, observed with noise at ``N``
+    uniformly random points."""
+
+    rng = np.random.default_rng(seed)
+    x = rng.random((N, d))
+    y = np.sin(2.0 * np.pi * x).sum(axis=1, keepdims=True)
+    y = y + 0.1 * rng.standard_normal((N, 1))
+    return x, y
+
+
+def get_grid(n, d, seed=456):
+    return np.random.default_rng(seed).random((n, d))
+
+
+def get_model(N, d, train=False):
+    """An exact GP on :func:`get_data`. Untrained models keep their initial
+    hyperparameters, which is enough to time inference."""
+
+    x, y = get_data(N, d)
+    model = EasySingleTaskGPRegressor(train_x=x, train_y=y)
+    if train:
+        model.train_()
+    return model
@@ -0,0 +1,114 @@
+"""Micro-benchmarks of the logging overhead on the hot paths of ``ask``,
+``tell`` and ``predict``.
+
+Run from the root of the repository with
+
+.. code-block::
+
+    python benchmarks/logging_overhead.py
+
+Each message is timed three ways with the default logger style, in which
+DEBUG is disabled: "before", formatted eagerly with an f-string (the way
+these messages used to be logged), "after", logged lazily through
+``logger.opt(lazy=True)``, and with logging skipped altogether. Lazy
+logging should cost about a microsecond per call, however expensive the
+message is to format.
+
+The per-call cost of the ``_log_warnings`` decorator, which routes warnings
+to the logger, is compared against entering ``warnings.catch_warnings`` on
+every call (the way the decorator used to work).
+"""
+
+from functools import wraps
+from timeit import repeat
+from warnings import catch_warnings
+
+import numpy as np
+
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.logger import _log_warnings, logger, set_logger_style
+from easybo.utils import get_dummy_1d_sinusoidal_data
+
+
+def _best_time(f, number):
+    """The best time per call of ``f``, in microseconds."""
+
+    return min(repeat(f, number=number, repeat=5)) / number * 1e6
+
+
+def _report(name, before, after, number):
+    t_before = _best_time(before, number)
+    t_after = _best_time(after, number)
+    t_none = _best_time(lambda: None, number)
+    print(
+        f"{name:<32} before {t_before:>9.2f} us | after {t_after:>7.2f} us "
+        f"| no logging {t_none:>5.2f} us"
+    )
+
+
+def _catch_warnings_per_call(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        with catch_warnings(record=True) as w:
+            output = f(*args, **kwargs)
+        for warning in w:
+            logger.warning(str(warning.message))
+        return output
+
+    return wrapper
+
+
+def main():
+    set_logger_style()
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    x = model._get_current_train_x(untransform=True)
+
+    # Arguments of ask, which include tensors and the model itself
+    arguments = dict(
+        model=model, bounds=[[0.0, 1.0]], X_pending=np.random.random((5, 1))
+    )
+    _report(
+        "ask arguments",
+        lambda: logger.debug(f"ask queried with args: {arguments}"),
+        lambda: logger.opt(lazy=True).debug(
+            "ask queried with args: {}", lambda: arguments
+        ),
+        number=200,
+    )
+
+    # Reductions over the training data in tell and _condition
+    _report(
+        "training data min/max",
+        lambda: logger.debug(
+            f"old_x min max: {x.min(axis=0)} {x.max(axis=0)}"
+        ),
+        lambda: logger.opt(lazy=True).debug(
+            "old_x min max: {} {}",
+            lambda: x.min(axis=0),
+            lambda: x.max(axis=0),
+        ),
+        number=1000,
+    )
+
+    # The parameter dump done twice per train_
+    _report(
+        "training parameter information",
+        lambda: logger.debug(model._format_training_debug_information()),
+        model._log_training_debug_information,
+        number=200,
+    )
+
+    # The warning handling wrapped around every public method
+    _report(
+        "warning routing",
+        _catch_warnings_per_call(lambda: None),
+        _log_warnings(lambda: None),
+        number=10000,
+    )
+
+
+if __name__ == "__main__":
+    main()
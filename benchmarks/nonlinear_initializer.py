@@ -0,0 +1,126 @@
+"""Benchmark of the initial conditions generator for nonlinear constraints.
+
+Run from the root of the repository with
+
+.. code-block::
+
+    python benchmarks/nonlinear_initializer.py
+
+Feasible raw samples are drawn three ways for feasible regions of
+decreasing size: "before", with the loop which used to fill
+``gen_batch_initial_conditions_nonlinear`` (one call to
+``get_polytope_samples`` per iteration, with its burn-in, followed by a
+``torch.cat``), "rejection", with a ``NonlinearConstraintSampler`` reused
+across calls, and "hit-and-run", with the same sampler moving inside the
+nonlinear region. Each method draws ``raw_samples`` feasible points per
+call, and the mean time per call is reported ("before" is only called
+once, and skipped for regions which it cannot fill in a reasonable time).
+"""
+
+from time import perf_counter
+
+import torch
+from botorch.utils.sampling import get_polytope_samples
+
+from easybo.botorch_local.optim.initializers import (
+    NonlinearConstraintSampler,
+)
+
+
+def _before(bounds, nonlinear_constraint, n, seed, inequality_constraints):
+    """The sampling loop of ``gen_batch_initial_conditions_nonlinear``
+    before the ``NonlinearConstraintSampler``, drawing ``n`` points."""
+
+    all_points = torch.tensor([])
+    while all_points.shape[0] <= n:
+        X_rnd = get_polytope_samples(
+            n=n,
+            bounds=bounds,
+            inequality_constraints=inequality_constraints,
+            seed=seed,
+            n_burnin=10000,
+            thinning=32,
+        )
+        where = torch.where(nonlinear_constraint(X_rnd))[0]
+        all_points = torch.cat([all_points, X_rnd[where, :]], axis=0)
+        seed += 1
+    return all_points[:n]
+
+
+def _time_per_call(f, calls):
+    t0 = perf_counter()
+    for seed in range(calls):
+        f(seed)
+    return (perf_counter() - t0) / calls
+
+
+def main(raw_samples=100, calls=5):
+    for d, radius, linear in [
+        (2, 0.3, False),
+        (2, 0.1, False),
+        (4, 0.15, False),
+        (2, 0.1, True),
+        (6, 0.1, False),
+    ]:
+        bounds = torch.stack(
+            [
+                torch.zeros(d, dtype=torch.double),
+                torch.ones(d, dtype=torch.double),
+            ]
+        )
+
+        def nonlinear_constraint(X):
+            return ((X - 0.5) ** 2).sum(dim=-1) <= radius**2
+
+        inequality_constraints = None
+        if linear:
+            inequality_constraints = [
+                (
+                    torch.tensor([0, 1]),
+                    torch.tensor([1.0, 1.0], dtype=torch.double),
+                    1.0,
+                )
+            ]
+
+        # The fraction of the box which is feasible
+        fraction = nonlinear_constraint(torch.rand(10**6, d)).double().mean()
+        name = f"d={d} radius={radius}{' linear' if linear else ''}"
+
+        if fraction > 1e-2:
+            before = _time_per_call(
+                lambda seed: _before(
+                    bounds,
+                    nonlinear_constraint,
+                    raw_samples,
+                    seed,
+                    inequality_constraints,
+                ),
+                1,
+            )
+            before = f"{before * 1e3:>9.1f} ms"
+        else:
+            before = "  skipped"
+
+        times = []
+        for hit_and_run in [False, True]:
+            sampler = NonlinearConstraintSampler(
+                bounds,
+                nonlinear_constraint,
+                inequality_constraints=inequality_constraints,
+                seed=0,
+                hit_and_run=hit_and_run,
+            )
+            try:
+                t = _time_per_call(lambda _: sampler.draw(raw_samples), calls)
+                times.append(f"{t * 1e3:>7.1f} ms")
+            except Exception:
+                times.append(" failed   ")
+
+        print(
+            f"{name:<24} feasible {float(fraction):<8.2g} before {before} | "
+            f"rejection {times[0]} | hit-and-run {times[1]}"
+        )
+
+
+if __name__ == "__main__":
+    main()
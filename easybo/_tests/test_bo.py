@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+import torch
+
+from easybo import metrics
+from easybo.bo import ask, Asker
+from easybo.gp import EasySingleTaskGPRegressor
+
+
+def test_asker_warm_start():
+    """Makes sure the Asker warm-starts consecutive calls, and starts from
+    scratch when the problem changes."""
+
+    rng = np.random.default_rng(123)
+    x = rng.random((10, 2))
+    y = np.sin(2.0 * np.pi * x).sum(axis=1, keepdims=True)
+    model = EasySingleTaskGPRegressor(train_x=x, train_y=y)
+    model.train_()
+
+    asker = Asker(
+        bounds=[[0, 1], [0, 1]],
+        acquisition_function="UCB",
+        acquisition_function_kwargs=dict(beta=1.0),
+        optimize_acqf_kwargs=dict(q=1, num_restarts=4, raw_samples=32),
+    )
+    assert not asker.warm_start
+    for _ in range(3):
+        candidate = asker(model=model)
+        assert asker.warm_start
+        assert candidate.shape == (1, 2)
+        assert ((candidate >= 0) & (candidate <= 1)).all()
+        new_x = candidate.numpy()
+        new_y = np.sin(2.0 * np.pi * new_x).sum(axis=1, keepdims=True)
+        model = model.tell(new_x=new_x, new_y=new_y, retrain=False)
+
+    # Fixing a feature changes the problem, so the state is not reused
+    candidate = asker(model=model, fixed_features={0: 0.5})
+    assert candidate[0, 0] == 0.5
+
+    asker.reset()
+    assert not asker.warm_start
+
+
+def test_asker_reproducible():
+    """Makes sure seeded Askers are reproducible without touching the
+    global random state, that changing num_restarts restarts from scratch,
+    and that missing optimization options are reported up front."""
+
+    rng = np.random.default_rng(123)
+    x = rng.random((10, 2))
+    y = np.sin(2.0 * np.pi * x).sum(axis=1, keepdims=True)
+    model = EasySingleTaskGPRegressor(train_x=x, train_y=y)
+    model.train_()
+
+    kwargs = dict(
+        bounds=[[0, 1], [0, 1]],
+        acquisition_function="UCB",
+        acquisition_function_kwargs=dict(beta=1.0),
+        optimize_acqf_kwargs=dict(q=1, num_restarts=4, raw_samples=32),
+        seed=123,
+    )
+    candidates = []
+    for _ in range(2):
+        asker = Asker(**kwargs)
+        asker(model=model)
+        state = torch.get_rng_state()
+        candidates.append(asker(model=model))
+        assert torch.equal(state, torch.get_rng_state())
+    torch.testing.assert_close(candidates[0], candidates[1])
+
+    # Changing num_restarts draws the full raw samples again
+    asker._optimize_acqf_kwargs["num_restarts"] = 2
+    metrics.clear()
+    metrics.enable()
+    try:
+        asker(model=model)
+    finally:
+        metrics.disable()
+    assert metrics.records()[-1]["raw_samples_scored"] == 32
+
+    with pytest.raises(ValueError):
+        Asker(optimize_acqf_kwargs=dict(q=1, num_restarts=5))
+
+
+def test_ask_choices():
+    """Makes sure discrete asks only return allowed points of the grid."""
+
+    rng = np.random.default_rng(123)
+    x = rng.random((10, 2))
+    y = np.sin(2.0 * np.pi * x).sum(axis=1, keepdims=True)
+    model = EasySingleTaskGPRegressor(train_x=x, train_y=y)
+    model.train_()
+
+    grid = np.stack(
+        np.meshgrid(np.linspace(0, 1, 50), np.linspace(0, 1, 50)), axis=-1
+    ).reshape(-1, 2)
+    grid = np.concatenate([grid, x])
+
+    # The analytic maximum of the grid, measured points excluded
+    std = model.predict(grid=grid)["std"].squeeze().copy()
+    std[-len(x) :] = -np.inf
+    expected = grid[np.argmax(std)]
+
+    for choices in [grid, cKDTree(grid)]:
+        candidate = ask(
+            model=model, choices=choices, exclude=x, choices_chunk_size=100
+        ).numpy()
+        np.testing.assert_allclose(candidate[0], expected)
+
+    candidates = ask(
+        model=model,
+        acquisition_function="qMaxVariance",
+        optimize_acqf_kwargs=dict(q=3),
+        choices=grid,
+        exclude=x,
+        fixed_features={0: 0.0},
+    ).numpy()
+    assert len(np.unique(candidates, axis=0)) == 3
+    assert (candidates[:, 0] == 0.0).all()
+    assert np.isin(candidates[:, 1], grid[:, 1]).all()
@@ -0,0 +1,133 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from easybo.bo import XPendingError
+from easybo.campaign import Campaign
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.utils import get_dummy_1d_sinusoidal_data
+
+
+def _get_model():
+    _, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    return model
+
+
+def test_campaign_out_of_order():
+    """Makes sure measurements which complete out of order are all added to
+    the model, and that points in flight are never handed out twice."""
+
+    model = _get_model()
+    campaign = Campaign(
+        model,
+        ask_kwargs=dict(acquisition_function="qMaxVariance"),
+        tell_kwargs=dict(retrain=False),
+    )
+    delays = iter([0.05, 0.0, 0.02, 0.0, 0.01, 0.0])
+    in_flight = []
+
+    async def measure(x):
+        in_flight.append(len(campaign.in_flight))
+        await asyncio.sleep(next(delays))
+        return np.sin(2.0 * np.pi * x)
+
+    try:
+        new_model = asyncio.run(campaign.run(measure, n=6, max_in_flight=3))
+    finally:
+        campaign.close()
+
+    assert new_model.train_x.shape == (len(model.train_x) + 6, 1)
+    assert max(in_flight) == 3
+    assert campaign.pending is None
+    new_x = new_model.train_x[len(model.train_x):]
+    assert len(np.unique(new_x.round(6))) == 6
+
+
+def test_campaign_analytic_acquisition_function():
+    """Makes sure analytic acquisition functions refuse pending points."""
+
+    campaign = Campaign(_get_model(), tell_kwargs=dict(retrain=False))
+
+    async def main():
+        tickets, _ = await campaign.ask()
+        with pytest.raises(XPendingError):
+            await campaign.ask()
+        await campaign.tell(tickets[0], 0.0)
+        await campaign.ask()
+
+    try:
+        asyncio.run(main())
+    finally:
+        campaign.close()
+
+
+def test_campaign_batch_limits():
+    """Makes sure that run never exceeds n or max_in_flight when each call
+    to ask returns several points."""
+
+    model = _get_model()
+    campaign = Campaign(
+        model,
+        ask_kwargs=dict(
+            acquisition_function="qMaxVariance",
+            optimize_acqf_kwargs=dict(q=2, num_restarts=2, raw_samples=8),
+        ),
+        tell_kwargs=dict(retrain=False),
+    )
+    in_flight = []
+
+    async def measure(x):
+        in_flight.append(len(campaign.in_flight))
+        await asyncio.sleep(0.0)
+        return np.sin(2.0 * np.pi * x)
+
+    try:
+        new_model = asyncio.run(campaign.run(measure, n=5, max_in_flight=3))
+    finally:
+        campaign.close()
+
+    assert len(in_flight) == 5
+    assert max(in_flight) <= 3
+    assert new_model.train_x.shape == (len(model.train_x) + 5, 1)
+
+
+def test_campaign_failed_update():
+    """Makes sure the results of a failed update are added by the next
+    join, rather than silently dropped."""
+
+    model = _get_model()
+    campaign = Campaign(
+        model,
+        ask_kwargs=dict(acquisition_function="qMaxVariance"),
+        tell_kwargs=dict(retrain=False),
+    )
+    private_model = campaign._private_model
+    calls = []
+
+    def tell(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise RuntimeError("update failed")
+        return type(private_model).tell(private_model, **kwargs)
+
+    private_model.tell = tell
+
+    async def main():
+        tickets, x = await campaign.ask()
+        await campaign.tell(tickets[0], 0.0)
+        with pytest.raises(RuntimeError):
+            await campaign.join()
+        assert campaign.pending is not None
+        return await campaign.join()
+
+    try:
+        new_model = asyncio.run(main())
+    finally:
+        campaign.close()
+
+    assert len(calls) == 2
+    assert new_model.train_x.shape == (len(model.train_x) + 1, 1)
+    assert campaign.pending is None
@@ -0,0 +1,41 @@
+import numpy as np
+import torch
+
+from easybo.experimental.bo import (
+    ProximityWeightedUpperConfidenceBound,
+    WeightedMaxVar,
+)
+from easybo.gp import EasySingleTaskGPRegressor
+
+
+def test_regularizers():
+    """Makes sure the regularizers are unchanged by blocking and by the
+    KD-tree cutoff, and support any batch shape."""
+
+    rng = np.random.default_rng(123)
+    x = rng.random((20, 2))
+    y = np.sin(2.0 * np.pi * x).sum(axis=1, keepdims=True)
+    model = EasySingleTaskGPRegressor(train_x=x, train_y=y)
+
+    X = torch.tensor(rng.random((50, 1, 2)))
+    current = torch.tensor(x)
+    dists = torch.cdist(X.squeeze(1), current)
+    gauss = torch.exp(-((dists - 0.2) ** 2) / 2.0 / 0.05**2)
+
+    aq = WeightedMaxVar(model.model, beta=1.0, current_data=x)
+    aq_cutoff = WeightedMaxVar(model.model, beta=1.0, current_data=x, cutoff=6)
+    expected = (1.0 - 10.0 * gauss).mean(dim=1)
+    with torch.no_grad():
+        ucb = super(WeightedMaxVar, aq).forward(X)
+        torch.testing.assert_close(aq(X), ucb - expected)
+        torch.testing.assert_close(aq_cutoff(X), ucb - expected)
+
+    weights = ProximityWeightedUpperConfidenceBound.closeness_weighting(
+        torch.tensor(rng.random((4, 3, 2))), current, mu=0.2, sd=0.05
+    )
+    assert weights.shape == (4, 3)
+
+    aq = ProximityWeightedUpperConfidenceBound(model.model)
+    with torch.no_grad():
+        variance = model.model.posterior(X).variance.squeeze()
+        torch.testing.assert_close(aq(X), variance)
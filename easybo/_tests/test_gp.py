@@ -1,6 +1,16 @@
+from botorch.exceptions.errors import ModelFittingError
 import numpy as np
+import pytest
+import torch
 
-from easybo.gp import EasySingleTaskGPRegressor
+from easybo.bo import ask
+from easybo.gp import (
+    EasyGPBatch,
+    EasySingleTaskGPRegressor,
+    EasySparseGPRegressor,
+    RefitPolicy,
+)
+from easybo.logger import logger
 from easybo.utils import get_dummy_1d_sinusoidal_data
 
 
@@ -64,3 +74,466 @@ def test_gp_scaling():
     new_model.model.eval()
     assert np.allclose(train_x, new_model.train_x)
     assert np.allclose(train_y, new_model.train_y)
+
+
+def test_gp_incremental_tell():
+    """Makes sure that appending data to the cached posterior factorization
+    gives the same posterior as refactorizing from scratch."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+
+    new_x = np.array([1.25, 1.5, 2.25]).reshape(-1, 1)
+    new_y = np.array([0.5, 1.0, -0.5]).reshape(-1, 1)
+    new_model = model.tell(new_x=new_x, new_y=new_y, retrain=False)
+    new_model = new_model.tell(new_x=new_x + 0.1, new_y=new_y, retrain=False)
+
+    train_x = np.concatenate([train_x, new_x, new_x + 0.1], axis=0)
+    train_y = np.concatenate([train_y, new_y, new_y], axis=0)
+    assert np.allclose(train_x, new_model.train_x)
+    assert np.allclose(train_y, new_model.train_y)
+
+    incremental = new_model.predict(grid=grid)
+
+    # Force gpytorch to refactorize the training covariance
+    new_model.model.prediction_strategy = None
+    new_model._training_factor = None
+    new_model.prediction_cache.clear()
+    exact = new_model.predict(grid=grid)
+
+    assert np.allclose(incremental["mean"], exact["mean"])
+    assert np.allclose(incremental["std"], exact["std"])
+
+    new_model.model.train()
+    assert np.allclose(train_x, new_model.train_x)
+    assert np.allclose(train_y, new_model.train_y)
+
+
+def test_gp_incremental_tell_refits_transforms():
+    """Makes sure that training after incremental tells refits the transforms
+    on the full training data."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+
+    new_x = np.array([5.0, 6.0]).reshape(-1, 1)
+    new_y = np.array([10.0, 12.0]).reshape(-1, 1)
+    new_model = model.tell(new_x=new_x, new_y=new_y, retrain=False)
+    train_y = np.concatenate([train_y, new_y], axis=0)
+    means = new_model.model.outcome_transform.means.item()
+    assert not np.isclose(means, train_y.mean())
+
+    new_model.train_()
+    means = new_model.model.outcome_transform.means.item()
+    assert np.isclose(means, train_y.mean())
+    assert np.allclose(train_y, new_model.train_y)
+
+
+def test_gp_refit_policy(monkeypatch):
+    """Makes sure that tell only refits the hyperparameters when the policy
+    asks for it, and that a fit failing the health check is retried."""
+
+    _, train_x, train_y = get_dummy_1d_sinusoidal_data()
+
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    model.refit_policy = RefitPolicy(every=2, maxiter=10, rtol=1e-4)
+    state = {k: v.clone() for k, v in model.model.state_dict().items()}
+
+    new_model = model.tell(new_x=np.array([[0.33]]), new_y=np.array([[0.8]]))
+    assert new_model._observations_since_refit == 1
+    for key, value in new_model.model.state_dict().items():
+        if "transform" not in key:
+            assert torch.equal(value, state[key])
+
+    new_model = new_model.tell(
+        new_x=np.array([[0.66]]), new_y=np.array([[-0.8]])
+    )
+    assert new_model._observations_since_refit == 0
+    assert new_model.refit_policy is model.refit_policy
+    assert new_model.training_state_successful
+    assert new_model.train_x.shape == (17, 1)
+
+    unhealthy = new_model.tell(
+        new_x=np.array([[0.5]]), new_y=np.array([[0.0]]), retrain=False
+    )
+    monkeypatch.setattr(
+        unhealthy, "_get_health_nlpd", lambda: (1e3, 100.0)
+    )
+    unhealthy.train_()
+    assert not unhealthy.training_state_successful
+    assert unhealthy._observations_since_refit == 1
+
+
+def test_gp_batch_views():
+    """Makes sure that the individual models of a batch reproduce the
+    predictions of the batched model."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    train_xs = [train_x, train_x * 2.0, train_x + 1.0]
+    train_ys = [train_y, train_y * 10.0, -train_y]
+
+    batch = EasyGPBatch(train_x=train_xs, train_y=train_ys)
+    batch.train_()
+    assert len(batch) == 3
+
+    preds = batch.predict(grid=grid)
+    nlpd = batch.nlpd()
+    assert preds["mean"].shape == (3, len(grid))
+    assert nlpd.shape == (3,)
+
+    for ii in range(len(batch)):
+        model = batch[ii]
+        assert np.allclose(model.train_x, train_xs[ii])
+        assert np.allclose(model.train_y, train_ys[ii])
+        p = model.predict(grid=grid)
+        assert np.allclose(p["mean"], preds["mean"][ii])
+        assert np.allclose(p["std"], preds["std"][ii])
+        assert np.isclose(model.nlpd(), nlpd[ii])
+
+
+def test_gp_chunked_predict(tmp_path):
+    """Makes sure that chunked inference, including into a memory-mapped
+    output buffer, matches inference on the whole grid."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+
+    full = model.predict(grid=grid, return_posterior=True)
+    assert "posterior" in full
+
+    chunked = model.predict(grid=grid, chunk_size=17)
+    assert "posterior" not in chunked
+    assert np.allclose(full["mean"], chunked["mean"])
+    assert np.allclose(full["std"], chunked["std"])
+
+    out = {
+        key: np.lib.format.open_memmap(
+            tmp_path / f"{key}.npy", mode="w+", shape=(len(grid),)
+        )
+        for key in ["mean", "std"]
+    }
+    result = model.predict(grid=grid, chunk_size=50, out=out)
+    assert np.allclose(full["mean"], out["mean"])
+    assert np.allclose(full["std"], out["std"])
+    assert set(result) == {"mean", "std"}
+
+    # The bands are only computed when they have a buffer
+    out["mean+2std"] = np.empty(len(grid))
+    result = model.predict(grid=grid, chunk_size=50, out=out)
+    assert set(result) == {"mean", "std", "mean+2std"}
+    assert np.allclose(full["mean+2std"], out["mean+2std"])
+
+
+def test_gp_prediction_cache():
+    """Makes sure that predictions are memoized until the model changes."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    cache = model.prediction_cache
+
+    p1 = model.predict(grid=grid)
+    p2 = model.predict(grid=grid.clone())
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(p1["mean"], p2["mean"])
+
+    # Results are copies, which callers may modify
+    p2["mean"] += 1.0
+    p3 = model.predict(grid=grid)
+    np.testing.assert_array_equal(p1["mean"], p3["mean"])
+
+    model.predict(grid=grid, observation_noise=False)
+    model.predict(grid=grid, chunk_size=16)
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    model.train_()
+    assert len(cache) == 0
+    model.predict(grid=grid)
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    new_model = model.tell(
+        new_x=np.array([[0.5]]), new_y=np.array([[0.0]]), retrain=False
+    )
+    assert new_model.prediction_cache is not cache
+    p3 = new_model.predict(grid=grid)
+    assert new_model.prediction_cache.misses == 1
+    assert not np.allclose(p1["mean"], p3["mean"])
+
+
+def test_gp_precision():
+    """Checks float32 and mixed precision predictions against float64."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+
+    model = EasySingleTaskGPRegressor(
+        train_x=train_x, train_y=train_y, precision="float64"
+    )
+    model.train_()
+    expected = model.predict(grid=grid)
+
+    for precision in ["mixed", "float32"]:
+        other = model.with_precision(precision)
+        assert other.prediction_dtype == torch.float32
+        result = other.predict(grid=grid)
+        assert result["mean"].dtype == np.float32
+        scale = np.abs(expected["mean"]).max()
+        assert np.abs(result["mean"] - expected["mean"]).max() < 1e-4 * scale
+        np.testing.assert_allclose(result["std"], expected["std"], rtol=1e-4)
+
+    # Mixed precision models are trained in float64
+    mixed = EasySingleTaskGPRegressor(
+        train_x=train_x, train_y=train_y, precision="mixed"
+    )
+    mixed.train_()
+    assert mixed.model.train_targets.dtype == torch.float64
+    assert np.isclose(mixed.nlpd(), model.nlpd())
+    assert ask(model=mixed).dtype == torch.float32
+    assert ask(model=model, precision="mixed").dtype == torch.float32
+
+
+def test_sparse_gp_streaming_tell(monkeypatch):
+    """Makes sure the sparse GP fits, that streaming new data into it
+    matches conditioning on all of the data at once, and that failed
+    replays are handled like failed training."""
+
+    rng = np.random.default_rng(123)
+    x = rng.random((2000, 1))
+    y = np.sin(2.0 * np.pi * x) + 0.1 * rng.standard_normal(x.shape)
+    grid = np.linspace(0, 1, 50).reshape(-1, 1)
+
+    model = EasySparseGPRegressor(
+        train_x=x, train_y=y, num_inducing_points=32
+    )
+    model.train_(num_epochs=25, seed=123)
+    assert model.training_state_successful
+    mean = model.predict(grid=grid)["mean"]
+    assert np.abs(mean - np.sin(2.0 * np.pi * grid.ravel())).max() < 0.2
+
+    new_x = rng.random((20, 1))
+    new_y = np.sin(2.0 * np.pi * new_x)
+    new_model = model.tell(new_x=new_x, new_y=new_y, retrain=False)
+    assert new_model.train_x.shape == (2020, 1)
+    assert isinstance(new_model.model.model.train_inputs, tuple)
+    streamed = new_model.predict(grid=grid)
+
+    new_model._reset_training_factor()
+    new_model._set_optimal_variational_distribution()
+    expected = new_model.predict(grid=grid)
+    np.testing.assert_allclose(streamed["mean"], expected["mean"], atol=1e-8)
+    np.testing.assert_allclose(streamed["std"], expected["std"], atol=1e-8)
+
+    assert ask(model=new_model).shape == (1, 1)
+
+    # Training without taking any step keeps the model as is
+    new_model.train_(num_epochs=0)
+    retrained = new_model.predict(grid=grid)
+    np.testing.assert_allclose(retrained["mean"], expected["mean"], atol=1e-8)
+
+    def fail(*args, **kwargs):
+        raise ModelFittingError
+
+    monkeypatch.setattr(EasySparseGPRegressor, "_optimize", fail)
+    failed = new_model.tell(new_x=new_x, new_y=new_y, retrain=True)
+    assert not failed.training_state_successful
+    assert failed._observations_since_refit == 20
+    with pytest.raises(ModelFittingError):
+        new_model.tell(new_x=new_x, new_y=new_y, terminate_on_fail=True)
+
+
+def test_gp_structured_kernel_interpolation():
+    """Makes sure a KISS-GP model trains, predicts close to the truth and
+    is rebuilt rather than incrementally updated by tell."""
+
+    rng = np.random.default_rng(123)
+    x = rng.random((500, 1))
+    y = np.sin(2.0 * np.pi * x) + 0.1 * rng.standard_normal(x.shape)
+    grid = np.linspace(0.05, 0.95, 50).reshape(-1, 1)
+
+    model = EasySingleTaskGPRegressor(
+        train_x=x, train_y=y, ski=True, ski_grid_size=64
+    )
+    assert not model._supports_incremental_updates()
+    model.train_()
+    assert model.training_state_successful
+    mean = model.predict(grid=grid)["mean"]
+    assert np.abs(mean - np.sin(2.0 * np.pi * grid.ravel())).max() < 0.1
+
+    new_x = rng.random((10, 1))
+    new_model = model.tell(
+        new_x=new_x, new_y=np.sin(2.0 * np.pi * new_x), retrain=False
+    )
+    assert new_model.train_x.shape == (510, 1)
+    assert new_model.predict(grid=grid)["mean"].shape == (50,)
+
+
+def test_gp_pathwise_dream():
+    """Makes sure pathwise samples follow the posterior, are reproducible,
+    and make dreams without retraining."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+
+    samples = np.hstack(
+        [model.sample_path(seed=seed)(grid) for seed in range(200)]
+    )
+    prediction = model.predict(grid=grid, observation_noise=False)
+    error = np.abs(samples.mean(axis=1) - prediction["mean"])
+    assert (error < 5.0 * prediction["std"] / np.sqrt(200)).all()
+    np.testing.assert_allclose(
+        np.median(samples.std(axis=1) / prediction["std"]), 1.0, atol=0.2
+    )
+    np.testing.assert_array_equal(
+        model.sample_path(seed=1)(grid), model.sample_path(seed=1)(grid)
+    )
+
+    dream = model.dream(method="pathwise", num_points=30, retrain=False)
+    assert dream.train_x.shape == (30, 1)
+    assert dream.training_state_successful
+    torch.testing.assert_close(
+        dream.model.covar_module.base_kernel.lengthscale,
+        model.model.covar_module.base_kernel.lengthscale,
+    )
+    torch.testing.assert_close(
+        dream.model.outcome_transform.means,
+        model.model.outcome_transform.means,
+    )
+
+    messages = []
+    handler = logger.add(messages.append, level="WARNING")
+    try:
+        prediction = dream.predict(grid=dream.train_x)
+    finally:
+        logger.remove(handler)
+    assert messages == []
+    path = model.sample_path(seed=123)
+    np.testing.assert_allclose(
+        prediction["mean"], path(dream.train_x).ravel(), atol=0.1
+    )
+
+
+def test_gp_sample_methods():
+    """Makes sure every sampling method follows the posterior, is
+    reproducible, and leaves the global random number generator alone."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    prediction = model.predict(grid=grid, observation_noise=False)
+
+    state = torch.get_rng_state()
+    for method in ["exact", "lanczos", "pathwise", "rff"]:
+        samples = model.sample(
+            grid=grid,
+            samples=500,
+            seed=0,
+            method=method,
+            observation_noise=False,
+        )
+        assert samples.shape == (500, len(grid))
+        error = np.abs(samples.mean(axis=0) - prediction["mean"])
+        assert (error < 0.1 + 5.0 * prediction["std"] / np.sqrt(500)).all()
+        np.testing.assert_allclose(
+            np.median(samples.std(axis=0) / prediction["std"]), 1.0, atol=0.1
+        )
+        np.testing.assert_array_equal(
+            model.sample(grid=grid, samples=2, seed=1, method=method),
+            model.sample(grid=grid, samples=2, seed=1, method=method),
+        )
+    assert torch.equal(state, torch.get_rng_state())
+
+
+def test_gp_diagnostics():
+    """Makes sure the closed-form leave-one-out predictions match refitting
+    the posterior without each point, at fixed hyperparameters."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    diagnostics = model.diagnostics()
+    assert np.isclose(diagnostics["total_nlpd"], diagnostics["nlpd"].sum())
+
+    gp = model.model
+    x, y = gp.train_inputs[0], gp.train_targets
+    for i in [0, len(y) // 2]:
+        keep = torch.arange(len(y)) != i
+        K = gp.likelihood(gp.forward(x[keep])).covariance_matrix
+        cross = gp.covar_module(x[i : i + 1], x[keep]).to_dense()
+        residuals = y[keep] - gp.mean_module(x[keep])
+        mean = gp.mean_module(x[i]) + cross @ torch.linalg.solve(K, residuals)
+        variance = gp.covar_module(x[i : i + 1]).to_dense() - cross @ (
+            torch.linalg.solve(K, cross.T)
+        )
+        mean, variance = gp.outcome_transform.untransform(
+            mean.reshape(1, 1), variance.reshape(1, 1) + gp.likelihood.noise
+        )
+        assert np.isclose(mean.item(), diagnostics["mean"][i])
+        assert np.isclose(variance.item(), diagnostics["variance"][i])
+
+    # The health check of train_ does not depend on the scale of the targets
+    scaled = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y * 1e4)
+    scaled.train_()
+    assert scaled.training_state_successful
+    nlpd, _ = model._get_health_nlpd()
+    assert np.isclose(scaled._get_health_nlpd()[0], nlpd)
+
+
+def test_gp_save_load(tmp_path, monkeypatch):
+    """Makes sure a loaded model predicts exactly like the saved one, keeps
+    its state, and can still be conditioned on new data, also with versions
+    of torch which cannot memory-map checkpoints."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    model = model.tell(new_x=grid[:2], new_y=train_y[:2], retrain=False)
+
+    path = tmp_path / "model.pt"
+    model.save(path)
+    loaded = EasySingleTaskGPRegressor.load(path)
+    assert loaded._training_factor is not None
+    assert loaded.training_state_successful
+    assert loaded._transforms_stale
+    for key in ["mean", "std"]:
+        np.testing.assert_array_equal(
+            loaded.predict(grid=grid)[key], model.predict(grid=grid)[key]
+        )
+    np.testing.assert_array_equal(loaded.train_x, model.train_x)
+
+    loaded = loaded.tell(new_x=grid[:1], new_y=train_y[:1], retrain=False)
+    assert loaded.train_x.shape == (len(train_x) + 3, 1)
+
+    load = torch.load
+
+    def load_without_mmap(f, map_location=None, *, weights_only=False):
+        return load(f, map_location=map_location, weights_only=weights_only)
+
+    monkeypatch.setattr(torch, "load", load_without_mmap)
+    loaded = EasySingleTaskGPRegressor.load(path)
+    np.testing.assert_array_equal(
+        loaded.predict(grid=grid)["mean"], model.predict(grid=grid)["mean"]
+    )
+
+
+def test_gp_train_data_cache():
+    """Makes sure train_x and train_y are cached read-only arrays, which are
+    recomputed once the training data changes."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    assert model.train_x is model.train_x
+    assert not model.train_y.flags.writeable
+    np.testing.assert_allclose(model.train_y, train_y)
+
+    new_model = model.tell(new_x=grid[:1], new_y=train_y[:1], retrain=False)
+    assert len(new_model.train_x) == len(train_x) + 1
+    assert len(model.train_x) == len(train_x)
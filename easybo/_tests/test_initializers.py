@@ -0,0 +1,99 @@
+import pytest
+import torch
+from botorch.exceptions.errors import CandidateGenerationError
+
+from easybo.bo import _qMaxVariance
+from easybo.botorch_local.optim.initializers import (
+    get_batch_initial_conditions_nonlinear_function,
+    NonlinearConstraintSampler,
+)
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.utils import get_dummy_1d_sinusoidal_data
+
+
+def _in_disk(X):
+    return ((X[:, :2] - 0.7) ** 2).sum(dim=-1) <= 0.2**2
+
+
+def test_nonlinear_constraint_sampler():
+    """Makes sure the sampler only returns feasible points, and keeps the
+    leftover ones for the next draws."""
+
+    bounds = torch.tensor([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]]).double()
+    inequality_constraints = [
+        (torch.tensor([0, 1]), torch.tensor([1.0, 1.0]).double(), 1.2)
+    ]
+    equality_constraints = [
+        (torch.tensor([2]), torch.tensor([1.0]).double(), 0.3)
+    ]
+
+    for hit_and_run in [False, True]:
+        sampler = NonlinearConstraintSampler(
+            bounds,
+            _in_disk,
+            inequality_constraints=inequality_constraints,
+            equality_constraints=equality_constraints,
+            seed=0,
+            hit_and_run=hit_and_run,
+        )
+        X = sampler.draw(500)
+        assert X.shape == (500, 3)
+        assert _in_disk(X).all()
+        assert (X[:, 0] + X[:, 1] >= 1.2 - 1e-9).all()
+        torch.testing.assert_close(X[:, 2], torch.full_like(X[:, 2], 0.3))
+        assert ((X >= 0.0) & (X <= 1.0)).all()
+
+        # Leftover points are used first
+        available = sampler.available
+        assert sampler.draw(available).shape == (available, 3)
+        assert sampler.available == 0
+
+    sampler = NonlinearConstraintSampler(
+        bounds, lambda X: X[:, 0] > 2.0, max_iterations=5
+    )
+    with pytest.raises(CandidateGenerationError):
+        sampler.draw(10)
+
+
+def test_nonlinear_constraint_sampler_matches():
+    """Makes sure a sampler is only reused for its own nonlinear constraint,
+    and counts every proposal of the polytope chains."""
+
+    bounds = torch.tensor([[0.0, 0.0], [1.0, 1.0]]).double()
+    inequality_constraints = [
+        (torch.tensor([0, 1]), torch.tensor([1.0, 1.0]).double(), 1.2)
+    ]
+    sampler = NonlinearConstraintSampler(
+        bounds,
+        _in_disk,
+        inequality_constraints=inequality_constraints,
+        seed=0,
+        num_chains=8,
+    )
+    assert sampler.matches(bounds, inequality_constraints, None, _in_disk)
+    assert not sampler.matches(
+        bounds, inequality_constraints, None, lambda X: X[:, 0] < 0.5
+    )
+    assert not sampler.matches(bounds, inequality_constraints)
+
+    sampler._reject(5)
+    assert sampler._proposed == 8
+    assert 0 < sampler._accepted <= 8
+
+
+def test_gen_batch_initial_conditions_nonlinear():
+    """Makes sure the generator returns feasible initial conditions."""
+
+    _, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    aq = _qMaxVariance(model.model)
+    bounds = torch.tensor([[0.0], [1.0]]).double()
+
+    def constraint(X):
+        return (X[:, 0] - 0.5).abs() <= 0.05
+
+    generator = get_batch_initial_conditions_nonlinear_function(constraint)
+    for _ in range(2):
+        X = generator(aq, bounds, q=2, num_restarts=4, raw_samples=50)
+        assert X.shape == (4, 2, 1)
+        assert constraint(X.reshape(-1, 1)).all()
@@ -0,0 +1,53 @@
+from threading import Thread
+import warnings
+
+from easybo.logger import _log_warnings, _WARNING_ROUTER, logger, logging_mode
+
+
+def test_lazy_debug_messages():
+    """Makes sure lazy debug messages are only formatted when DEBUG is
+    enabled."""
+
+    calls = []
+
+    def message():
+        calls.append(None)
+        return "message"
+
+    logger.opt(lazy=True).debug("{}", message)
+    assert len(calls) == 0
+
+    with logging_mode(debug=True):
+        logger.opt(lazy=True).debug("{}", message)
+    assert len(calls) == 1
+
+
+def test_warning_router_deduplicates():
+    """Makes sure repeated warnings inside routed calls are logged once, and
+    that routing is local to the thread which made the call."""
+
+    _WARNING_ROUTER.reset()
+    messages = []
+    handler = logger.add(messages.append, level="WARNING")
+
+    @_log_warnings
+    def f():
+        for _ in range(100):
+            warnings.warn("repeated", RuntimeWarning)
+
+    try:
+        with warnings.catch_warnings(record=True) as recorded:
+            warnings.simplefilter("always")
+            threads = [Thread(target=f) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            f()
+            warnings.warn("outside", RuntimeWarning)
+    finally:
+        logger.remove(handler)
+
+    assert len(messages) == 1
+    assert "RuntimeWarning: repeated" in messages[0]
+    assert [str(w.message) for w in recorded] == ["outside"]
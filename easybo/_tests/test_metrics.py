@@ -0,0 +1,61 @@
+import json
+
+from easybo import metrics
+from easybo.bo import ask
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.utils import get_dummy_1d_sinusoidal_data
+
+
+def test_metrics_records():
+    """Makes sure the main entry points are recorded and exported."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    received = []
+
+    metrics.clear()
+    metrics.enable()
+    metrics.add_callback(received.append)
+    try:
+        model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+        model.train_()
+        model.predict(grid=grid)
+        model.predict(grid=grid)
+        model.tell(new_x=[[0.5]], new_y=[[0.0]], retrain=False)
+        ask(model=model)
+    finally:
+        metrics.disable()
+        metrics.remove_callback(received.append)
+
+    records = metrics.records()
+    assert received == records
+    assert [r["event"] for r in records] == [
+        "train_",
+        "predict",
+        "predict",
+        "tell",
+        "ask",
+    ]
+
+    train = records[0]
+    assert train["model"] == "EasySingleTaskGPRegressor"
+    assert (train["N"], train["d"]) == (len(train_x), 1)
+    assert train["success"] and train["iterations"] > 0
+    assert train["restarts"] == 0
+    assert 0.0 < train["fit_time"] <= train["wall_time"]
+    assert not records[1]["cache_hit"] and records[2]["cache_hit"]
+    assert records[1]["grid_size"] == len(grid)
+    assert records[3]["incremental"]
+    assert records[4]["q"] == 1
+
+    lines = metrics.to_jsonl().splitlines()
+    assert [json.loads(line)["event"] for line in lines] == [
+        r["event"] for r in records
+    ]
+    text = metrics.to_prometheus()
+    assert 'easybo_wall_time_seconds_count{event="predict"} 2' in text
+    assert 'easybo_last{event="train_",field="nlpd"}' in text
+
+    # Nothing is recorded while disabled
+    model.predict(grid=grid)
+    assert len(metrics.records()) == len(records)
+    metrics.clear()
@@ -0,0 +1,42 @@
+import numpy as np
+import torch
+
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.parallel import fit_many
+from easybo.utils import get_dummy_1d_sinusoidal_data
+
+
+def test_fit_many():
+    """Makes sure that models trained in worker processes are identical to
+    models trained serially."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    models = [
+        EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y),
+        EasySingleTaskGPRegressor(
+            train_x=train_x[:10] * 3.0, train_y=train_y[:10]
+        ),
+    ]
+
+    results = fit_many(models, workers=2)
+
+    for model, result in zip(models, results):
+        model.train_()
+        assert result["training_state_successful"]
+        assert np.isclose(result["nlpd"], model.nlpd())
+        assert np.allclose(
+            result["model"].predict(grid=grid)["mean"],
+            model.predict(grid=grid)["mean"],
+        )
+
+
+def test_fit_many_in_process_keeps_threads():
+    """Makes sure that fitting in the calling process restores its torch
+    thread count."""
+
+    _, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+
+    threads = torch.get_num_threads()
+    fit_many([model], workers=1, threads_per_worker=threads + 1)
+    assert torch.get_num_threads() == threads
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.store import ObservationStore
+from easybo.utils import get_dummy_1d_sinusoidal_data
+
+
+def test_store_append_and_recover(tmp_path):
+    """Makes sure the store grows, hands out read-only views, and discards a
+    partially written entry when reopened after a crash."""
+
+    store = ObservationStore(tmp_path, d=2, capacity=2)
+    store.append(np.ones((3, 2)), np.ones((3, 1)), metadata=[1, 2, 3])
+    store.append(np.zeros((1, 2)), np.zeros((1, 1)))
+    assert store.x.shape == (4, 2) and store.y.shape == (4, 1)
+    assert store.metadata == [1, 2, 3, None]
+    with pytest.raises(ValueError):
+        store.x[0, 0] = 2.0
+
+    with open(tmp_path / "log.jsonl", "a") as f:
+        f.write('{"n": 1, "meta')
+    store = ObservationStore(tmp_path)
+    assert len(store) == 4
+    np.testing.assert_array_equal(store.x[:3], np.ones((3, 2)))
+    store.append(np.zeros((1, 2)), np.zeros((1, 1)))
+    assert len(ObservationStore(tmp_path)) == 5
+
+
+def test_store_backed_model(tmp_path):
+    """Makes sure told observations are appended to the store, and that a
+    model is conditioned on the observations it misses when attached."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    model = model.attach_store(ObservationStore(tmp_path, d=1))
+
+    new_model = model.tell(new_x=grid[:2], new_y=train_y[:2], retrain=False)
+    assert len(model.store) == len(train_x) + 2
+    assert len(model.train_x) == len(train_x)
+    assert np.shares_memory(new_model.train_x, model.store.x)
+
+    recovered = model.attach_store(ObservationStore(tmp_path))
+    np.testing.assert_allclose(
+        recovered.predict(grid=grid)["mean"],
+        new_model.predict(grid=grid)["mean"],
+    )
+
+
+def test_store_backed_model_branches(tmp_path):
+    """Makes sure models told different observations from the same parent
+    each see their own training data, and that a failed tell leaves the
+    store untouched."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+    model.train_()
+    model = model.attach_store(ObservationStore(tmp_path, d=1))
+
+    a = model.tell(new_x=grid[:1], new_y=train_y[:1], retrain=False)
+    b = model.tell(new_x=grid[1:2], new_y=train_y[1:2], retrain=False)
+    c = b.tell(new_x=grid[2:3], new_y=train_y[2:3], retrain=True)
+    assert len(model.store) == len(train_x) + 3
+    np.testing.assert_allclose(a.train_x[-1], grid[0])
+    np.testing.assert_allclose(b.train_x[-1], grid[1])
+    np.testing.assert_allclose(c.train_x[-2:], grid[1:3])
+    assert len(b.train_x) == len(c.train_x) - 1 == len(train_x) + 1
+    np.testing.assert_allclose(b.train_x, b._get_current_train_x(True))
+
+    with pytest.raises(RuntimeError):
+        c.tell(new_x=grid[:2], new_y=train_y[:1], retrain=False)
+    assert len(model.store) == len(train_x) + 3
@@ -0,0 +1,49 @@
+import numpy as np
+import torch
+
+from easybo.bo import ask
+from easybo.gp import EasySingleTaskGPRegressor
+from easybo.utils import (
+    _to_tensor,
+    get_dummy_1d_sinusoidal_data,
+    get_precision,
+    set_precision,
+)
+
+
+def test_to_tensor_zero_copy():
+    """Makes sure that arrays are only copied when necessary."""
+
+    x = np.random.random((10, 2))
+    t = _to_tensor(x, dtype=torch.float64)
+    assert t.data_ptr() == x.ctypes.data
+    assert _to_tensor(t, dtype=torch.float64) is t
+
+    assert _to_tensor(x, dtype=torch.float64, copy=True).data_ptr() != (
+        x.ctypes.data
+    )
+    assert _to_tensor(x, dtype=torch.float32).dtype == torch.float32
+
+    x.flags.writeable = False
+    assert _to_tensor(x, dtype=torch.float64).data_ptr() == x.ctypes.data
+    np.testing.assert_array_equal(
+        _to_tensor(x[::-1], dtype=torch.float64).numpy(), x[::-1]
+    )
+
+
+def test_precision_policy():
+    """Makes sure the global precision policy is used by models and ask."""
+
+    grid, train_x, train_y = get_dummy_1d_sinusoidal_data()
+    assert get_precision() == "float64"
+
+    set_precision("float32")
+    try:
+        model = EasySingleTaskGPRegressor(train_x=train_x, train_y=train_y)
+        model.train_()
+        assert model.dtype == torch.float32
+        assert model.model.train_targets.dtype == torch.float32
+        assert model.predict(grid=grid)["mean"].dtype == np.float32
+        assert ask(model=model).dtype == torch.float32
+    finally:
+        set_precision("float64")
@@ -3,17 +3,27 @@ from botorch.acquisition import UpperConfidenceBound, ExpectedImprovement
 from botorch.acquisition.analytic import AnalyticAcquisitionFunction
 from botorch.acquisition.monte_carlo import MCAcquisitionFunction
 from botorch.acquisition.penalized import PenalizedAcquisitionFunction
+from botorch.acquisition.utils import is_nonnegative
 from botorch.optim import optimize_acqf
+from botorch.optim.initializers import (
+    initialize_q_batch,
+    initialize_q_batch_nonneg,
+)
+from botorch.optim.utils import fix_features
+from botorch.utils.sampling import draw_sobol_samples
 from botorch.utils.transforms import (
     t_batch_mode_transform,
     concatenate_pending_points,
 )
-
+import numpy as np
+from scipy.spatial import cKDTree
 import torch
 
-from easybo.utils import _to_float32_tensor, DEVICE
+from easybo.utils import _to_tensor, _validate_precision, DEVICE, get_dtype
 from easybo.logger import logger, _log_warnings
 from easybo.gp import EasyGP
+from easybo.metrics import annotate, instrument
+from easybo.sampling import _get_generator, _randn
 
 
 class XPendingError(Exception):
@@ -76,7 +86,265 @@ CUSTOM_AQ_MAPPING = {
 }
 
 
+def _resolve_acquisition_function(acquisition_function):
+    """Returns the acquisition function class matching a name, either from
+    ``botorch.acquisition`` or from :data:`CUSTOM_AQ_MAPPING`. Anything but a
+    string is returned unchanged.
+
+    Raises
+    ------
+    ValueError
+        If an incorrect acqusition function name is provided.
+    """
+
+    if not isinstance(acquisition_function, str):
+        return acquisition_function
+
+    # Instantiate assuming base of botorch.acquisition
+    klass = getattr(botorch.acquisition, acquisition_function, None)
+    if klass is not None:
+        return klass
+
+    # Custom definitions
+    logger.debug(
+        "Acquisition function signature {} not found in botorch.acquisition",
+        acquisition_function,
+    )
+    klass = CUSTOM_AQ_MAPPING.get(acquisition_function)
+    if klass is None:
+        msg = f"Unknown acquisition function alias {acquisition_function}"
+        logger.critical(msg)
+        raise ValueError(msg)
+    return klass
+
+
+def _prepare_model(model, precision):
+    """Returns the botorch model on which to optimize the acquisition
+    function, and the dtype of the tensors passed to it."""
+
+    if precision is not None:
+        _validate_precision(precision)
+
+    # Tensors passed to the acquisition function follow the precision of the
+    # model, or the global precision policy for raw botorch models
+    if isinstance(model, EasyGP):
+        if precision is not None and precision != model.precision:
+            model = model.with_precision(precision)
+        dtype = model.prediction_dtype
+
+        # This pins the factorization of the training covariance, so that
+        # every evaluation of the acquisition function reuses it. In mixed
+        # precision, this is a float32 copy of the model.
+        model = model._get_prediction_model()
+
+    else:
+        dtype = get_dtype(precision)
+
+    return model, dtype
+
+
+def _build_acquisition_function(
+    acquisition_function,
+    model,
+    *,
+    X_pending,
+    acquisition_function_kwargs,
+    penalty_function,
+    penalty_strength,
+    terminate_on_fail,
+):
+    """Instantiates a resolved acquisition function class, checking that it
+    supports ``X_pending`` and applying the penalty, if any."""
+
+    aq = acquisition_function(
+        model,
+        X_pending=X_pending,
+        **acquisition_function_kwargs,
+    )
+
+    if X_pending is not None and not isinstance(aq, MCAcquisitionFunction):
+        klass = aq.__class__.__name__
+        klass = klass.replace("_", "")
+        logger.error(
+            "You have passed X_pending to an acquisition function that does "
+            "not inherit MCAcquisitionFunction. X_pending will be silently "
+            "ignored! You passed acqusition function "
+            f"{klass}, try e.g. q{klass}."
+        )
+        if terminate_on_fail:
+            logger.critical("terminate_on_fail is True, throwing error")
+            raise XPendingError
+
+    if penalty_function is not None:
+        aq = PenalizedAcquisitionFunction(
+            aq, penalty_function, penalty_strength
+        )
+
+    return aq
+
+
+def _get_choices(choices):
+    """Returns the candidate points and their spatial index, if any."""
+
+    if isinstance(choices, cKDTree):
+        return choices.data, choices
+    if isinstance(choices, torch.Tensor):
+        choices = choices.detach().cpu().numpy()
+    return choices, None
+
+
+def _choices_mask(choices, index, *, exclude, tolerance, fixed_features):
+    """Returns a boolean mask of the candidate points which can be chosen:
+    those further than ``tolerance`` from every point of ``exclude``, and
+    matching ``fixed_features``. If the candidate points have a precomputed
+    spatial index, only the excluded points are queried against it, which
+    is far cheaper than querying every candidate point."""
+
+    n = len(choices)
+    mask = np.ones(n, dtype=bool)
+
+    if exclude is not None and len(exclude) > 0:
+        if index is not None:
+            for neighbors in index.query_ball_point(exclude, r=tolerance):
+                mask[neighbors] = False
+        else:
+            distance, _ = cKDTree(exclude).query(
+                choices, k=1, distance_upper_bound=tolerance
+            )
+            mask[np.isfinite(distance)] = False
+
+    for feature, value in (fixed_features or dict()).items():
+        mask &= np.abs(choices[:, feature] - value) <= tolerance
+
+    return mask
+
+
+def _evaluate_choices(aq, choices, mask, *, chunk_size, device, dtype):
+    """Evaluates the acquisition function on every allowed candidate point
+    in chunks of ``chunk_size`` points. Disallowed points get ``-inf``."""
+
+    values = np.full(len(choices), -np.inf)
+    for start in range(0, len(choices), chunk_size):
+        block = slice(start, start + chunk_size)
+        allowed = np.flatnonzero(mask[block])
+        if len(allowed) == 0:
+            continue
+        X = _to_tensor(
+            np.asarray(choices[block])[allowed], device=device, dtype=dtype
+        )
+        with torch.no_grad():
+            values[start + allowed] = aq(X.unsqueeze(-2)).cpu().numpy()
+    return values
+
+
+def _optimize_acqf_choices(aq, choices, mask, *, q, chunk_size, device, dtype):
+    """Selects the best ``q`` points of a discrete candidate set. Analytic
+    acquisition functions ignore pending points, so the top ``q`` points are
+    returned. For Monte Carlo acquisition functions, the points are selected
+    greedily: each selected point is added to the pending points before the
+    candidate set is evaluated again."""
+
+    mask = mask.copy()
+    values = _evaluate_choices(
+        aq, choices, mask, chunk_size=chunk_size, device=device, dtype=dtype
+    )
+    greedy = q > 1 and isinstance(aq, MCAcquisitionFunction)
+
+    if not greedy:
+        q = min(q, int(mask.sum()))
+        best = np.argpartition(-values, q - 1)[:q]
+        best = best[np.argsort(-values[best])]
+        return best, values[best]
+
+    base_X_pending = aq.X_pending
+    best, best_values = [], []
+    try:
+        for step in range(q):
+            if step > 0:
+                values = _evaluate_choices(
+                    aq,
+                    choices,
+                    mask,
+                    chunk_size=chunk_size,
+                    device=device,
+                    dtype=dtype,
+                )
+            index = int(np.argmax(values))
+            if not np.isfinite(values[index]):
+                break
+            best.append(index)
+            best_values.append(values[index])
+            mask[index] = False
+
+            chosen = _to_tensor(
+                np.asarray(choices[best]), device=device, dtype=dtype
+            )
+            if base_X_pending is not None:
+                chosen = torch.cat([base_X_pending, chosen], dim=-2)
+            aq.set_X_pending(chosen)
+    finally:
+        aq.set_X_pending(base_X_pending)
+
+    return np.array(best, dtype=int), np.array(best_values)
+
+
+def _ask_choices(
+    aq,
+    choices,
+    *,
+    q,
+    exclude,
+    X_pending,
+    tolerance,
+    fixed_features,
+    chunk_size,
+    device,
+    dtype,
+):
+    """The discrete counterpart of ``optimize_acqf`` used by :func:`ask`."""
+
+    choices, index = _get_choices(choices)
+    excluded = []
+    for points in [exclude, X_pending]:
+        if points is None:
+            continue
+        if isinstance(points, torch.Tensor):
+            points = points.detach().cpu().numpy()
+        excluded.append(np.asarray(points).reshape(-1, choices.shape[1]))
+    mask = _choices_mask(
+        choices,
+        index,
+        exclude=np.concatenate(excluded) if excluded else None,
+        tolerance=tolerance,
+        fixed_features=fixed_features,
+    )
+    if not mask.any():
+        msg = "No candidate point left in choices after exclusion"
+        logger.error(msg)
+        raise ValueError(msg)
+
+    best, values = _optimize_acqf_choices(
+        aq,
+        choices,
+        mask,
+        q=q,
+        chunk_size=chunk_size,
+        device=device,
+        dtype=dtype,
+    )
+    annotate(
+        q=len(best),
+        choices=len(choices),
+        excluded=int(len(choices) - mask.sum()),
+    )
+    candidate = _to_tensor(
+        np.asarray(choices[best]), device=device, dtype=dtype
+    )
+    return candidate, _to_tensor(values, device=device, dtype=dtype)
+
+
 @_log_warnings
+@instrument("ask")
 def ask(
     *,
     model,
@@ -90,6 +358,11 @@ def ask(
     penalty_strength=0.1,
     terminate_on_fail=True,
     device=DEVICE,
+    precision=None,
+    choices=None,
+    exclude=None,
+    exclude_tolerance=1e-8,
+    choices_chunk_size=4096,
 ):
     """Asks the model to sample the next point(s) based on the current state
     of the posterior and the given acquisition function.
@@ -129,6 +402,37 @@ def ask(
         The strength of the penalty regularization.
     device : str
         The device on which to place any arrays passed to ``ask``.
+    precision : str, optional
+        ``"float32"``, ``"float64"`` or ``"mixed"``. If provided and different
+        from the precision of ``model``, the acquisition function is
+        optimized on a copy of the model in that precision (see
+        :meth:`easybo.gp.EasyGP.with_precision`). Defaults to the precision of
+        the model. For raw botorch models, this only sets the dtype of the
+        tensors built by ``ask``, which must then match that of the model.
+    choices : array_like or scipy.spatial.cKDTree, optional
+        If provided, the next point(s) are chosen among these candidate
+        points (an ``n x d`` array, e.g. the positions reachable by a motor
+        grid) instead of by continuous optimization within ``bounds``. The
+        acquisition function is evaluated on every candidate point in
+        chunks, and the best ``q`` points are returned. For Monte Carlo
+        acquisition functions and ``q > 1``, the points are selected
+        greedily, each selected point being pending for the next. A
+        ``cKDTree`` built once on the candidate points can be passed instead
+        of the points themselves, which makes ``exclude`` much cheaper on
+        large grids. ``fixed_features`` selects the candidate points
+        matching them, and ``optimize_acqf_kwargs`` other than ``q`` are
+        ignored.
+    exclude : array_like, optional
+        Only with ``choices``: points which must not be returned, e.g. the
+        points already measured (``model.train_x``). The points of
+        ``X_pending`` are always excluded.
+    exclude_tolerance : float, optional
+        Only with ``choices``: candidate points closer than this to a point
+        of ``exclude`` or ``X_pending`` are excluded. Also the tolerance
+        used to match ``fixed_features``.
+    choices_chunk_size : int, optional
+        Only with ``choices``: the number of candidate points evaluated at
+        once.
 
     Returns
     -------
@@ -138,73 +442,57 @@ def ask(
     Raises
     ------
     ValueError
-        If an incorrect acqusition function name is provided.
+        If an incorrect acqusition function name is provided, or if no
+        candidate point of ``choices`` is left after exclusion.
     """
 
-    logger.debug(f"ask queried with args: {locals()}")
-
-    dims = len(bounds[0])
-    bounds = torch.tensor(bounds).float().reshape(-1, 2).T
-    logger.debug(f"ask bounds set to {bounds}")
+    arguments = locals()
+    logger.opt(lazy=True).debug(
+        "ask queried with args: {}", lambda: arguments
+    )
 
     if isinstance(model, EasyGP):
-        model = model.model
-
-    # Instantiate assuming base of botorch.acquisition
-    if isinstance(acquisition_function, str):
-
-        try:
-            acquisition_function = eval(
-                f"botorch.acquisition.{acquisition_function}"
-            )
-
-        # Custom definitions
-        except AttributeError:
-            logger.debug(
-                f"Acquisition function signature {acquisition_function} "
-                "not found in botorch.acquisition"
-            )
+        annotate(**model._metrics_fields())
+    model, dtype = _prepare_model(model, precision)
 
-            acquisition_function = CUSTOM_AQ_MAPPING.get(acquisition_function)
-
-            if acquisition_function is None:
-                msg = (
-                    "Unknown acquisition function alias "
-                    f"{acquisition_function}"
-                )
-                logger.critical(msg)
-                raise ValueError(msg)
+    bounds = _to_tensor(bounds, device=device, dtype=dtype).reshape(-1, 2).T
+    logger.debug("ask bounds set to {}", bounds)
 
+    acquisition_function = _resolve_acquisition_function(acquisition_function)
     logger.debug(
-        f"acquisition function in use: {acquisition_function.__name__}"
+        "acquisition function in use: {}", acquisition_function.__name__
     )
 
     if X_pending is not None:
-        X_pending = _to_float32_tensor(X_pending, device=device)
+        X_pending = _to_tensor(X_pending, device=device, dtype=dtype)
 
-    aq = acquisition_function(
+    aq = _build_acquisition_function(
+        acquisition_function,
         model,
         X_pending=X_pending,
-        **acquisition_function_kwargs,
+        acquisition_function_kwargs=acquisition_function_kwargs,
+        penalty_function=penalty_function,
+        penalty_strength=penalty_strength,
+        terminate_on_fail=terminate_on_fail,
     )
 
-    if X_pending is not None and not isinstance(aq, MCAcquisitionFunction):
-        klass = aq.__class__.__name__
-        klass = klass.replace("_", "")
-        logger.error(
-            "You have passed X_pending to an acquisition function that does "
-            "not inherit MCAcquisitionFunction. X_pending will be silently "
-            "ignored! You passed acqusition function "
-            f"{klass}, try e.g. q{klass}."
-        )
-        if terminate_on_fail:
-            logger.critical("terminate_on_fail is True, throwing error")
-            raise XPendingError
-
-    if penalty_function is not None:
-        aq = PenalizedAcquisitionFunction(
-            aq, penalty_function, penalty_strength
+    if choices is not None:
+        annotate(acquisition_function=acquisition_function.__name__)
+        candidate, acq_value = _ask_choices(
+            aq,
+            choices,
+            q=optimize_acqf_kwargs.get("q", 1),
+            exclude=exclude,
+            X_pending=X_pending,
+            tolerance=exclude_tolerance,
+            fixed_features=fixed_features,
+            chunk_size=choices_chunk_size,
+            device=device,
+            dtype=dtype,
         )
+        logger.debug("candidates: {}", candidate)
+        logger.debug("acquisition function value: {}", acq_value)
+        return candidate
 
     candidate, acq_value = optimize_acqf(
         aq,
@@ -213,11 +501,260 @@ def ask(
         **optimize_acqf_kwargs,
     )
 
-    logger.debug(f"candidates: {candidate}")
-    logger.debug(f"acquisition function value: {acq_value}")
+    annotate(
+        acquisition_function=acquisition_function.__name__,
+        q=len(candidate),
+        num_restarts=optimize_acqf_kwargs.get("num_restarts"),
+        raw_samples=optimize_acqf_kwargs.get("raw_samples"),
+    )
+    logger.debug("candidates: {}", candidate)
+    logger.debug("acquisition function value: {}", acq_value)
     return candidate
 
 
+class Asker:
+    """A stateful version of :func:`ask`, meant to be called repeatedly over
+    a campaign. Consecutive calls search nearly the same acquisition
+    landscape, so the optimization of each call is warm-started from the
+    previous one:
+
+    - The acquisition function class is resolved once.
+    - The restarts of the previous optimization, random perturbations of
+      them within a trust region, and the best raw samples of the previous
+      call are scored together with a smaller set of fresh raw samples, and
+      the initial conditions of the restarts are selected among them. Only
+      the first call (or any call after :meth:`reset`) draws the full
+      ``raw_samples``.
+
+    The state is discarded whenever the bounds, ``q``, ``num_restarts`` or
+    the fixed features change. Warm starts are also disabled if
+    ``optimize_acqf_kwargs`` defines constraints, initial conditions or an
+    initial condition generator, in which case every call is equivalent to
+    :func:`ask`.
+
+    Parameters
+    ----------
+    bounds, acquisition_function, acquisition_function_kwargs,
+    optimize_acqf_kwargs, penalty_function, penalty_strength,
+    terminate_on_fail, device, precision
+        See :func:`ask`.
+    trust_region : float, optional
+        The standard deviation of the perturbations of the previous
+        restarts, as a fraction of the range of each input.
+    num_perturbations : int, optional
+        The number of perturbations of each previous restart.
+    fresh_fraction : float, optional
+        The number of fresh raw samples drawn by warm-started calls, as a
+        fraction of ``raw_samples``.
+    seed : int, optional
+        Seeds the private random number generator of the fresh raw samples
+        and of the perturbations, so that warm starts are reproducible. The
+        global generator of torch is never touched.
+
+    Raises
+    ------
+    ValueError
+        If warm starts are possible but ``optimize_acqf_kwargs`` does not
+        define ``num_restarts`` and ``raw_samples``.
+    """
+
+    _UNSUPPORTED_WARM_START_KWARGS = [
+        "batch_initial_conditions",
+        "ic_generator",
+        "inequality_constraints",
+        "equality_constraints",
+        "nonlinear_inequality_constraints",
+    ]
+
+    def __init__(
+        self,
+        *,
+        bounds=[[0, 1]],
+        acquisition_function="MaxVariance",
+        acquisition_function_kwargs=dict(),
+        optimize_acqf_kwargs=dict(q=1, num_restarts=5, raw_samples=20),
+        penalty_function=None,
+        penalty_strength=0.1,
+        terminate_on_fail=True,
+        device=DEVICE,
+        precision=None,
+        trust_region=0.1,
+        num_perturbations=1,
+        fresh_fraction=0.5,
+        seed=None,
+    ):
+        self._bounds = bounds
+        self._acquisition_function = _resolve_acquisition_function(
+            acquisition_function
+        )
+        self._acquisition_function_kwargs = acquisition_function_kwargs
+        self._optimize_acqf_kwargs = dict(optimize_acqf_kwargs)
+        self._supports_warm_start = not any(
+            self._optimize_acqf_kwargs.get(key) is not None
+            for key in self._UNSUPPORTED_WARM_START_KWARGS
+        )
+        missing = [
+            key
+            for key in ["num_restarts", "raw_samples"]
+            if self._optimize_acqf_kwargs.get(key) is None
+        ]
+        if self._supports_warm_start and missing:
+            msg = f"optimize_acqf_kwargs must define {', '.join(missing)}"
+            logger.error(msg)
+            raise ValueError(msg)
+        self._penalty_function = penalty_function
+        self._penalty_strength = penalty_strength
+        self._terminate_on_fail = terminate_on_fail
+        self._device = device
+        self._precision = precision
+        self.trust_region = trust_region
+        self.num_perturbations = num_perturbations
+        self.fresh_fraction = fresh_fraction
+        self._generator = _get_generator(seed)
+        self._state = None
+
+    @property
+    def warm_start(self):
+        """Whether the next call will be warm-started.
+
+        Returns
+        -------
+        bool
+        """
+
+        return self._state is not None
+
+    def reset(self):
+        """Discards the state, so that the next call starts from scratch."""
+
+        self._state = None
+
+    def _get_initial_conditions(self, aq, bounds, key):
+        q = self._optimize_acqf_kwargs.get("q", 1)
+        num_restarts = self._optimize_acqf_kwargs["num_restarts"]
+        raw_samples = self._optimize_acqf_kwargs["raw_samples"]
+        fixed_features = key[2]
+
+        parts = []
+        num_fresh = raw_samples
+        if self._state is not None and self._state["key"] == key:
+            previous = self._state["restarts"]
+            scale = self.trust_region * (bounds[1] - bounds[0])
+            noise = _randn(
+                self.num_perturbations,
+                *previous.shape,
+                generator=self._generator,
+                like=previous,
+            )
+            perturbed = (previous + noise * scale).reshape(-1, q, len(scale))
+            perturbed = torch.max(torch.min(perturbed, bounds[1]), bounds[0])
+            parts += [previous, perturbed, self._state["raw"]]
+            num_fresh = max(int(self.fresh_fraction * raw_samples), 1)
+
+        seed = torch.randint(2**31 - 1, (1,), generator=self._generator)
+        parts.append(
+            draw_sobol_samples(
+                bounds=bounds, n=num_fresh, q=q, seed=seed.item()
+            )
+        )
+        X = fix_features(torch.cat(parts), fixed_features=fixed_features)
+        with torch.no_grad():
+            Y = aq(X)
+
+        init = (
+            initialize_q_batch_nonneg
+            if is_nonnegative(aq)
+            else initialize_q_batch
+        )
+        # botorch samples the initial conditions with the global generator
+        # of torch, which is seeded from the private one and then restored
+        seed = torch.randint(2**31 - 1, (1,), generator=self._generator)
+        with torch.random.fork_rng(devices=[]):
+            torch.manual_seed(seed.item())
+            initial_conditions = init(X=X, Y=Y, n=num_restarts)
+        best = Y.argsort(descending=True)[:num_restarts]
+        return initial_conditions, X[best], len(X)
+
+    @_log_warnings
+    @instrument("ask")
+    def __call__(self, *, model, X_pending=None, fixed_features=None):
+        """Asks the model to sample the next point(s).
+
+        Parameters
+        ----------
+        model, X_pending, fixed_features
+            See :func:`ask`.
+
+        Returns
+        -------
+        torch.Tensor
+            The next point(s) to sample.
+        """
+
+        if isinstance(model, EasyGP):
+            annotate(**model._metrics_fields())
+        model, dtype = _prepare_model(model, self._precision)
+
+        bounds = _to_tensor(self._bounds, device=self._device, dtype=dtype)
+        bounds = bounds.reshape(-1, 2).T
+        if X_pending is not None:
+            X_pending = _to_tensor(
+                X_pending, device=self._device, dtype=dtype
+            )
+
+        aq = _build_acquisition_function(
+            self._acquisition_function,
+            model,
+            X_pending=X_pending,
+            acquisition_function_kwargs=self._acquisition_function_kwargs,
+            penalty_function=self._penalty_function,
+            penalty_strength=self._penalty_strength,
+            terminate_on_fail=self._terminate_on_fail,
+        )
+
+        kwargs = dict(self._optimize_acqf_kwargs)
+        warm_start = self._supports_warm_start
+        annotate(
+            acquisition_function=self._acquisition_function.__name__,
+            num_restarts=kwargs.get("num_restarts"),
+            raw_samples=kwargs.get("raw_samples"),
+            warm_start=warm_start and self.warm_start,
+        )
+
+        if not warm_start:
+            candidate, acq_value = optimize_acqf(
+                aq, bounds=bounds, fixed_features=fixed_features, **kwargs
+            )
+            annotate(q=len(candidate))
+            return candidate
+
+        key = (
+            kwargs.get("q", 1),
+            tuple(bounds.flatten().tolist()),
+            None if fixed_features is None else dict(fixed_features),
+            kwargs["num_restarts"],
+        )
+        initial_conditions, raw, num_scored = self._get_initial_conditions(
+            aq, bounds, key
+        )
+        kwargs.pop("raw_samples")
+        kwargs["return_best_only"] = False
+        restarts, acq_values = optimize_acqf(
+            aq,
+            bounds=bounds,
+            fixed_features=fixed_features,
+            batch_initial_conditions=initial_conditions,
+            **kwargs,
+        )
+        self._state = dict(key=key, restarts=restarts.detach(), raw=raw)
+
+        candidate = restarts[acq_values.argmax()]
+        annotate(q=len(candidate), raw_samples_scored=num_scored)
+        logger.debug("candidates: {}", candidate)
+        logger.debug("acquisition function value: {}", acq_values.max())
+        return candidate
+
+
 # class SimulatedCampaign(MSONable):
 #     """Runs a simulated Bayesian Optimization campaign."""
 
@@ -55,6 +55,7 @@ from botorch.acquisition.acquisition import AcquisitionFunction
 from botorch.acquisition.utils import is_nonnegative
 from botorch.exceptions.errors import (
     BotorchTensorDimensionError,
+    CandidateGenerationError,
     UnsupportedError,
 )
 from botorch.exceptions.warnings import (
@@ -67,7 +68,7 @@ from botorch.utils.multi_objective.pareto import is_non_dominated
 from botorch.utils.sampling import (
     batched_multinomial,
     draw_sobol_samples,
-    get_polytope_samples,
+    find_interior_point,
 )
 from botorch.utils.transforms import normalize, unnormalize
 from torch import Tensor
@@ -75,6 +76,417 @@ from torch.distributions import Normal
 from torch.quasirandom import SobolEngine
 
 
+def _dense_linear_constraints(
+    d: int, constraints: Optional[List[Tuple[Tensor, Tensor, float]]], like
+) -> Optional[Tuple[Tensor, Tensor]]:
+    r"""Converts `(indices, coefficients, rhs)` constraints to a dense
+    `n_con x d` matrix `A` and a vector `b` of length `n_con`."""
+    if not constraints:
+        return None
+    A = torch.zeros(len(constraints), d).to(like)
+    b = torch.zeros(len(constraints)).to(like)
+    for i, (indices, coefficients, rhs) in enumerate(constraints):
+        A[i, indices.long()] = coefficients.to(like)
+        b[i] = rhs
+    return A, b
+
+
+class NonlinearConstraintSampler:
+    r"""Draws points satisfying box bounds, linear constraints and a
+    nonlinear constraint, for the raw samples of
+    `gen_batch_initial_conditions_nonlinear`.
+
+    Feasible points are drawn by rejection: candidates are drawn uniformly
+    in the box (or, when there are linear constraints, by hit-and-run chains
+    in the polytope, which are burnt in only once and run in parallel), and
+    filtered with `nonlinear_constraint`. The number of candidates drawn at
+    once adapts to the measured acceptance rate, and accepted points are
+    kept in a preallocated pool, so that points left over by one call are
+    used by the next.
+
+    With `hit_and_run=True`, once a few feasible points are known, new
+    points are instead drawn by hit-and-run chains inside the feasible
+    region: each step picks a random direction, samples along the chord
+    within the bounds and the linear constraints, and shrinks the chord
+    towards the current point until the nonlinear constraint is satisfied.
+    This is much faster for narrow feasible regions, where rejection
+    sampling accepts a tiny fraction of its candidates, at the price of
+    correlated samples.
+
+    Args:
+        bounds: A `2 x d` tensor of lower and upper bounds.
+        nonlinear_constraint: A callable mapping a `n x d` tensor to a
+            boolean tensor of length `n`, True where the constraint is
+            satisfied.
+        inequality_constraints: A list of tuples (indices, coefficients, rhs),
+            with each tuple encoding an inequality constraint of the form
+            `\sum_i (X[indices[i]] * coefficients[i]) >= rhs`.
+        equality_constraints: A list of tuples (indices, coefficients, rhs),
+            with each tuple encoding an equality constraint of the form
+            `\sum_i (X[indices[i]] * coefficients[i]) = rhs`.
+        seed: The random seed.
+        n_burnin: The number of burn-in steps of the polytope chains, shared
+            among the chains.
+        thinning: The number of steps of the polytope chains between two
+            candidates of a chain.
+        hit_and_run: If True, sample inside the nonlinear region with
+            hit-and-run chains once feasible points are known.
+        num_chains: The number of hit-and-run chains run in parallel in the
+            polytope, and the minimum number of chains run in parallel
+            inside the nonlinear region, which grows up to 1024 for large
+            draws.
+        steps_per_sample: The number of steps of the chains inside the
+            nonlinear region between two samples of a chain.
+        max_iterations: The maximum number of batches of candidates drawn
+            by a single call to `draw`.
+    """
+
+    def __init__(
+        self,
+        bounds: Tensor,
+        nonlinear_constraint: Optional[callable],
+        inequality_constraints: Optional[
+            List[Tuple[Tensor, Tensor, float]]
+        ] = None,
+        equality_constraints: Optional[
+            List[Tuple[Tensor, Tensor, float]]
+        ] = None,
+        seed: Optional[int] = None,
+        n_burnin: int = 10000,
+        thinning: int = 32,
+        hit_and_run: bool = False,
+        num_chains: int = 64,
+        steps_per_sample: int = 5,
+        max_iterations: int = 1000,
+    ) -> None:
+        # The constraint as provided, which identifies the sampled region
+        self._nonlinear_constraint = nonlinear_constraint
+        if nonlinear_constraint is None:
+
+            def nonlinear_constraint(X):
+                return torch.ones(X.shape[0], dtype=torch.bool)
+
+        self.bounds = bounds.detach().cpu()
+        self.nonlinear_constraint = nonlinear_constraint
+        self.inequality_constraints = inequality_constraints
+        self.equality_constraints = equality_constraints
+        self.n_burnin = n_burnin
+        self.thinning = thinning
+        self.hit_and_run = hit_and_run
+        self.num_chains = num_chains
+        self.steps_per_sample = steps_per_sample
+        self.max_iterations = max_iterations
+
+        self._generator = torch.Generator()
+        if seed is None:
+            self._generator.seed()
+        else:
+            self._generator.manual_seed(seed)
+
+        d = self.bounds.shape[-1]
+        self._pool = torch.empty(0, d, dtype=self.bounds.dtype)
+        self._size = 0
+        self._proposed = 0
+        self._accepted = 0
+
+        self._inequality = _dense_linear_constraints(
+            d, inequality_constraints, self.bounds
+        )
+        self._equality = _dense_linear_constraints(
+            d, equality_constraints, self.bounds
+        )
+        self._null_space = None
+        if self._equality is not None:
+            _, S, Vh = torch.linalg.svd(self._equality[0])
+            rank = int((S > 1e-10 * S.max()).sum())
+            self._null_space = Vh[rank:].T
+
+        self._polytope_chains = None
+        self._chains = None
+
+    @property
+    def acceptance_rate(self) -> float:
+        r"""The fraction of the candidates accepted so far, with a uniform
+        prior."""
+        return (self._accepted + 1) / (self._proposed + 2)
+
+    @property
+    def available(self) -> int:
+        r"""The number of feasible points in the pool."""
+        return self._size
+
+    def matches(
+        self,
+        bounds: Tensor,
+        inequality_constraints: Optional[
+            List[Tuple[Tensor, Tensor, float]]
+        ] = None,
+        equality_constraints: Optional[
+            List[Tuple[Tensor, Tensor, float]]
+        ] = None,
+        nonlinear_constraint: Optional[callable] = None,
+    ) -> bool:
+        r"""Whether the sampler draws from the region defined by these bounds,
+        linear constraints and nonlinear constraint. Nonlinear constraints
+        are compared by identity."""
+        return _constraints_key(
+            bounds,
+            inequality_constraints,
+            equality_constraints,
+            nonlinear_constraint,
+        ) == _constraints_key(
+            self.bounds,
+            self.inequality_constraints,
+            self.equality_constraints,
+            self._nonlinear_constraint,
+        )
+
+    def _push(self, X: Tensor) -> None:
+        r"""Adds feasible points to the pool, doubling its capacity when
+        needed."""
+        n = X.shape[0]
+        if self._size + n > self._pool.shape[0]:
+            capacity = max(2 * self._pool.shape[0], self._size + n)
+            pool = torch.empty(capacity, X.shape[-1], dtype=X.dtype)
+            pool[: self._size] = self._pool[: self._size]
+            self._pool = pool
+        self._pool[self._size : self._size + n] = X
+        self._size += n
+
+    def _interior_point(self) -> Tensor:
+        r"""A point in the interior of the polytope."""
+        lower, upper = self.bounds
+        eye = torch.eye(lower.shape[-1]).to(lower)
+        # find_interior_point expects constraints of the form A x <= b
+        A, b = [-eye, eye], [-lower, upper]
+        if self._inequality is not None:
+            A.append(-self._inequality[0])
+            b.append(-self._inequality[1])
+        A_eq, b_eq = None, None
+        if self._equality is not None:
+            # The last column is the slack variable of the linear program
+            C, e = self._equality
+            A_eq = torch.cat([C, torch.zeros_like(C[:, :1])], dim=-1).numpy()
+            b_eq = e.numpy()
+        x0 = find_interior_point(
+            A=torch.cat(A).numpy(),
+            b=torch.cat(b).numpy(),
+            A_eq=A_eq,
+            b_eq=b_eq,
+        )
+        return torch.from_numpy(x0).to(lower)
+
+    def _propose(self, n: int) -> Tensor:
+        r"""Draws at least `n` candidates satisfying the bounds and the
+        linear constraints."""
+        lower, upper = self.bounds
+        if self._inequality is None and self._equality is None:
+            U = torch.rand(
+                n,
+                lower.shape[-1],
+                generator=self._generator,
+                dtype=lower.dtype,
+            )
+            return lower + (upper - lower) * U
+
+        if self._polytope_chains is None:
+            x0 = self._interior_point()
+            self._polytope_chains = x0.expand(self.num_chains, -1).clone()
+            for _ in range(ceil(self.n_burnin / self.num_chains)):
+                self._step(self._polytope_chains)
+
+        rounds = ceil(n / self.num_chains)
+        X = torch.empty(rounds, *self._polytope_chains.shape).to(lower)
+        for i in range(rounds):
+            for _ in range(self.thinning):
+                self._step(self._polytope_chains)
+            X[i] = self._polytope_chains
+        return X.view(-1, lower.shape[-1])
+
+    def _reject(self, n: int) -> None:
+        r"""Draws about `n` candidates, and adds the feasible ones to the
+        pool."""
+        X = self._propose(n)
+        # The polytope chains propose whole rounds, i.e. possibly more than n
+        self._proposed += X.shape[0]
+        X = X[self.nonlinear_constraint(X).to(torch.bool)]
+        self._accepted += X.shape[0]
+        self._push(X)
+
+    def _chord(self, X: Tensor, U: Tensor) -> Tuple[Tensor, Tensor]:
+        r"""The bounds `t_min <= 0 <= t_max` of the chords `X + t U` within
+        the box bounds and the linear inequality constraints."""
+        lower, upper = self.bounds
+        # Each constraint reads a_i (x + t u) >= b_i, i.e.
+        # t (a_i u) >= b_i - a_i x
+        a = torch.cat([U, -U], dim=-1)
+        slack = torch.cat([lower - X, X - upper], dim=-1)
+        if self._inequality is not None:
+            A, b = self._inequality
+            a = torch.cat([a, U @ A.T], dim=-1)
+            slack = torch.cat([slack, b - X @ A.T], dim=-1)
+        ratio = slack.clamp(max=0.0) / a
+        inf = torch.full_like(ratio, float("inf"))
+        t_min = torch.where(a > 0, ratio, -inf).max(dim=-1)[0]
+        t_max = torch.where(a < 0, ratio, inf).min(dim=-1)[0]
+        return t_min.clamp(max=0.0), t_max.clamp(min=0.0)
+
+    def _step(
+        self,
+        X: Tensor,
+        nonlinear_constraint: Optional[callable] = None,
+        max_shrinks: int = 30,
+    ) -> None:
+        r"""Moves every hit-and-run chain of `X` by one step, in place. If
+        `nonlinear_constraint` is provided, the chains stay in the region
+        where it is satisfied."""
+        U = torch.randn(X.shape, generator=self._generator, dtype=X.dtype)
+        if self._null_space is not None:
+            U = U @ self._null_space @ self._null_space.T
+        U = U / U.norm(dim=-1, keepdim=True).clamp(min=1e-12)
+        t_min, t_max = self._chord(X, U)
+
+        moving = torch.arange(X.shape[0])
+        for _ in range(max_shrinks):
+            V = torch.rand(
+                moving.shape[0], generator=self._generator, dtype=X.dtype
+            )
+            t = t_min[moving] + (t_max[moving] - t_min[moving]) * V
+            Y = X[moving] + t.unsqueeze(-1) * U[moving]
+            if nonlinear_constraint is None:
+                X[moving] = Y
+                return
+            feasible = nonlinear_constraint(Y).to(torch.bool)
+            self._proposed += moving.shape[0]
+            self._accepted += int(feasible.sum())
+            X[moving[feasible]] = Y[feasible]
+            # Shrink the chords towards the current, feasible points
+            t, moving = t[~feasible], moving[~feasible]
+            if moving.shape[0] == 0:
+                return
+            t_min[moving] = torch.where(t < 0, t, t_min[moving])
+            t_max[moving] = torch.where(t >= 0, t, t_max[moving])
+
+    def _grow_chains(self, n: int) -> bool:
+        r"""Makes sure there are at least `n` hit-and-run chains inside the
+        nonlinear region. The first chains start from the feasible points of
+        the pool, once there are any, and new chains from existing ones.
+        Returns whether there are any chains."""
+        if self._chains is None:
+            if self._size == 0:
+                return False
+            source = self._pool[: self._size]
+            self._chains = source[:0]
+        else:
+            source = self._chains
+        if n > self._chains.shape[0]:
+            index = torch.randint(
+                source.shape[0],
+                (n - self._chains.shape[0],),
+                generator=self._generator,
+            )
+            self._chains = torch.cat([self._chains, source[index]])
+        return True
+
+    def draw(self, n: int) -> Tensor:
+        r"""Draws `n` feasible points, removing them from the pool.
+
+        Args:
+            n: The number of points.
+
+        Returns:
+            A `n x d` tensor of feasible points.
+
+        Raises:
+            CandidateGenerationError: If fewer than `n` feasible points are
+                found within `max_iterations` batches of candidates.
+        """
+        iterations = 0
+        while self._size < n and iterations < self.max_iterations:
+            missing = n - self._size
+            chains = min(max(missing, self.num_chains), 1024)
+            if self.hit_and_run and self._grow_chains(chains):
+                for _ in range(self.steps_per_sample):
+                    self._step(self._chains, self.nonlinear_constraint)
+                self._push(self._chains.clone())
+            else:
+                if self.hit_and_run:
+                    # Only enough points to start the chains are needed
+                    missing = min(missing, self.num_chains)
+                batch = ceil(1.2 * missing / self.acceptance_rate)
+                self._reject(min(max(batch, 64), 2**16))
+            iterations += 1
+
+        if self._size < n:
+            raise CandidateGenerationError(
+                f"Only {self._size} of {n} points satisfying the nonlinear "
+                f"constraint were found in {iterations} iterations "
+                f"(acceptance rate {self.acceptance_rate:.2g}). Recommend "
+                "revisiting the parameters of this constraint, as it "
+                "appears hard to satisfy it."
+            )
+
+        self._size -= n
+        return self._pool[self._size : self._size + n].clone()
+
+
+def _constraints_key(
+    bounds: Tensor,
+    inequality_constraints: Optional[List[Tuple[Tensor, Tensor, float]]],
+    equality_constraints: Optional[List[Tuple[Tensor, Tensor, float]]],
+    nonlinear_constraint: Optional[callable] = None,
+) -> tuple:
+    r"""A hashable description of a region, to find out whether a cached
+    `NonlinearConstraintSampler` can be reused. The nonlinear constraint is
+    part of it by identity."""
+
+    def key(constraints):
+        return tuple(
+            (
+                tuple(indices.tolist()),
+                tuple(coefficients.tolist()),
+                float(rhs),
+            )
+            for indices, coefficients, rhs in constraints or []
+        )
+
+    return (
+        tuple(map(tuple, bounds.tolist())),
+        key(inequality_constraints),
+        key(equality_constraints),
+        nonlinear_constraint,
+    )
+
+
+def _get_nonlinear_constraint_sampler(
+    sampler: Optional[NonlinearConstraintSampler],
+    bounds: Tensor,
+    nonlinear_constraint: Optional[callable],
+    options: Dict[str, Union[bool, float, int]],
+    inequality_constraints: Optional[List[Tuple[Tensor, Tensor, float]]],
+    equality_constraints: Optional[List[Tuple[Tensor, Tensor, float]]],
+) -> NonlinearConstraintSampler:
+    r"""Returns `sampler` if it samples the requested region, and a new
+    sampler configured from `options` otherwise."""
+    if sampler is not None and sampler.matches(
+        bounds,
+        inequality_constraints,
+        equality_constraints,
+        nonlinear_constraint,
+    ):
+        return sampler
+    return NonlinearConstraintSampler(
+        bounds=bounds,
+        nonlinear_constraint=nonlinear_constraint,
+        inequality_constraints=inequality_constraints,
+        equality_constraints=equality_constraints,
+        seed=options.get("seed"),
+        n_burnin=options.get("n_burnin", 10000),
+        thinning=options.get("thinning", 32),
+        hit_and_run=options.get("hit_and_run", False),
+    )
+
+
 def gen_batch_initial_conditions_nonlinear(
     acq_function: AcquisitionFunction,
     bounds: Tensor,
@@ -88,6 +500,7 @@ def gen_batch_initial_conditions_nonlinear(
     ] = None,
     equality_constraints: Optional[List[Tuple[Tensor, Tensor, float]]] = None,
     nonlinear_constraint: Optional[callable] = None,
+    sampler: Optional[NonlinearConstraintSampler] = None,
 ) -> Tensor:
     r"""Generate a batch of initial conditions for random-restart optimziation.
 
@@ -111,13 +524,20 @@ def gen_batch_initial_conditions_nonlinear(
             functions). In addition, an "init_batch_limit" option can be passed
             to specify the batch limit for the initialization. This is useful
             for avoiding memory limits when computing the batch posterior over
-            raw samples.
+            raw samples. The "n_burnin", "thinning" and "hit_and_run" options
+            configure the `NonlinearConstraintSampler` of the raw samples.
         inequality constraints: A list of tuples (indices, coefficients, rhs),
             with each tuple encoding an inequality constraint of the form
             `\sum_i (X[indices[i]] * coefficients[i]) >= rhs`.
         equality constraints: A list of tuples (indices, coefficients, rhs),
             with each tuple encoding an inequality constraint of the form
             `\sum_i (X[indices[i]] * coefficients[i]) = rhs`.
+        nonlinear_constraint: A callable mapping a `n x d` tensor to a
+            boolean tensor of length `n`, True where the constraint is
+            satisfied.
+        sampler: A sampler of the feasible region, whose leftover feasible
+            points are reused. A new one is created if not provided, or if
+            it samples another region.
 
     Returns:
         A `num_restarts x q x d` tensor of initial conditions.
@@ -167,51 +587,19 @@ def gen_batch_initial_conditions_nonlinear(
             SamplingWarning,
         )
 
+    sampler = _get_nonlinear_constraint_sampler(
+        sampler,
+        bounds,
+        nonlinear_constraint,
+        options,
+        inequality_constraints,
+        equality_constraints,
+    )
+
     while factor < max_factor:
         with warnings.catch_warnings(record=True) as ws:
             n = raw_samples * factor
-
-            if sample_around_best:
-                BotorchWarning(
-                    "sample_around_best is True but there are "
-                    "non-linear constraints provided. This might lead to "
-                    "unexpected behavior since sampling points around "
-                    "best has some random behavior which could violate "
-                    "the non-linear constraints"
-                )
-
-            need = num_restarts * q
-            all_points = torch.tensor([]).cpu()
-            ndims = bounds.shape[1]
-            counter = 0
-            while all_points.shape[0] <= need:
-                X_rnd = (
-                    get_polytope_samples(
-                        n=n * q,
-                        bounds=bounds,
-                        inequality_constraints=inequality_constraints,
-                        equality_constraints=equality_constraints,
-                        seed=seed,
-                        n_burnin=options.get("n_burnin", 10000),
-                        thinning=options.get("thinning", 32),
-                    )
-                    .view(n, q, -1)
-                    .cpu()
-                )
-                X_rnd = X_rnd.reshape(-1, ndims)
-                where = torch.where(nonlinear_constraint(X_rnd))[0]
-                all_points = torch.cat([all_points, X_rnd[where, :]], axis=0)
-                counter += 1
-                if seed is not None:
-                    seed += 1
-                if counter >= 1000:
-                    BotorchWarning(
-                        "1000 iterations of trying to satisfy the "
-                        "provided non-linear constraint. Recommend "
-                        "revisiting the parameters of this constraint, "
-                        "as it appears hard to satisfy it."
-                    )
-            X_rnd = all_points[:need, :].reshape(num_restarts, q, ndims)
+            X_rnd = sampler.draw(n * q).view(n, q, -1)
 
             # sample points around best
             if sample_around_best:
@@ -228,13 +616,13 @@ def gen_batch_initial_conditions_nonlinear(
                     ),
                 )
                 if X_best_rnd is not None:
-                    X_rnd = torch.cat(
-                        [
-                            X_rnd,
-                            X_best_rnd.view(n, q, bounds.shape[-1]).cpu(),
-                        ],
-                        dim=0,
+                    # Points around the best may violate the constraint
+                    X_best_rnd = X_best_rnd.view(n, q, bounds.shape[-1]).cpu()
+                    feasible = sampler.nonlinear_constraint(
+                        X_best_rnd.reshape(n * q, -1)
                     )
+                    feasible = feasible.to(torch.bool).view(n, q).all(dim=-1)
+                    X_rnd = torch.cat([X_rnd, X_best_rnd[feasible]], dim=0)
             X_rnd = fix_features(X_rnd, fixed_features=fixed_features)
             with torch.no_grad():
                 if batch_limit is None:
@@ -271,6 +659,23 @@ def gen_batch_initial_conditions_nonlinear(
 def get_batch_initial_conditions_nonlinear_function(
     nonlinear_constraint: Optional[callable] = None,
 ):
+    r"""Returns an initial conditions generator for `optimize_acqf`
+    (its `ic_generator` argument), which draws raw samples satisfying
+    `nonlinear_constraint`. The generator keeps its
+    `NonlinearConstraintSampler` across calls, so that the burn-in of the
+    polytope sampler, the measured acceptance rate and leftover feasible
+    points are reused.
+
+    Args:
+        nonlinear_constraint: A callable mapping a `n x d` tensor to a
+            boolean tensor of length `n`, True where the constraint is
+            satisfied.
+
+    Returns:
+        A callable with the signature of `gen_batch_initial_conditions`.
+    """
+    state = {}
+
     def _gen_batch_initial_conditions_nonlinear(
         acq_function,
         bounds,
@@ -282,6 +687,14 @@ def get_batch_initial_conditions_nonlinear_function(
         inequality_constraints=None,
         equality_constraints=None,
     ):
+        state["sampler"] = _get_nonlinear_constraint_sampler(
+            state.get("sampler"),
+            bounds,
+            nonlinear_constraint,
+            options or {},
+            inequality_constraints,
+            equality_constraints,
+        )
         return gen_batch_initial_conditions_nonlinear(
             acq_function,
             bounds,
@@ -293,6 +706,7 @@ def get_batch_initial_conditions_nonlinear_function(
             inequality_constraints,
             equality_constraints,
             nonlinear_constraint,
+            sampler=state["sampler"],
         )
 
     return _gen_batch_initial_conditions_nonlinear
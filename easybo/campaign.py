@@ -0,0 +1,356 @@
+"""Asynchronous ask/tell loop for experiments in which every measurement is
+slow. Measurements run concurrently with the optimization of the acquisition
+function and with the fitting of the model, so that the instruments never
+wait for either.
+
+A :class:`Campaign` hands out points to measure together with a ticket, keeps
+track of the points in flight, and passes them to :func:`easybo.bo.ask` as
+``X_pending``. Results are told back with their ticket, in any order. The
+model is updated with :meth:`easybo.gp.EasyGP.tell` in a background
+executor, batching together every result which arrived during the previous
+update. Until an update is done, the points it covers also remain pending.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+import inspect
+from itertools import count
+
+from botorch.acquisition.monte_carlo import MCAcquisitionFunction
+import numpy as np
+
+from easybo.bo import ask, XPendingError, _resolve_acquisition_function
+from easybo.logger import logger
+
+
+def _tell(model, new_x, new_y, tell_kwargs):
+    """Worker function: conditions ``model`` on new data. Returns the new
+    model and a private copy of it, from which the next update starts, so
+    that a published model is never touched by two threads at once."""
+
+    new_model = model.tell(new_x=new_x, new_y=new_y, **tell_kwargs)
+    return new_model, deepcopy(new_model)
+
+
+class Campaign:
+    """An asyncio driver for asynchronous Bayesian optimization.
+
+    .. code-block:: python
+
+        async def measure(x):
+            ...  # drive the instrument, return the measured value
+
+        campaign = Campaign(
+            model,
+            ask_kwargs=dict(
+                bounds=bounds, acquisition_function="qMaxVariance"
+            ),
+        )
+        model = asyncio.run(campaign.run(measure, n=100, max_in_flight=4))
+
+    Points can also be handled manually with :meth:`ask` and :meth:`tell`.
+
+    .. note::
+
+        Points are only pending for Monte Carlo acquisition functions (see
+        :class:`easybo.bo.XPendingError`). With analytic acquisition
+        functions, :meth:`ask` first waits for the model to be updated with
+        every result told so far, and raises if any measurement is still in
+        flight.
+
+    Parameters
+    ----------
+    model : EasyGP
+        The initial model.
+    ask_kwargs : dict, optional
+        Keyword arguments passed to :func:`easybo.bo.ask`, except
+        ``model`` and ``X_pending``.
+    tell_kwargs : dict, optional
+        Keyword arguments passed to :meth:`easybo.gp.EasyGP.tell`, except
+        ``new_x`` and ``new_y``, e.g. ``retrain`` or ``refit_policy``.
+    executor : concurrent.futures.Executor, optional
+        The executor in which the model is updated. Defaults to a private
+        single thread. ``ask`` always runs in its own private thread.
+    """
+
+    def __init__(
+        self, model, *, ask_kwargs=None, tell_kwargs=None, executor=None
+    ):
+        self._model = model
+        self._private_model = deepcopy(model)
+        self._ask_kwargs = dict(ask_kwargs or dict())
+        self._tell_kwargs = dict(tell_kwargs or dict())
+
+        acquisition_function = _resolve_acquisition_function(
+            self._ask_kwargs.get("acquisition_function", "MaxVariance")
+        )
+        self._supports_pending = issubclass(
+            acquisition_function, MCAcquisitionFunction
+        )
+
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(1)
+        self._ask_executor = ThreadPoolExecutor(1)
+
+        self._tickets = count()
+        self._in_flight = dict()  # ticket -> x
+        self._told = []  # (x, y), not yet passed to an update
+        self._updating = []  # (x, y), passed to the running update
+        self._update_task = None
+        self._update_error = None
+        self._ask_lock = None
+
+    @property
+    def model(self):
+        """The latest model, conditioned on every result told before the
+        last update started.
+
+        Returns
+        -------
+        EasyGP
+        """
+
+        return self._model
+
+    @property
+    def in_flight(self):
+        """The points handed out by :meth:`ask` and not told yet, keyed by
+        ticket.
+
+        Returns
+        -------
+        dict
+        """
+
+        return dict(self._in_flight)
+
+    @property
+    def pending(self):
+        """Every point which the current model does not know about yet: the
+        points in flight and the results not yet added to the model. These
+        are passed to ``ask`` as ``X_pending``.
+
+        Returns
+        -------
+        numpy.ndarray or None
+        """
+
+        points = list(self._in_flight.values())
+        points += [x for x, _ in self._updating + self._told]
+        if len(points) == 0:
+            return None
+        return np.array(points)
+
+    @property
+    def _optimize_acqf_kwargs(self):
+        default = inspect.signature(ask).parameters["optimize_acqf_kwargs"]
+        return self._ask_kwargs.get("optimize_acqf_kwargs", default.default)
+
+    def _raise_update_error(self):
+        if self._update_error is not None:
+            error, self._update_error = self._update_error, None
+            raise error
+
+    def _schedule_update(self):
+        """Starts an update unless one is running, e.g. to retry the results
+        of a failed update."""
+
+        if self._told and (
+            self._update_task is None or self._update_task.done()
+        ):
+            self._update_task = asyncio.ensure_future(self._update())
+
+    async def ask(self, *, q=None):
+        """Asks for the next point(s) to measure, treating every point in
+        :meth:`pending` as pending. Calls to this method are serialized, so
+        that each one sees the points handed out by the previous ones.
+
+        Parameters
+        ----------
+        q : int, optional
+            The number of points, overriding the ``q`` of the
+            ``optimize_acqf_kwargs`` of ``ask_kwargs``.
+
+        Returns
+        -------
+        list of int, numpy.ndarray
+            The tickets of the points, and the points themselves, of shape
+            ``q x d``.
+
+        Raises
+        ------
+        XPendingError
+            If the acquisition function does not support pending points
+            while measurements are in flight.
+        """
+
+        if self._ask_lock is None:
+            self._ask_lock = asyncio.Lock()
+
+        async with self._ask_lock:
+            if not self._supports_pending:
+                if self._in_flight:
+                    msg = (
+                        f"{len(self._in_flight)} measurement(s) in flight, "
+                        "but the acquisition function does not support "
+                        "pending points, try a Monte Carlo acquisition "
+                        "function"
+                    )
+                    logger.error(msg)
+                    raise XPendingError(msg)
+                await self.join()
+
+            self._raise_update_error()
+            self._schedule_update()
+            model = self._model
+            kwargs = dict(model=model, X_pending=self.pending)
+            kwargs.update(self._ask_kwargs)
+            if q is not None:
+                kwargs["optimize_acqf_kwargs"] = {
+                    **self._optimize_acqf_kwargs,
+                    "q": q,
+                }
+
+            loop = asyncio.get_running_loop()
+            candidates = await loop.run_in_executor(
+                self._ask_executor, lambda: ask(**kwargs)
+            )
+
+            x = candidates.detach().cpu().numpy()
+            tickets = []
+            for point in x:
+                ticket = next(self._tickets)
+                self._in_flight[ticket] = point
+                tickets.append(ticket)
+            logger.debug("Handed out tickets {}", tickets)
+            return tickets, x
+
+    async def tell(self, ticket, y):
+        """Tells the result of the measurement of a point handed out by
+        :meth:`ask`. Results can be told in any order. The model is updated in
+        the background, see :meth:`join`.
+
+        Parameters
+        ----------
+        ticket : int
+            The ticket of the point, as returned by :meth:`ask`.
+        y : float or array_like
+            The measured target(s).
+
+        Raises
+        ------
+        KeyError
+            If the ticket is unknown or was already told.
+        """
+
+        x = self._in_flight.pop(ticket)
+        self._told.append((x, np.asarray(y, dtype=float).reshape(-1)))
+        self._schedule_update()
+
+    async def _update(self):
+        """Updates the model until every told result has been added."""
+
+        loop = asyncio.get_running_loop()
+        while self._told:
+            self._updating, self._told = self._told, []
+            new_x = np.array([x for x, _ in self._updating])
+            new_y = np.array([y for _, y in self._updating])
+            try:
+                model, private_model = await loop.run_in_executor(
+                    self._executor,
+                    _tell,
+                    self._private_model,
+                    new_x,
+                    new_y,
+                    self._tell_kwargs,
+                )
+            except Exception as error:
+                logger.exception("Updating the model failed")
+                self._told = self._updating + self._told
+                self._updating = []
+                self._update_error = error
+                return
+
+            self._model, self._private_model = model, private_model
+            self._updating = []
+            logger.debug("Model updated with {} new point(s)", len(new_x))
+
+    async def join(self):
+        """Waits until the model has been updated with every result told so
+        far.
+
+        Returns
+        -------
+        EasyGP
+            The updated model.
+
+        Raises
+        ------
+        Exception
+            Any exception raised while updating the model. The results of
+            the failed update are kept, and the next call retries adding
+            them.
+        """
+
+        while True:
+            while (
+                self._update_task is not None and not self._update_task.done()
+            ):
+                await asyncio.shield(self._update_task)
+            self._raise_update_error()
+            if not self._told:
+                return self._model
+            self._schedule_update()
+
+    async def run(self, measure, *, n, max_in_flight=1):
+        """Runs the campaign until ``n`` more measurements are done, keeping
+        up to ``max_in_flight`` of them running at all times. With ``q > 1``
+        in ``ask_kwargs``, fewer points are asked for when needed so that
+        neither limit is exceeded.
+
+        Parameters
+        ----------
+        measure : callable
+            A coroutine function taking a point (a ``numpy.ndarray`` of
+            length ``d``) and returning the measured target(s).
+        n : int
+            The number of measurements to make.
+        max_in_flight : int, optional
+            The maximum number of concurrent measurements.
+
+        Returns
+        -------
+        EasyGP
+            The model, updated with every measurement.
+        """
+
+        tasks = dict()  # measurement task -> ticket
+        launched = 0
+        while launched < n or tasks:
+            while launched < n and len(tasks) < max_in_flight:
+                q = min(
+                    self._optimize_acqf_kwargs.get("q", 1),
+                    n - launched,
+                    max_in_flight - len(tasks),
+                )
+                tickets, x = await self.ask(q=q)
+                for ticket, point in zip(tickets, x):
+                    task = asyncio.ensure_future(measure(point))
+                    tasks[task] = ticket
+                    launched += 1
+
+            done, _ = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                await self.tell(tasks.pop(task), task.result())
+
+        return await self.join()
+
+    def close(self):
+        """Shuts down the executors owned by the campaign."""
+
+        self._ask_executor.shutdown(wait=False)
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
@@ -7,21 +7,54 @@ user tries them, e.g. ambiguities in choosing the kernels. The classes here
 abstract away that difficulty (and others) by default.
 """
 
-from copy import deepcopy
+from collections import OrderedDict
+from copy import copy, deepcopy
+import hashlib
+import inspect
+import io
 from itertools import product
+from time import perf_counter
+from warnings import catch_warnings, simplefilter, warn
 
 from botorch.exceptions.errors import ModelFittingError
+from botorch.exceptions.warnings import OptimizationWarning
 from botorch.models.transforms.input import Normalize
 from botorch.models.transforms.outcome import Standardize
 from botorch.fit import fit_gpytorch_mll
 from botorch.models import SingleTaskGP
+from botorch.models.approximate_gp import SingleTaskVariationalGP
+from botorch.optim.fit import fit_gpytorch_scipy
+from botorch.optim.numpy_converter import set_params_with_array
+from botorch.optim.utils import _scipy_objective_and_grad
+from botorch.utils.sampling import draw_sobol_samples
 import gpytorch
+from gpytorch.models.exact_prediction_strategies import (
+    DefaultPredictionStrategy,
+)
+from gpytorch.utils.memoize import add_to_cache
+from linear_operator.utils.cholesky import psd_safe_cholesky
 from linear_operator.utils.errors import NotPSDError
 import numpy as np
 import torch
 
-from easybo.utils import _to_float32_tensor, DEVICE, Timer
+from easybo.linalg import InverseCholesky
+from easybo.sampling import (
+    lanczos_samples,
+    PathwiseSample,
+    WeightSpaceSample,
+    _get_generator,
+)
+from easybo.utils import (
+    _to_tensor,
+    _validate_precision,
+    DEVICE,
+    get_dtype,
+    get_precision,
+    get_prediction_dtype,
+    Timer,
+)
 from easybo.logger import logger, _log_warnings
+from easybo.metrics import annotate, instrument
 
 
 _TRAINING_WARN_MESSAGE = (
@@ -35,32 +68,423 @@ _TRAINING_ERROR_MESSAGE = (
     "properly? Is your kernel choice too strict?"
 )
 
+_NOT_PSD_WARNING_MESSAGE_NLPD = (
+    "The predictive covariance of the data is not positive definite, the "
+    "NLPD is infinite"
+)
+
+
+# The health check of EasyGP.train_. For exact models, it uses the mean
+# leave-one-out NLPD per point of the standardized targets, which is scale
+# free: a model predicting nothing scores about 1.4, and a mean above 5 means
+# that the held-out targets are typically more than 3 standard deviations
+# away from their prediction. Other models use the joint NLPD of the
+# training data, against the historical threshold of 100.
+_LOO_NLPD_HEALTH_THRESHOLD = 5.0
+_NLPD_HEALTH_THRESHOLD = 100.0
 
-def _TRAINING_WARNING_MESSAGE_NLPD(nlpd):
+
+def _TRAINING_WARNING_MESSAGE_NLPD(nlpd, threshold):
     # https://stats.stackexchange.com/questions/547490/
     # gaussian-process-regression-normalization-of-data-worsens-fit-why
     return (
-        f"fit_gpytorch_mll() did not fail, but the NLPD {nlpd:.02e} is high. "
-        "Likely, this is due to the kernel producing extremely small length "
-        "scales and interpreting each point as delta-like. This can happen "
-        "in extremely data-limited conditions and/or when scaling your input "
-        "data to the unit hypercube is TRUE. Try using "
+        f"fit_gpytorch_mll() did not fail, but the NLPD {nlpd:.02e} is above "
+        f"{threshold}. For exact models with a Gaussian likelihood, this is "
+        "the mean leave-one-out NLPD per point of the standardized targets "
+        "(see EasyGP.diagnostics), otherwise the joint NLPD of the training "
+        "data (see EasyGP.nlpd). Likely, this is due to the kernel producing "
+        "extremely small length scales and interpreting each point as "
+        "delta-like. This can happen in extremely data-limited conditions "
+        "and/or when scaling your input data to the unit hypercube is TRUE. "
+        "Try using "
         "normalize_inputs_to_unity=False in this calculation. Specifically, "
         "look for if parameters like the raw_outputscale and raw_lengthscale "
         "are very small (note they're on a log scale)."
     )
 
 
+# The format of the checkpoints written by EasyGP.save. The version is bumped
+# whenever the layout changes, and older versions remain loadable
+_CHECKPOINT_FORMAT = "easybo.gp"
+_CHECKPOINT_VERSION = 1
+
+
+def _is_plain(value):
+    """Whether a construction option can be stored in a checkpoint without
+    pickling."""
+
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(v) for v in value)
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+def _find_subclass(klass, name):
+    """The class called ``name`` among ``klass`` and its subclasses, or
+    None."""
+
+    if klass.__name__ == name:
+        return klass
+    for subclass in klass.__subclasses__():
+        found = _find_subclass(subclass, name)
+        if found is not None:
+            return found
+    return None
+
+
+def _torch_load(f, **kwargs):
+    """Calls ``torch.load``, dropping the keyword arguments which the
+    installed version of torch does not support: ``mmap`` requires torch 2.1
+    and ``weights_only`` torch 1.13."""
+
+    parameters = inspect.signature(torch.load).parameters
+    unsupported = [key for key in kwargs if key not in parameters]
+    if unsupported:
+        logger.debug(
+            "torch {} does not support {}, ignoring them",
+            torch.__version__,
+            unsupported,
+        )
+    kwargs = {key: kwargs[key] for key in kwargs if key in parameters}
+    return torch.load(f, **kwargs)
+
+
 class NLPDModelFittingError(Exception):
     ...
 
 
+class _TrainingBudgetExceeded(Exception):
+    ...
+
+
+class RefitPolicy:
+    """Controls how often, and how hard, the hyperparameters of a model are
+    refit during a campaign. Once a policy is attached to a model (see
+    :meth:`EasyGP.refit_policy`), ``tell`` only retrains once ``every`` new
+    observations have accumulated, and conditions on the new data
+    incrementally otherwise. Every refit is warm-started from the current
+    hyperparameters and is budgeted by ``maxiter``, ``timeout`` and ``rtol``.
+
+    Parameters
+    ----------
+    every : int, optional
+        Refit the hyperparameters once at least this many observations have
+        been told to the model since the last successful fit.
+    maxiter : int, optional
+        The maximum number of L-BFGS-B iterations per fit attempt.
+    timeout : float, optional
+        The maximum wall time, in seconds, per fit attempt. When reached, the
+        best hyperparameters found so far are kept.
+    rtol : float, optional
+        Stop early once the relative change in the marginal log likelihood
+        between iterations falls below this value. This is passed to the
+        optimizer as ``ftol``.
+    max_attempts : int, optional
+        The maximum number of fit attempts (the first attempt is warm-started,
+        the subsequent ones resample the hyperparameters from their priors).
+        Defaults to 1, since a warm start rarely benefits from restarts.
+    """
+
+    def __init__(
+        self, every=1, maxiter=None, timeout=None, rtol=None, max_attempts=1
+    ):
+        self.every = every
+        self.maxiter = maxiter
+        self.timeout = timeout
+        self.rtol = rtol
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(every={self.every}, "
+            f"maxiter={self.maxiter}, timeout={self.timeout}, "
+            f"rtol={self.rtol}, max_attempts={self.max_attempts})"
+        )
+
+    def should_refit(self, observations_since_refit):
+        """Whether the hyperparameters should be refit given the number of
+        observations told to the model since the last successful fit.
+
+        Parameters
+        ----------
+        observations_since_refit : int
+
+        Returns
+        -------
+        bool
+        """
+
+        return observations_since_refit >= self.every
+
+    def optimizer_kwargs(self):
+        """Keyword arguments for :func:`fit_gpytorch_scipy_budgeted`.
+
+        Returns
+        -------
+        dict
+        """
+
+        return dict(maxiter=self.maxiter, timeout=self.timeout, rtol=self.rtol)
+
+
+class PredictionCache:
+    """A least-recently-used cache of the results of :meth:`EasyGP.predict`,
+    keyed by a fingerprint of the grid (its shape, dtype and contents) and
+    the prediction options. Every :class:`EasyGP` holds one of these, which
+    is cleared whenever the model's hyperparameters or device change. Models
+    returned by ``tell`` start with an empty cache.
+
+    Results are copied into and out of the cache, so that callers are free
+    to modify the arrays they get.
+
+    .. warning::
+
+        The cache cannot detect hyperparameters being modified directly on
+        ``model.model``; call :meth:`clear` if you do so.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        The maximum number of cached results. If 0, nothing is cached.
+    max_grid_size : int, optional
+        Predictions on grids of more points than this are not cached, so
+        that the cache does not hold on to large arrays.
+    """
+
+    def __init__(self, maxsize=8, max_grid_size=65536):
+        self.maxsize = maxsize
+        self.max_grid_size = max_grid_size
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(hits={self.hits}, "
+            f"misses={self.misses}, size={len(self)}, maxsize={self.maxsize}, "
+            f"max_grid_size={self.max_grid_size})"
+        )
+
+    @staticmethod
+    def fingerprint(grid, **kwargs):
+        """Computes the cache key of a grid and the options used to predict
+        on it. Hashing the grid is O(len(grid)), which is negligible compared
+        to the O(len(grid) N) cost of the prediction itself.
+
+        Parameters
+        ----------
+        grid : array_like
+        **kwargs
+            Any other options which affect the result.
+
+        Returns
+        -------
+        tuple
+        """
+
+        if isinstance(grid, torch.Tensor):
+            grid = grid.detach().cpu().numpy()
+        grid = np.ascontiguousarray(grid)
+        digest = hashlib.blake2b(grid.data, digest_size=16).hexdigest()
+        return (grid.shape, grid.dtype.str, digest, *sorted(kwargs.items()))
+
+    def get(self, key):
+        """Gets a cached result, or None on a miss.
+
+        Parameters
+        ----------
+        key : tuple
+
+        Returns
+        -------
+        dict
+            A copy of the cached result.
+        """
+
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(key)
+        return {name: value.copy() for name, value in result.items()}
+
+    def put(self, key, result):
+        """Caches a result, evicting the least recently used one if needed.
+
+        Parameters
+        ----------
+        key : tuple
+        result : dict
+            A dictionary of ``numpy.ndarray``, of which a copy is cached.
+        """
+
+        if self.maxsize <= 0:
+            return
+        self._results[key] = {
+            name: value.copy() for name, value in result.items()
+        }
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        """Removes all cached results. The hit and miss counters are kept."""
+
+        self._results.clear()
+
+
+def fit_gpytorch_scipy_budgeted(
+    mll, *, maxiter=None, timeout=None, rtol=None, options=None, **kwargs
+):
+    """A drop-in replacement for botorch's ``fit_gpytorch_scipy`` optimizer
+    which caps the amount of work done in a single fit. Hitting the
+    iteration or time budget is not considered a failure, so it does not
+    trigger botorch's retry policy.
+
+    Parameters
+    ----------
+    mll : gpytorch.mlls.MarginalLogLikelihood
+        The marginal log likelihood to maximize, in train mode.
+    maxiter : int, optional
+        The maximum number of L-BFGS-B iterations.
+    timeout : float, optional
+        The maximum wall time in seconds.
+    rtol : float, optional
+        The relative tolerance on the change of the marginal log likelihood,
+        passed to scipy as ``ftol``.
+    options : dict, optional
+        Other options passed to ``scipy.optimize.minimize``.
+    **kwargs
+        Extra keyword arguments passed to ``fit_gpytorch_scipy``.
+
+    Returns
+    -------
+    tuple
+        The ``mll`` and the dictionary of optimization information returned
+        by ``fit_gpytorch_scipy``.
+    """
+
+    options = {} if options is None else dict(options)
+    if maxiter is not None:
+        options["maxiter"] = maxiter
+    if rtol is not None:
+        options["ftol"] = rtol
+
+    scipy_objective = kwargs.pop("scipy_objective", _scipy_objective_and_grad)
+    deadline = None if timeout is None else perf_counter() + timeout
+    best = {"fun": np.inf}
+
+    def objective(x, mll, property_dict):
+        # Always allow the first evaluation, so that there is a best point
+        if deadline is not None and "x" in best and perf_counter() > deadline:
+            raise _TrainingBudgetExceeded
+        value, grad = scipy_objective(x, mll, property_dict)
+        if value < best["fun"]:
+            best.update(fun=value, x=x.copy(), property_dict=property_dict)
+        return value, grad
+
+    t0 = perf_counter()
+    with catch_warnings(record=True) as warning_list:
+        simplefilter("always", category=OptimizationWarning)
+        try:
+            mll, info = fit_gpytorch_scipy(
+                mll, options=options, scipy_objective=objective, **kwargs
+            )
+            budget_exceeded = (
+                maxiter is not None and info["OptimizeResult"].nit >= maxiter
+            )
+        except _TrainingBudgetExceeded:
+            mll = set_params_with_array(mll, best["x"], best["property_dict"])
+            info = {
+                "fopt": float(best["fun"]),
+                "wall_time": perf_counter() - t0,
+                "iterations": [],
+                "OptimizeResult": None,
+            }
+            budget_exceeded = True
+
+    for w in warning_list:
+        if budget_exceeded and issubclass(w.category, OptimizationWarning):
+            logger.debug("Training budget exhausted: {}", w.message)
+            continue
+        warn(w.message, w.category)
+
+    return mll, info
+
+
+def _recording_optimizer(optimizer, infos):
+    """Wraps a botorch optimizer so that the optimization information of
+    every fit attempt is appended to ``infos`` (None for attempts which
+    raised)."""
+
+    def wrapper(mll, **kwargs):
+        infos.append(None)
+        mll, info = optimizer(mll, **kwargs)
+        infos[-1] = info
+        return mll, info
+
+    return wrapper
+
+
+def _num_iterations(info):
+    """The number of optimizer iterations in the information returned by a
+    botorch optimizer."""
+
+    if info is None:
+        return 0
+    if info.get("OptimizeResult") is not None:
+        return int(info["OptimizeResult"].nit)
+    return len(info.get("iterations", []))
+
+
+def _fixed_probe_objective(scipy_objective, seed=0):
+    """Wraps a scipy objective so that every evaluation draws the same random
+    numbers, i.e. the same probe vectors for stochastic log determinant and
+    trace estimates. Line searches are unreliable on noisy objectives.
+
+    Parameters
+    ----------
+    scipy_objective : callable
+        The objective, with the signature of botorch's
+        ``_scipy_objective_and_grad``.
+    seed : int, optional
+        The seed used for every evaluation.
+
+    Returns
+    -------
+    callable
+    """
+
+    def objective(x, mll, property_dict):
+        with torch.random.fork_rng():
+            torch.manual_seed(seed)
+            return scipy_objective(x, mll, property_dict)
+
+    return objective
+
+
 class EasyGP:
     """Core base class for defining all the primary operations required for an
     "easy Gaussian Process"."""
 
-    def __init__(self):
+    def __init__(self, precision=None):
         self._training_state_successful = False
+        self._training_factor = None
+        self._prediction_model = None
+        self._refit_policy = None
+        self._observations_since_refit = 0
+        self._prediction_cache = PredictionCache()
+        self._train_data_cache = dict()
+        self._store = None
+        self._store_rows = None
+        self._transforms_stale = False
+        if precision is None:
+            precision = get_precision()
+        self._precision = _validate_precision(precision)
+        self._dtype = get_dtype(precision)
 
     @property
     def training_state_successful(self):
@@ -74,10 +498,340 @@ class EasyGP:
 
         return self._training_state_successful
 
+    @property
+    def precision(self):
+        """The floating point precision of the model: ``"float32"``,
+        ``"float64"`` or ``"mixed"``. Unless specified at construction, this
+        is the global precision policy (see
+        :func:`easybo.utils.set_precision`) at the time the model was
+        constructed.
+
+        In ``"mixed"`` precision, the model is stored and trained in float64
+        and the training covariance is factorized in float64. Predictions,
+        samples and acquisition functions then run on a float32 copy of the
+        model which reuses that factorization, so that the kernel evaluations
+        between the grid and the training data, which dominate the cost of
+        inference on large grids, are float32.
+
+        .. note::
+
+            The accuracy of float32 predictions depends on the conditioning of
+            the training covariance. With a noise variance of a few percent of
+            the signal variance, mixed and float32 predictions typically agree
+            with float64 to a relative error of about ``1e-4`` in both the
+            mean and the standard deviation, at roughly half the cost. When
+            the noise is close to its lower bound (``1e-4``) the float32
+            predictive variance suffers from cancellation and can be off by
+            order one, so float64 should be used. In ``"float32"`` precision
+            training and the factorization are float32 as well, which then
+            fails outright, whereas ``"mixed"`` models train exactly like
+            float64 models. ``easybo/_tests/test_gp.py::test_gp_precision``
+            checks both modes against float64.
+
+        Returns
+        -------
+        str
+        """
+
+        return self._precision
+
+    @property
+    def dtype(self):
+        """The floating point dtype in which the model is stored and trained,
+        and of the data passed to it, as determined by :meth:`precision`.
+
+        Returns
+        -------
+        torch.dtype
+        """
+
+        return self._dtype
+
+    @property
+    def prediction_dtype(self):
+        """The floating point dtype of predictions, samples and acquisition
+        functions, as determined by :meth:`precision`.
+
+        Returns
+        -------
+        torch.dtype
+        """
+
+        return get_prediction_dtype(self._precision)
+
+    def _reset_training_factor(self):
+        """Invalidates everything derived from the current hyperparameters."""
+
+        self._training_factor = None
+        self._prediction_model = None
+        self._prediction_cache.clear()
+        self._train_data_cache = dict()
+
+    def _set_model_dtype(self, dtype):
+        """Casts the underlying model in place. The model is put into train
+        mode first, so that its untransformed training inputs are cast as
+        well."""
+
+        self._model.train()
+        self._model.to(dtype=dtype)
+        self._reset_training_factor()
+
+    def with_precision(self, precision):
+        """Returns a copy of the model in a different precision. The
+        hyperparameters and the training state are kept.
+
+        Parameters
+        ----------
+        precision : str
+            One of ``"float32"``, ``"float64"`` or ``"mixed"``.
+
+        Returns
+        -------
+        EasyGP
+        """
+
+        new_model = copy(self)
+        new_model._model = deepcopy(self._model)
+        new_model._prediction_cache = PredictionCache(
+            self._prediction_cache.maxsize,
+            self._prediction_cache.max_grid_size,
+        )
+        new_model._prediction_model = None
+        new_model._train_data_cache = dict()
+        new_model._precision = _validate_precision(precision)
+        new_model._dtype = get_dtype(precision)
+        new_model._initial_kwargs = {
+            **self._initial_kwargs,
+            "precision": precision,
+        }
+        new_model._set_model_dtype(new_model._dtype)
+        return new_model
+
+    def save(self, path, *, include_factor=True):
+        """Saves the fitted model to a versioned checkpoint, from which
+        :meth:`load` restores it without retraining.
+
+        The checkpoint holds the hyperparameters and transform buffers (the
+        ``state_dict`` of the model), the training data, the construction
+        options and, optionally, the cached factorization of the training
+        covariance, all as tensors in a single ``torch.save`` archive. The
+        modules passed at construction (kernel, mean, likelihood and any
+        other object) are pickled separately inside the archive, and can be
+        replaced when loading, should unpickling them fail.
+
+        Parameters
+        ----------
+        path : os.PathLike
+            The file to write.
+        include_factor : bool, optional
+            Whether to include the factorization of ``K(X, X) + sigma^2 I``,
+            which is computed if needed, so that the loaded model predicts
+            without any O(N^3) work. The factor is of size ``N x N``. Only
+            exact, single-output models with a Gaussian likelihood have one.
+
+        Raises
+        ------
+        NotImplementedError
+            If the model does not wrap a ``SingleTaskGP``.
+        """
+
+        model = self._model
+        if not isinstance(model, SingleTaskGP):
+            msg = f"Saving a {self.__class__.__name__} is not supported"
+            logger.error(msg)
+            raise NotImplementedError(msg)
+
+        model.eval()
+        original_x = getattr(model, "_original_train_inputs", None)
+        if original_x is None:
+            original_x = model.train_inputs[0]
+
+        options, objects = dict(), dict()
+        for key, value in self._initial_kwargs.items():
+            if key in ["train_x", "train_y", "device", "precision"]:
+                continue
+            if _is_plain(value):
+                options[key] = value
+            else:
+                objects[key] = value
+        buffer = io.BytesIO()
+        torch.save(objects, buffer)
+
+        checkpoint = {
+            "format": _CHECKPOINT_FORMAT,
+            "version": _CHECKPOINT_VERSION,
+            "class": self.__class__.__name__,
+            "precision": self._precision,
+            "options": options,
+            "object_keys": list(objects),
+            "objects": torch.frombuffer(
+                bytearray(buffer.getvalue()), dtype=torch.uint8
+            ),
+            "state_dict": {
+                key: value.detach().cpu()
+                for key, value in model.state_dict().items()
+            },
+            "train_x": original_x.detach().cpu(),
+            "train_y": self._get_current_train_y(untransform=True).cpu(),
+            "train_inputs": model.train_inputs[0].detach().cpu(),
+            "train_targets": model.train_targets.detach().cpu(),
+            "training_state_successful": self._training_state_successful,
+            "observations_since_refit": self._observations_since_refit,
+            "transforms_stale": self._transforms_stale,
+            "refit_policy": None,
+        }
+        if self._refit_policy is not None:
+            checkpoint["refit_policy"] = vars(self._refit_policy)
+        if include_factor and self._supports_incremental_updates():
+            factor, alpha = self._get_training_factor()
+            checkpoint["L_inv"] = factor.L_inv.cpu()
+            checkpoint["alpha"] = alpha.cpu()
+
+        torch.save(checkpoint, path)
+        logger.debug("Saved {} to {}", self.__class__.__name__, path)
+
+    @classmethod
+    def load(cls, path, *, device=None, mmap=True, **kwargs):
+        """Loads a model saved with :meth:`save`. Tensors are memory-mapped
+        by default, so that loading is fast and the pages of the
+        factorization are only read when first needed.
+
+        .. warning::
+
+            The construction modules are unpickled, which can execute
+            arbitrary code: only load checkpoints from trusted sources. The
+            rest of the checkpoint is loaded with ``weights_only=True``
+            (with torch 1.13 or later).
+
+        Parameters
+        ----------
+        path : os.PathLike
+            The file to read.
+        device : str, optional
+            The device on which to place the model. Defaults to the default
+            device of the model class.
+        mmap : bool, optional
+            Whether to memory-map the tensors of the checkpoint. Ignored with
+            torch older than 2.1, which always reads the whole file.
+        **kwargs
+            Overrides the construction keyword arguments saved in the
+            checkpoint, e.g. ``covar_module``. The saved modules are not
+            unpickled if they are all overridden.
+
+        Returns
+        -------
+        EasyGP
+
+        Raises
+        ------
+        ValueError
+            If the file is not a checkpoint of a model of this class, or was
+            written by a newer version of the format.
+        """
+
+        checkpoint = _torch_load(
+            path, map_location="cpu", mmap=mmap, weights_only=True
+        )
+        if checkpoint.get("format") != _CHECKPOINT_FORMAT:
+            msg = f"{path} is not an easybo model checkpoint"
+            logger.error(msg)
+            raise ValueError(msg)
+        if checkpoint["version"] > _CHECKPOINT_VERSION:
+            msg = (
+                f"{path} has checkpoint version {checkpoint['version']}, but "
+                f"at most version {_CHECKPOINT_VERSION} is supported"
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+
+        klass = _find_subclass(cls, checkpoint["class"])
+        if klass is None:
+            msg = (
+                f"{path} holds a model of class {checkpoint['class']}, which "
+                f"is not a subclass of {cls.__name__}"
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+
+        objects = dict()
+        if any(key not in kwargs for key in checkpoint["object_keys"]):
+            blob = checkpoint["objects"].numpy().tobytes()
+            objects = _torch_load(io.BytesIO(blob), weights_only=False)
+            objects = {
+                key: value
+                for key, value in objects.items()
+                if key not in kwargs
+            }
+
+        construction_kwargs = {
+            **checkpoint["options"],
+            **objects,
+            "precision": checkpoint["precision"],
+            **kwargs,
+        }
+        if device is not None:
+            construction_kwargs["device"] = device
+        new_model = klass(
+            train_x=checkpoint["train_x"],
+            train_y=checkpoint["train_y"],
+            **construction_kwargs,
+        )
+
+        # The training tensors are restored as stored, rather than being
+        # transformed again, which would refit the transforms to the data
+        model = new_model._model
+        model.load_state_dict(checkpoint["state_dict"])
+        dtype, device = new_model.dtype, model.train_targets.device
+        new_model._set_transformed_train_data(
+            checkpoint["train_x"],
+            checkpoint["train_inputs"].to(device=device, dtype=dtype),
+            checkpoint["train_targets"].to(device=device, dtype=dtype),
+        )
+
+        new_model._training_state_successful = checkpoint[
+            "training_state_successful"
+        ]
+        new_model._observations_since_refit = checkpoint[
+            "observations_since_refit"
+        ]
+        new_model._transforms_stale = checkpoint.get("transforms_stale", False)
+        if checkpoint["refit_policy"] is not None:
+            new_model._refit_policy = RefitPolicy(**checkpoint["refit_policy"])
+        if "L_inv" in checkpoint:
+            new_model._training_factor = (
+                InverseCholesky(
+                    checkpoint["L_inv"].to(device=device, dtype=dtype)
+                ),
+                checkpoint["alpha"].to(device=device, dtype=dtype),
+            )
+
+        logger.debug("Loaded {} from {}", checkpoint["class"], path)
+        return new_model
+
+    def _set_transformed_train_data(self, train_x, inputs, targets):
+        """Sets already transformed training data, and puts the model in
+        eval mode without letting botorch transform the inputs again, which
+        would refit the transforms to the data.
+
+        Parameters
+        ----------
+        train_x : array_like
+            The untransformed training inputs.
+        inputs, targets : torch.Tensor
+            The transformed training inputs and targets.
+        """
+
+        model = self._model
+        if hasattr(model, "input_transform"):
+            model._original_train_inputs = self.x_to_tensor(train_x)
+            model._has_transformed_inputs = True
+        model.set_train_data(inputs, targets, strict=False)
+        model.eval()
+
     def x_to_tensor(self, x):
         """Executes a forward transformation of some sort on the input data.
-        This defaults to a simple conversion to a float32 tensor and placing
-        that object on the correct device.
+        This defaults to a conversion to a tensor of the model's dtype on the
+        model's device, which avoids copying the data when possible.
 
         Parameters
         ----------
@@ -88,12 +842,12 @@ class EasyGP:
         torch.tensor
         """
 
-        return _to_float32_tensor(x, device=self.device)
+        return _to_tensor(x, device=self.device, dtype=self.dtype)
 
     def y_to_tensor(self, y):
         """Executes a forward transformation of some sort on the output data.
-        This defaults to a simple conversion to a float32 tensor and placing
-        that object on the correct device.
+        This defaults to a conversion to a tensor of the model's dtype on the
+        model's device, which avoids copying the data when possible.
 
         Parameters
         ----------
@@ -104,7 +858,37 @@ class EasyGP:
         torch.tensor
         """
 
-        return _to_float32_tensor(y, device=self.device)
+        return _to_tensor(y, device=self.device, dtype=self.dtype)
+
+    @property
+    def refit_policy(self):
+        """The :class:`RefitPolicy` used by ``train_`` and ``tell``. If None,
+        ``tell(..., retrain=True)`` refits on every call and ``train_`` runs
+        ``fit_gpytorch_mll`` without any budget. The policy is inherited by
+        the models returned by ``tell``.
+
+        Returns
+        -------
+        RefitPolicy
+        """
+
+        return self._refit_policy
+
+    @refit_policy.setter
+    def refit_policy(self, refit_policy):
+        self._refit_policy = refit_policy
+
+    @property
+    def prediction_cache(self):
+        """The :class:`PredictionCache` holding the results of recent calls to
+        ``predict``, including its hit and miss counters.
+
+        Returns
+        -------
+        PredictionCache
+        """
+
+        return self._prediction_cache
 
     @property
     def device(self):
@@ -130,7 +914,8 @@ class EasyGP:
 
         self._model.to(device)
         self._device = device
-        logger.debug(f"Model sent to {device}")
+        self._reset_training_factor()
+        logger.debug("Model sent to {}", device)
 
     @property
     def likelihood(self):
@@ -162,23 +947,53 @@ class EasyGP:
             x = self._model.input_transform.untransform(x)
         return x
 
+    def _get_stored_train_data(self):
+        """The training inputs and targets, as stored by the model."""
+
+        return self._model.train_inputs[0], self._model.train_targets
+
+    def _get_cached_train_data(self, name, compute):
+        """Computes the untransformed training data ``name`` as a read-only
+        array, once per version of the stored training tensors. ``tell``
+        replaces these tensors, in-place changes bump their version counters,
+        and ``train_``, which can refit the transforms, clears the cache."""
+
+        x, y = self._get_stored_train_data()
+        key = (x._version, y._version, self._model.training)
+        cached = self._train_data_cache.get(name)
+        if cached is not None:
+            cached_x, cached_y, cached_key, array = cached
+            if cached_x is x and cached_y is y and cached_key == key:
+                return array
+
+        array = compute().detach().cpu().numpy()
+        array.flags.writeable = False
+        self._train_data_cache[name] = (x, y, key, array)
+        return array
+
     @property
     def train_x(self):
         """The training inputs. Should be of shape ``N_train x d_in``. This
         also unscales the data if the ``input_transform`` attribute is present
-        in the model.
+        in the model. The array is read-only: it is computed once and cached
+        until the training data or the transforms change.
 
         Returns
         -------
         numpy.ndarray
         """
 
+        if self._store is not None:
+            return self._get_store_rows("x")
+
         # github.com/pytorch/botorch/issues/1435#issuecomment-1274974582
         t = self._model.training
-        return self._get_current_train_x(untransform=not t).detach().numpy()
+        return self._get_cached_train_data(
+            "x", lambda: self._get_current_train_x(untransform=not t)
+        )
 
     def _get_current_train_y(self, untransform=False):
-        y = deepcopy(self._model.train_targets.reshape(-1, 1))
+        y = deepcopy(self._model.train_targets.unsqueeze(-1))
         if untransform and hasattr(self._model, "outcome_transform"):
             y, _ = self._model.outcome_transform.untransform(y)
         return y
@@ -188,14 +1003,140 @@ class EasyGP:
         """The training targets. Should be of shape ``N_train x d_out``. Note
         that for classification, these should be one-hot encoded, e.g.
         ``np.array([0, 1, 2, 1, 2, 0, 0])``. This also unscales the data if
-        the ``outcomes_transform`` attribute is present in the model.
+        the ``outcomes_transform`` attribute is present in the model. The
+        array is read-only: it is computed once and cached until the training
+        data or the transforms change.
 
         Returns
         -------
         numpy.ndarray
         """
 
-        return self._get_current_train_y(untransform=True).detach().numpy()
+        if self._store is not None:
+            return self._get_store_rows("y")
+
+        return self._get_cached_train_data(
+            "y", lambda: self._get_current_train_y(untransform=True)
+        )
+
+    @property
+    def store(self):
+        """The :class:`easybo.store.ObservationStore` backing the model, if
+        any (see :meth:`attach_store`).
+
+        Returns
+        -------
+        ObservationStore or None
+        """
+
+        return self._store
+
+    def attach_store(self, store, *, retrain=False):
+        """Backs the model by an append-only observation store. From then
+        on, ``tell`` appends the new observations to the store once the
+        model has been conditioned on them, the models it returns share the
+        store, and ``train_x`` and ``train_y`` are read-only views of the
+        store, without any copy. Each model keeps track of the rows of the
+        store holding its training data, so that several models can be told
+        different observations from the same parent.
+
+        An empty store is filled with the training data of the model.
+        Otherwise, the training data of the model must be the first
+        observations of the store, and the model is conditioned on the
+        remaining ones, e.g. to recover from a crash with a model restored by
+        :meth:`load` from an older checkpoint.
+
+        Parameters
+        ----------
+        store : easybo.store.ObservationStore
+        retrain : bool, optional
+            Whether to retrain when conditioning on the observations of the
+            store which the model does not know yet.
+
+        Returns
+        -------
+        EasyGP
+            The model backed by the store, which is this model unless it had
+            to be conditioned on new observations.
+
+        Raises
+        ------
+        ValueError
+            If the training data of the model is not the beginning of the
+            store.
+        """
+
+        if self._get_output_batch_shape() != torch.Size([]):
+            msg = "Batched models cannot be backed by an observation store"
+            logger.error(msg)
+            raise NotImplementedError(msg)
+
+        self._store = None
+        train_x, train_y = self.train_x, self.train_y
+        N = len(train_x)
+        if len(store) == 0:
+            store.append(train_x, train_y)
+        elif (
+            len(store) < N
+            or not np.allclose(store.x[:N], train_x)
+            or not np.allclose(store.y[:N], train_y)
+        ):
+            msg = (
+                f"The training data of the model is not the beginning of the "
+                f"observation store at {store.path}"
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+
+        model = self
+        if len(store) > N:
+            logger.info(
+                f"Conditioning on {len(store) - N} observations replayed "
+                f"from {store.path}"
+            )
+            model = self.tell(
+                new_x=store.x[N:], new_y=store.y[N:], retrain=retrain
+            )
+        model._store = store
+        model._store_rows = slice(0, len(store))
+        return model
+
+    def _get_store_rows(self, name):
+        """The rows of the store holding the training data of the model: a
+        view of the store when they are contiguous, which is the case unless
+        the model was told observations from a parent which had already been
+        told others, and a read-only copy otherwise."""
+
+        array = getattr(self._store, name)[self._store_rows]
+        array.flags.writeable = False
+        return array
+
+    def _append_to_store(self, new_model, new_x, new_y, metadata):
+        """Appends told observations to the store, if any, once
+        ``new_model`` has been successfully conditioned on them, so that a
+        failed ``tell`` leaves the store untouched, and records the rows of
+        the training data of ``new_model``."""
+
+        if self._store is None:
+            return
+
+        rows = self._store.append(
+            new_x.detach().cpu().numpy(),
+            new_y.detach().cpu().numpy(),
+            metadata=metadata,
+        )
+        old_rows = self._store_rows
+        if isinstance(old_rows, slice) and old_rows.stop == rows.start:
+            new_rows = slice(old_rows.start, rows.stop)
+        else:
+            new_rows = np.concatenate(
+                [
+                    np.arange(rows.start)[old_rows],
+                    np.arange(rows.start, rows.stop),
+                ]
+            )
+        new_model._store = self._store
+        new_model._store_rows = new_rows
 
     def _get_training_debug_information(self, model=None):
         if model is None:
@@ -218,56 +1159,321 @@ class EasyGP:
 
         return info
 
-    def _log_training_debug_information(self, model=None):
+    def _format_training_debug_information(self, model=None):
         info = self._get_training_debug_information(model=model)
-        for p in info["hyperparameters"]:
-            logger.debug(p)
+        lines = list(info["hyperparameters"])
 
         # Ensure we include the proper transforms
         if "input_transform" in info.keys():
-            logger.debug(f"INP TRANSFORM: {info['input_transform']}")
+            lines.append(f"INP TRANSFORM: {info['input_transform']}")
         if "outcome_transform" in info.keys():
-            logger.debug(f"OUT TRANSFORM: {info['outcome_transform']}")
+            lines.append(f"OUT TRANSFORM: {info['outcome_transform']}")
+        return "\n".join(lines)
+
+    def _log_training_debug_information(self, model=None):
+        # Stringifying every parameter is expensive, so it is deferred until
+        # a debug handler actually needs the message
+        logger.opt(lazy=True).debug(
+            "{}", lambda: self._format_training_debug_information(model)
+        )
+
+    def _get_prediction_model(self):
+        """The botorch model used for predictions, in eval mode. This is the
+        model itself, except in mixed precision, where it is a float32 copy
+        of the model which reuses the float64 factorization of the training
+        covariance."""
+
+        # Pin the factorization of the training covariance, so that every
+        # posterior reuses the same solve regardless of gpytorch's caching
+        supported = self._supports_incremental_updates()
+        if supported:
+            factor, alpha = self._get_training_factor()
+
+        if self.prediction_dtype == self._dtype:
+            self._model.eval()
+            self._model.likelihood.eval()
+            return self._model
+
+        if self._prediction_model is None:
+            model = deepcopy(self._model)
+            model.train()
+            model.to(dtype=self.prediction_dtype)
+            model.eval()
+            if supported:
+                with torch.no_grad():
+                    train_prior = model.forward(model.train_inputs[0])
+                self._install_prediction_strategy(
+                    model, train_prior, factor, alpha
+                )
+            self._prediction_model = model
 
-    def _get_posterior(self, grid, observation_noise=True):
+        return self._prediction_model
 
-        self._model.eval()
-        self._model.likelihood.eval()
+    def _get_posterior(
+        self, grid, observation_noise=True, full_precision=False
+    ):
+        if full_precision:
+            model = self._model
+            if self._supports_incremental_updates():
+                self._get_training_factor()
+            model.eval()
+            model.likelihood.eval()
+            dtype = self._dtype
+        else:
+            model = self._get_prediction_model()
+            dtype = self.prediction_dtype
 
-        grid = _to_float32_tensor(grid, device=self.device)
+        grid = self.x_to_tensor(grid).to(dtype)
 
         with torch.no_grad(), gpytorch.settings.fast_pred_var():
-            return self._model.posterior(
-                grid, observation_noise=observation_noise
-            )
+            return model.posterior(grid, observation_noise=observation_noise)
 
-    def nlpd(self, train_x=None, train_y=None):
-        """Gets the negative log predictive density of the model.
+    def _get_output_batch_shape(self):
+        """The batch shape of the predictions, which is empty unless the
+        model is batched."""
 
-        Parameters
-        ----------
-        train_x : None, array_like
-            If None, uses ``self.train_x``.
-        train_y : None, array_like
-            If None, uses ``self.train_y``.
+        return self._model.train_targets.shape[:-1]
+
+    def _get_train_inputs_shape(self):
+        return self._model.train_inputs[0].shape
+
+    def _metrics_fields(self):
+        """Fields describing this model in :mod:`easybo.metrics` records."""
+
+        shape = self._get_train_inputs_shape()
+        return {
+            "model": self.__class__.__name__,
+            "N": shape[-2],
+            "d": shape[-1],
+            "precision": self._precision,
+        }
+
+    def _uses_structured_kernel_interpolation(self):
+        """Whether the kernel of the model is interpolated from a grid."""
+
+        return any(
+            isinstance(module, gpytorch.kernels.GridInterpolationKernel)
+            for module in self._model.covar_module.modules()
+        )
+
+    def _supports_incremental_updates(self):
+        """Whether the exact posterior factorization of this model can be
+        cached and updated explicitly. This requires a single-output,
+        non-batched model with a homoskedastic Gaussian likelihood, and a
+        kernel without structure (a dense factorization would defeat
+        structured kernel interpolation)."""
+
+        return (
+            isinstance(
+                self._model.likelihood, gpytorch.likelihoods.GaussianLikelihood
+            )
+            and self._model.train_targets.dim() == 1
+            and not self._uses_structured_kernel_interpolation()
+        )
+
+    @staticmethod
+    def _install_prediction_strategy(model, train_prior, factor, mean_cache):
+        """Hands an explicitly computed factorization to gpytorch, so that
+        subsequent calls to ``model.posterior`` (including those made by
+        acquisition functions) reuse it instead of refactorizing. The factor
+        is cast to the dtype of the model, which differs from the dtype of
+        the factorization in mixed precision."""
+
+        dtype = model.train_targets.dtype
+        root_inv = factor.root_inv.to(dtype)
+        strategy = DefaultPredictionStrategy(
+            train_inputs=model.train_inputs,
+            train_prior_dist=train_prior,
+            train_labels=model.train_targets,
+            likelihood=model.likelihood,
+            inv_root=root_inv,
+        )
+        add_to_cache(strategy, "mean_cache", mean_cache.to(dtype))
+        add_to_cache(strategy, "covar_cache", root_inv)
+        model.prediction_strategy = strategy
+
+    def _get_training_factor(self):
+        """Gets the cached factorization of the (transformed) training
+        covariance, ``K(X, X) + sigma^2 I``, and the corresponding mean cache
+        ``alpha = (K(X, X) + sigma^2 I)^{-1} (y - m(X))``. These are computed
+        once, O(N^3), and reused until the hyperparameters change. They
+        always have the dtype of the model, even in mixed precision.
+
+        Returns
+        -------
+        tuple
+            The :class:`easybo.linalg.InverseCholesky` factor and ``alpha``.
         """
 
-        if train_x is None:
-            train_x = self.train_x
-        train_x = _to_float32_tensor(train_x)
+        model = self._model
+        model.eval()
+        train_x = model.train_inputs[0]
 
-        if train_y is None:
-            train_y = self.train_y
-        train_y = _to_float32_tensor(train_y)
+        if self._training_factor is None:
+            with torch.no_grad():
+                train_prior = model.forward(train_x)
+                K = model.likelihood(train_prior).covariance_matrix
+                factor = InverseCholesky.from_matrix(K)
+                alpha = factor.solve(model.train_targets - train_prior.mean)
+            self._training_factor = (factor, alpha)
+
+        # gpytorch drops its prediction strategy whenever the model is put
+        # back into train mode
+        elif model.prediction_strategy is None:
+            with torch.no_grad():
+                train_prior = model.forward(train_x)
+            factor, alpha = self._training_factor
+
+        else:
+            return self._training_factor
 
-        posterior = self._get_posterior(train_x, observation_noise=True)
+        self._install_prediction_strategy(model, train_prior, factor, alpha)
+        return self._training_factor
+
+    def nlpd(self, train_x=None, train_y=None):
+        """Gets the negative log predictive density of the model.
+
+        Parameters
+        ----------
+        train_x : None, array_like
+            If None, uses ``self.train_x``.
+        train_y : None, array_like
+            If None, uses ``self.train_y``.
+        """
+
+        train_x, train_y = self._get_nlpd_data(train_x, train_y)
+
+        # The log determinant requires another Cholesky factorization, which
+        # is kept in full precision in mixed precision
+        posterior = self._get_posterior(
+            train_x, observation_noise=True, full_precision=True
+        )
         try:
             _nlpd = -posterior.mvn.log_prob(train_y.squeeze()).item()
         except NotPSDError:
-            _nlpd = 0
+            logger.warning(_NOT_PSD_WARNING_MESSAGE_NLPD)
+            _nlpd = float("inf")
         return _nlpd
 
+    def _get_nlpd_data(self, train_x, train_y):
+        """The data of :meth:`nlpd` as tensors. The training data defaults
+        to the (untransformed) training tensors of the model, without a
+        round trip through ``numpy``."""
+
+        if train_x is None:
+            train_x = self._get_current_train_x(
+                untransform=not self._model.training
+            )
+        train_x = self.x_to_tensor(train_x)
+
+        if train_y is None:
+            train_y = self._get_current_train_y(untransform=True)
+        train_y = self.y_to_tensor(train_y)
+
+        return train_x, train_y
+
+    def diagnostics(self):
+        """Leave-one-out cross-validation (LOO-CV) diagnostics of the model,
+        with fixed hyperparameters. The predictive distribution of every
+        training target given all of the others follows in closed form from
+        the cached factorization of ``K = K(X, X) + sigma^2 I`` (Rasmussen
+        and Williams, "Gaussian Processes for Machine Learning", 2006,
+        Sec. 5.4.2),
+
+        .. math::
+
+            \\mu_{-i} = y_i - \\alpha_i / [K^{-1}]_{ii}, \\quad
+            \\sigma^2_{-i} = 1 / [K^{-1}]_{ii},
+
+        with :math:`\\alpha = K^{-1} (y - m)`. This costs O(N^2) on top of
+        the factorization, which is reused by predictions, instead of N
+        refits.
+
+        Returns
+        -------
+        dict
+            ``"mean"`` and ``"variance"``, the LOO predictive means and
+            variances (including the observation noise),
+            ``"standardized_residuals"``, ``(y - mean) / sqrt(variance)``,
+            and ``"nlpd"``, the negative log LOO predictive density of every
+            target, as ``numpy.ndarray`` of length ``N`` in the units of the
+            training targets. ``"total_nlpd"`` is the sum of ``"nlpd"``.
+
+        Raises
+        ------
+        NotImplementedError
+            If the model is not an exact, single-output model with a
+            Gaussian likelihood.
+        """
+
+        if not self._supports_incremental_updates():
+            msg = (
+                "diagnostics requires an exact, single-output model with a "
+                "Gaussian likelihood and without structured kernel "
+                "interpolation"
+            )
+            logger.error(msg)
+            raise NotImplementedError(msg)
+
+        mean, variance, standardized_residuals = self._get_loo_predictions()
+        with torch.no_grad():
+            if hasattr(self._model, "outcome_transform"):
+                mean, variance = self._model.outcome_transform.untransform(
+                    mean.unsqueeze(-1), variance.unsqueeze(-1)
+                )
+                mean, variance = mean.squeeze(-1), variance.squeeze(-1)
+
+            nlpd = 0.5 * (
+                torch.log(2.0 * np.pi * variance) + standardized_residuals**2
+            )
+
+        return {
+            "mean": mean.cpu().numpy(),
+            "variance": variance.cpu().numpy(),
+            "standardized_residuals": standardized_residuals.cpu().numpy(),
+            "nlpd": nlpd.cpu().numpy(),
+            "total_nlpd": nlpd.sum().item(),
+        }
+
+    def _get_loo_predictions(self):
+        """The LOO-CV predictive means and variances of :meth:`diagnostics`,
+        and the standardized residuals, in the transformed space of the
+        training targets."""
+
+        factor, alpha = self._get_training_factor()
+        with torch.no_grad():
+            inv_diag = factor.inv_diag()
+            variance = 1.0 / inv_diag
+            mean = self._model.train_targets - alpha / inv_diag
+            standardized_residuals = alpha / inv_diag.sqrt()
+        return mean, variance, standardized_residuals
+
+    def _get_health_nlpd(self):
+        """The NLPD checked by :meth:`train_`, and the threshold above which
+        the fit is considered failed. This is the mean LOO-CV NLPD per point
+        of the transformed targets if available, which reuses the
+        factorization needed by predictions and does not depend on the
+        scale of the targets, and otherwise :meth:`nlpd`.
+
+        Returns
+        -------
+        float or numpy.ndarray, float
+        """
+
+        if not self._supports_incremental_updates():
+            return self.nlpd(), _NLPD_HEALTH_THRESHOLD
+        try:
+            _, variance, standardized_residuals = self._get_loo_predictions()
+        except NotPSDError:
+            logger.warning(_NOT_PSD_WARNING_MESSAGE_NLPD)
+            return float("inf"), _LOO_NLPD_HEALTH_THRESHOLD
+        nlpd = 0.5 * (
+            torch.log(2.0 * np.pi * variance) + standardized_residuals**2
+        )
+        return nlpd.mean().item(), _LOO_NLPD_HEALTH_THRESHOLD
+
     @_log_warnings
+    @instrument("train_")
     def train_(
         self,
         *,
@@ -275,11 +1481,16 @@ class EasyGP:
         optimizer_kwargs=None,
         log_error_on_fail=False,
         terminate_on_fail=False,
+        refit_policy=None,
         **kwargs,
     ):
         """Trains model. This is a lightweight wrapper for ``botorch``'s
         ``fit_gpytorch_mll`` function. It simply initializes an
         exact marginal log likelihood and uses that to train the model.
+        Training always starts from the current hyperparameters. If the
+        model was told observations incrementally since it was last trained,
+        the input and outcome transforms are first refit on the full training
+        data.
 
         Parameters
         ----------
@@ -287,11 +1498,45 @@ class EasyGP:
             The optimizer to use to train the GP.
         optimizer_kwargs : dict, optional
             Keyword arguments to pass to the optimizer.
+        refit_policy : RefitPolicy, optional
+            Overrides :meth:`refit_policy` for this call. If a policy is set
+            and no ``optimizer`` is provided, the fit is budgeted via
+            :func:`fit_gpytorch_scipy_budgeted`.
         **kwargs
             Extra keyword arguments to pass to ``fit_gpytorch_mll``.
         """
 
         self._training_state_successful = True
+        self._reset_training_factor()
+        if self._transforms_stale:
+            self._refit_transforms()
+
+        if refit_policy is None:
+            refit_policy = self._refit_policy
+        if refit_policy is not None:
+            if optimizer is None:
+                optimizer = fit_gpytorch_scipy_budgeted
+                optimizer_kwargs = {
+                    **refit_policy.optimizer_kwargs(),
+                    **(optimizer_kwargs or dict()),
+                }
+            if refit_policy.max_attempts is not None:
+                kwargs.setdefault("max_attempts", refit_policy.max_attempts)
+            logger.debug("Training with {}", refit_policy)
+
+        # Structured kernel interpolation relies on iterative solves and
+        # stochastic log determinants, which botorch disables by default. The
+        # probe vectors are then kept fixed, so that L-BFGS-B optimizes a
+        # deterministic objective.
+        ski = self._uses_structured_kernel_interpolation()
+        if ski and optimizer in [None, fit_gpytorch_scipy_budgeted]:
+            optimizer_kwargs = {
+                "approx_mll": True,
+                "scipy_objective": _fixed_probe_objective(
+                    _scipy_objective_and_grad
+                ),
+                **(optimizer_kwargs or {}),
+            }
 
         logger.debug("------- PARAMETER INFO BEFORE TRAINING -------")
         self._log_training_debug_information()
@@ -300,6 +1545,12 @@ class EasyGP:
             likelihood=self._model.likelihood, model=self._model
         )
 
+        # Every fit attempt is recorded for the metrics
+        infos = []
+        optimizer = _recording_optimizer(
+            optimizer or fit_gpytorch_scipy, infos
+        )
+
         try:
             with Timer() as timer:
                 fit_gpytorch_mll(
@@ -310,30 +1561,28 @@ class EasyGP:
                 )
 
         except ModelFittingError:
-            self._training_state_successful = False
-
-            if log_error_on_fail:
-                logger.exception(_TRAINING_ERROR_MESSAGE)
-            else:
-                logger.warning(_TRAINING_ERROR_MESSAGE)
-
-            if terminate_on_fail:
-                if not log_error_on_fail:
-                    logger.exception(_TRAINING_ERROR_MESSAGE)
-
-                logger.critical("terminate_on_fail is True, throwing error")
-                raise ModelFittingError
+            self._on_training_error(log_error_on_fail, terminate_on_fail)
 
         logger.debug("------- PARAMETER INFO AFTER TRAINING -------")
         self._log_training_debug_information()
 
+        annotate(
+            fit_time=timer.seconds,
+            attempts=len(infos),
+            restarts=max(len(infos) - 1, 0),
+            iterations=sum(_num_iterations(info) for info in infos),
+        )
+
         if self._training_state_successful:
-            nlpd = self.nlpd()
-            if nlpd > 100.0:
+            # For batched models, the health check uses the worst member
+            nlpd, threshold = self._get_health_nlpd()
+            nlpd = np.max(nlpd)
+            annotate(nlpd=float(nlpd))
+            if nlpd > threshold:
                 self._training_state_successful = False
                 logger.info(f"Model fit in {timer.dt:.01f} {timer.units}")
                 training_info = self._get_training_debug_information()
-                logger.warning(_TRAINING_WARNING_MESSAGE_NLPD(nlpd))
+                logger.warning(_TRAINING_WARNING_MESSAGE_NLPD(nlpd, threshold))
                 logger.info(f"model parameters: {training_info}")
                 if terminate_on_fail:
                     logger.critical(
@@ -341,6 +1590,8 @@ class EasyGP:
                     )
                     raise NLPDModelFittingError
             else:
+                # Only a healthy fit counts as a refit for the RefitPolicy
+                self._observations_since_refit = 0
                 xshape = list(self._get_current_train_x().shape)
                 yshape = list(self._get_current_train_y().shape)
                 check = ""  # "\u2705"
@@ -348,51 +1599,230 @@ class EasyGP:
                     f"{check} Model fit on data, shapes: {xshape} -> {yshape} "
                     f"in {timer.dt:.01f} {timer.units}, NLPD: {nlpd:.02f}"
                 )
+        annotate(success=self._training_state_successful)
+
+    def _on_training_error(self, log_error_on_fail, terminate_on_fail):
+        """Handles a failed fit, from within the ``except`` clause which
+        caught the error: marks the training as failed, logs it and, if
+        ``terminate_on_fail``, raises a ``ModelFittingError``."""
+
+        self._training_state_successful = False
+
+        if log_error_on_fail:
+            logger.exception(_TRAINING_ERROR_MESSAGE)
+        else:
+            logger.warning(_TRAINING_ERROR_MESSAGE)
+
+        if terminate_on_fail:
+            if not log_error_on_fail:
+                logger.exception(_TRAINING_ERROR_MESSAGE)
+
+            logger.critical("terminate_on_fail is True, throwing error")
+            raise ModelFittingError
+
+    def predict_iter(self, *, grid, chunk_size=4096, observation_noise=True):
+        """Streams inference over ``grid`` in blocks of at most
+        ``chunk_size`` points. Only one block of the posterior is ever held
+        in memory, which makes this suitable for very large grids. The grid
+        itself can be e.g. a ``numpy.memmap``, since it is only ever sliced.
+
+        Parameters
+        ----------
+        grid : array_like
+            The grid on which to perform inference.
+        chunk_size : int, optional
+            The maximum number of grid points per block.
+        observation_noise : bool, optional
+            Whether to include the observation noise in the variance.
+
+        Yields
+        ------
+        tuple
+            A ``slice`` of the grid and the mean and standard deviation of the
+            posterior on that slice, as ``numpy.ndarray``. For a batch of
+            models, the arrays have shape ``batch x len(slice)``.
+        """
+
+        for start in range(0, len(grid), chunk_size):
+            block = slice(start, min(start + chunk_size, len(grid)))
+            posterior = self._get_posterior(
+                grid[block], observation_noise=observation_noise
+            )
+            mean = posterior.mean.detach().cpu().numpy().squeeze(-1)
+            var = posterior.variance.detach().cpu().numpy().squeeze(-1)
+            del posterior
+            yield block, mean, np.sqrt(var)
 
     @_log_warnings
-    def predict(self, *, grid, observation_noise=True):
-        """Runs inference on the model in eval mode.
+    @instrument("predict")
+    def predict(
+        self,
+        *,
+        grid,
+        observation_noise=True,
+        chunk_size=None,
+        out=None,
+        return_posterior=False,
+        use_cache=True,
+    ):
+        """Runs inference on the model in eval mode. Results are memoized in
+        :meth:`prediction_cache`, so repeated calls on the same grid are
+        essentially free until the model is retrained.
 
         Parameters
         ----------
         grid : array_like
             The grid on which to perform inference.
+        observation_noise : bool, optional
+            Whether to include the observation noise in the variance.
+        chunk_size : int, optional
+            If provided, inference is performed in blocks of at most this
+            many grid points (see :meth:`predict_iter`), which are written
+            into preallocated arrays. This bounds the peak memory regardless
+            of the size of the grid.
+        out : dict, optional
+            Preallocated output buffers (e.g. ``numpy.memmap``) of length
+            ``len(grid)`` (or shape ``batch x len(grid)`` for a batch of
+            models), keyed by ``"mean"`` and ``"std"``, and optionally
+            ``"mean+2std"`` and ``"mean-2std"``. If provided, results are
+            written directly into them, and the ``"mean+2std"`` and
+            ``"mean-2std"`` bands are only computed and returned if they
+            have a buffer.
+        return_posterior : bool, optional
+            If True, also returns the posterior on the full grid. In this
+            case, ``chunk_size`` is ignored.
+        use_cache : bool, optional
+            If True, results are looked up in and stored to
+            :meth:`prediction_cache`. The cache is never used when
+            ``return_posterior`` is True, ``chunk_size`` or ``out`` is
+            provided, or the grid has more points than the
+            ``max_grid_size`` of the cache.
 
         Returns
         -------
         dict
             A dictionary with the following keys:
             - ``"mean"``: the mean of the posterior on the provided ``grid``.
-            - ``"mean+2sigma"``: the mean of the posterior on the provided
+            - ``"std"``: the standard deviation of the posterior on the
+            provided ``grid``.
+            - ``"mean+2std"``: the mean of the posterior on the provided
             ``grid``, plus 2 x one standard deviation.
-            - ``"mean-2sigma"``: the mean of the posterior on the provided
+            - ``"mean-2std"``: the mean of the posterior on the provided
             ``grid``, minus 2 x one standard deviation.
-            - ``"posterior"``: the result of calling the model posterior
-            on the grid, can be used for further debugging/inference.
+            - ``"posterior"``: only if ``return_posterior`` is True, the
+            result of calling the model posterior on the grid, can be used
+            for further debugging/inference.
         """
 
-        posterior = self._get_posterior(
-            grid, observation_noise=observation_noise
+        if not self._training_state_successful:
+            logger.warning(_TRAINING_WARN_MESSAGE)
+
+        annotate(grid_size=len(grid), chunk_size=chunk_size, cache_hit=False)
+        use_cache = (
+            use_cache
+            and not return_posterior
+            and chunk_size is None
+            and out is None
+            and len(grid) <= self._prediction_cache.max_grid_size
         )
+        if use_cache:
+            key = PredictionCache.fingerprint(
+                grid, observation_noise=observation_noise
+            )
+            result = self._prediction_cache.get(key)
+            if result is not None:
+                annotate(cache_hit=True)
+                return result
+
+        if return_posterior or chunk_size is None:
+            chunk_size = max(len(grid), 1)
+
+        if out is None:
+            shape = (*self._get_output_batch_shape(), len(grid))
+            dtype = torch.empty(0, dtype=self.prediction_dtype).numpy().dtype
+            out = {
+                name: np.empty(shape, dtype=dtype)
+                for name in ["mean", "std", "mean+2std", "mean-2std"]
+            }
 
-        mean = posterior.mean.detach().numpy().squeeze()
-        std = np.sqrt(posterior.variance.detach().numpy().squeeze())
+        # The bands are written block by block, like the mean and std
+        bands = {
+            name: scale
+            for name, scale in [("mean+2std", 2.0), ("mean-2std", -2.0)]
+            if name in out
+        }
 
-        if not self._training_state_successful:
-            logger.warning(_TRAINING_WARN_MESSAGE)
+        def write(block, block_mean, block_std):
+            out["mean"][..., block] = block_mean
+            out["std"][..., block] = block_std
+            for name, scale in bands.items():
+                out[name][..., block] = block_mean + scale * block_std
 
-        return {
-            "mean": mean,
-            "std": std,
-            "mean+2std": mean + 2.0 * std,
-            "mean-2std": mean - 2.0 * std,
-            "posterior": posterior,
+        if return_posterior:
+            posterior = self._get_posterior(
+                grid, observation_noise=observation_noise
+            )
+            write(
+                slice(None),
+                posterior.mean.detach().cpu().numpy().squeeze(-1),
+                np.sqrt(posterior.variance.detach().cpu().numpy().squeeze(-1)),
+            )
+
+        else:
+            for block, block_mean, block_std in self.predict_iter(
+                grid=grid,
+                chunk_size=chunk_size,
+                observation_noise=observation_noise,
+            ):
+                write(block, block_mean, block_std)
+
+        result = {
+            name: out[name].squeeze() for name in ["mean", "std", *bands]
         }
+        if return_posterior:
+            result["posterior"] = posterior
+        if use_cache:
+            self._prediction_cache.put(key, result)
+        return result
 
     @_log_warnings
-    def sample(self, *, grid, samples=1, seed=None):
+    @instrument("sample")
+    def sample(
+        self,
+        *,
+        grid,
+        samples=1,
+        seed=None,
+        method="exact",
+        generator=None,
+        observation_noise=True,
+        chunk_size=4096,
+        num_features=1024,
+        rank=128,
+    ):
         """Samples from the provided model.
 
+        The ``"exact"`` method draws the samples jointly from the posterior
+        on the grid, which factorizes the G x G covariance for G grid points
+        in O(G^3) time and O(G^2) memory. The other methods never form this
+        covariance, use O(samples x G) memory for the result, and evaluate
+        the grid in chunks:
+
+        - ``"lanczos"``: joint samples from a low rank root of the posterior
+          covariance, in O(rank G^2) time (see
+          :func:`easybo.sampling.lanczos_samples`).
+        - ``"pathwise"``: samples of the prior, approximated by random
+          Fourier features, updated by pathwise conditioning, in
+          O(G (num_features + N)) time per sample (see
+          :class:`easybo.sampling.PathwiseSample`).
+        - ``"rff"``: Bayesian linear regression on random Fourier features,
+          in O(G num_features) time per sample, independently of N (see
+          :class:`easybo.sampling.WeightSpaceSample`).
+
+        The approximate methods require an exact, single-output model with
+        a Gaussian likelihood, and ``"pathwise"`` and ``"rff"`` an RBF or
+        Matern kernel.
+
         Parameters
         ----------
         grid : array_like
@@ -400,7 +1830,23 @@ class EasyGP:
         samples : int, optional
             Number of samples to draw.
         seed : None, optional
-            Seeds the random number generator via ``torch.manual_seed``.
+            Seeds a private random number generator. The global random number
+            generator of torch is left untouched. Ignored if ``generator`` is
+            provided.
+        method : {"exact", "lanczos", "pathwise", "rff"}, optional
+            The sampling method.
+        generator : torch.Generator, optional
+            The random number generator.
+        observation_noise : bool, optional
+            Whether the samples include the observation noise.
+        chunk_size : int, optional
+            The number of grid points evaluated at once by the approximate
+            methods.
+        num_features : int, optional
+            The number of random Fourier features of the ``"pathwise"`` and
+            ``"rff"`` methods.
+        rank : int, optional
+            The maximum rank of the ``"lanczos"`` method.
 
         Returns
         -------
@@ -408,21 +1854,129 @@ class EasyGP:
             The array of sampled data, of shape ``samples x len(grid)``.
         """
 
-        if seed is not None:
-            torch.manual_seed(seed)
-        posterior = self._get_posterior(grid)
-        sampled = posterior.sample(torch.Size([samples]))
-        return sampled.detach().numpy().reshape(samples, len(grid))
+        annotate(grid_size=len(grid), samples=samples, method=method)
+        sampled = self._draw_samples(
+            grid,
+            samples,
+            method=method,
+            generator=_get_generator(seed, generator),
+            observation_noise=observation_noise,
+            chunk_size=chunk_size,
+            num_features=num_features,
+            rank=rank,
+        )
+        return sampled.reshape(samples, len(grid))
+
+    def _draw_samples(
+        self,
+        grid,
+        samples,
+        *,
+        method,
+        generator,
+        observation_noise,
+        chunk_size,
+        num_features,
+        rank,
+    ):
+        """Draws samples with one of the methods of :meth:`sample`.
+
+        Returns
+        -------
+        numpy.ndarray
+            For the ``"exact"`` method, the samples of the posterior, of
+            shape ``samples x posterior.event_shape``, and otherwise of shape
+            ``samples x len(grid)``.
+        """
+
+        if method == "exact":
+            posterior = self._get_posterior(
+                grid, observation_noise=observation_noise
+            )
+            mean = posterior.mean
+            base_samples = torch.randn(
+                samples,
+                *posterior.event_shape,
+                generator=generator,
+                dtype=mean.dtype,
+            ).to(mean.device)
+            with torch.no_grad():
+                sampled = posterior.rsample(
+                    torch.Size([samples]), base_samples=base_samples
+                )
+            return sampled.detach().cpu().numpy()
+
+        if method not in ["lanczos", "pathwise", "rff"]:
+            msg = (
+                f"Unknown sampling method {method}, expected one of exact, "
+                "lanczos, pathwise or rff"
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+
+        if not self._supports_incremental_updates():
+            msg = (
+                f"The {method} sampling method requires an exact, "
+                "single-output model with a Gaussian likelihood and without "
+                "structured kernel interpolation"
+            )
+            logger.error(msg)
+            raise NotImplementedError(msg)
+
+        factor, alpha = self._get_training_factor()
+        if method == "lanczos":
+            sampled = lanczos_samples(
+                self._model,
+                factor,
+                alpha,
+                grid,
+                samples,
+                rank=rank,
+                chunk_size=chunk_size,
+                observation_noise=observation_noise,
+                generator=generator,
+            )
+        else:
+            if method == "pathwise":
+                function = PathwiseSample(
+                    self._model,
+                    factor,
+                    num_features=num_features,
+                    samples=samples,
+                    generator=generator,
+                )
+            else:
+                function = WeightSpaceSample(
+                    self._model,
+                    num_features=num_features,
+                    samples=samples,
+                    generator=generator,
+                )
+            sampled = function(
+                grid,
+                chunk_size=chunk_size,
+                observation_noise=observation_noise,
+                generator=generator,
+            )
+        return sampled.T
 
     def _condition(self, new_x, new_y):
 
         # Concatenate all of the untransformed data together
         x = self._get_current_train_x(untransform=True)
-        logger.debug(f"old_x min max: {x.min(axis=0)} {x.max(axis=0)}")
-        x = torch.cat([x, new_x], axis=0)
+        logger.opt(lazy=True).debug(
+            "old_x min max: {} {}",
+            lambda: x.min(axis=0),
+            lambda: x.max(axis=0),
+        )
+        x = torch.cat([x, new_x], axis=-2)
         y = self._get_current_train_y(untransform=True)
-        logger.debug(f"old_y min max: {y.min(axis=0)} {y.max(axis=0)}")
-        y = torch.cat([y, new_y], axis=0)
+        logger.opt(lazy=True).debug(
+            "old_y min max: {} {}",
+            lambda: y.min(axis=0),
+            lambda: y.max(axis=0),
+        )
+        y = torch.cat([y, new_y], axis=-2)
 
         # Get the model's state dict. This contains all of the state
         # information, including the parameters of the transforms
@@ -435,7 +1989,7 @@ class EasyGP:
         kwargs["train_y"] = y
 
         # Initialize...
-        logger.debug(f"Initialzing new model with keys: {kwargs.keys()}")
+        logger.debug("Initialzing new model with keys: {}", kwargs.keys())
         new_model = self.__class__(**kwargs)
 
         # Old way -------------------------------------------------------------
@@ -461,11 +2015,97 @@ class EasyGP:
 
         # Set any attributes that are not kwargs
         new_model._training_state_successful = self._training_state_successful
+        new_model._refit_policy = self._refit_policy
+
+        return new_model
+
+    def _refit_transforms(self):
+        """Refits the input and outcome transforms, which incremental
+        updates keep fixed, on the full training data, by reconstructing the
+        model from it with the current hyperparameters."""
+
+        x = self._get_current_train_x(untransform=True)
+        y = self._get_current_train_y(untransform=True)
+        logger.debug("Refitting the transforms on {} observations", len(x))
+        self._model = self._condition(x[..., :0, :], y[..., :0, :])._model
+        self._reset_training_factor()
+        self._transforms_stale = False
+
+    def _condition_incremental(self, new_x, new_y):
+        """Conditions on new data while keeping the hyperparameters and the
+        input/outcome transforms fixed. The new rows are appended to the
+        cached posterior factorization in O(N^2 k) instead of refactorizing
+        the full training covariance."""
+
+        factor, _ = self._get_training_factor()
+        model = self._model
+
+        # In eval mode, train_inputs are stored transformed, and the
+        # transforms are frozen
+        train_x = model.train_inputs[0]
+        train_y = model.train_targets
+        with torch.no_grad():
+            x = model.transform_inputs(new_x)
+            y = new_y
+            if hasattr(model, "outcome_transform"):
+                y, _ = model.outcome_transform(new_y)
+            y = y.squeeze(-1)
+
+            cross = model.covar_module(train_x, x).to_dense()
+            block = model.likelihood(model.forward(x)).covariance_matrix
+            new_factor = factor.append(cross, block)
+
+        # Untransformed data, needed to revert the inputs in train mode and
+        # to reconstruct the model from scratch later on
+        old_x = model._original_train_inputs
+        if old_x is None:
+            old_x = train_x
+        old_y = self._get_current_train_y(untransform=True)
+
+        new_model = copy(self)
+        new_model._model = deepcopy(model)
+        new_model._prediction_cache = PredictionCache(
+            self._prediction_cache.maxsize,
+            self._prediction_cache.max_grid_size,
+        )
+        new_model._prediction_model = None
+        new_model._train_data_cache = dict()
+        new_model._initial_kwargs = {
+            **self._initial_kwargs,
+            "train_x": torch.cat([old_x, new_x], axis=0),
+            "train_y": torch.cat([old_y, new_y], axis=0),
+        }
+
+        m = new_model._model
+        if m._original_train_inputs is not None:
+            m._original_train_inputs = new_model._initial_kwargs["train_x"]
+        full_x = torch.cat([train_x, x], axis=0)
+        full_y = torch.cat([train_y, y], axis=0)
+        m.set_train_data(full_x, full_y, strict=False)
+
+        with torch.no_grad():
+            train_prior = m.forward(full_x)
+            alpha = new_factor.solve(full_y - train_prior.mean)
+
+        self._install_prediction_strategy(m, train_prior, new_factor, alpha)
+        new_model._training_factor = (new_factor, alpha)
+        transforms = ["input_transform", "outcome_transform"]
+        new_model._transforms_stale = any(hasattr(m, t) for t in transforms)
 
         return new_model
 
     @_log_warnings
-    def tell(self, *, new_x, new_y, retrain=True):
+    @instrument("tell")
+    def tell(
+        self,
+        *,
+        new_x,
+        new_y,
+        retrain=True,
+        incremental=True,
+        refit_policy=None,
+        metadata=None,
+    ):
         """Informs the GP about new data. This implicitly conditions the model
         on the new data but without modifying the previous model's
         hyperparameters.
@@ -486,6 +2126,23 @@ class EasyGP:
             The new target data.
         retrain : bool, optional
             If True, will automatically retrain via the ``train_`` method.
+            If a :class:`RefitPolicy` is in use, the retraining only happens
+            once the policy asks for it, and the new data is otherwise
+            conditioned on as if ``retrain`` were False.
+        incremental : bool, optional
+            Only used when ``retrain`` is False. If True (and the model
+            supports it), the new data is appended to the cached posterior
+            factorization with a rank-k Cholesky update, costing O(N^2 k)
+            instead of O(N^3). In this mode the input and outcome transforms
+            are kept fixed at their current values rather than being refit
+            on the concatenated data; they are refit on the full training
+            data the next time the model is trained (see :meth:`train_`).
+        refit_policy : RefitPolicy, optional
+            Overrides :meth:`refit_policy` for this call.
+        metadata : list, optional
+            The metadata of the new observations, stored in the
+            :meth:`store`, if any, once the model has been conditioned on
+            them.
 
         Returns
         -------
@@ -496,8 +2153,16 @@ class EasyGP:
         new_x = self.x_to_tensor(new_x)
         new_y = self.y_to_tensor(new_y)
 
-        logger.debug(f"new_x min max {new_x.min(axis=0)} {new_x.max(axis=0)}")
-        logger.debug(f"new_y min max {new_y.min(axis=0)} {new_y.max(axis=0)}")
+        logger.opt(lazy=True).debug(
+            "new_x min max {} {}",
+            lambda: new_x.min(axis=0),
+            lambda: new_x.max(axis=0),
+        )
+        logger.opt(lazy=True).debug(
+            "new_y min max {} {}",
+            lambda: new_y.min(axis=0),
+            lambda: new_y.max(axis=0),
+        )
 
         # try:
         #     self._model = self._model.condition_on_observations(new_x, new_y)
@@ -511,17 +2176,95 @@ class EasyGP:
         #     self.predict(grid=self.train_x)
         #     self._model = self._model.condition_on_observations(new_x, new_y)
 
-        # For why we do it this way, see:
-        # github.com/pytorch/botorch/issues/1435#issuecomment-1265803038
-        new_model = self._condition(new_x, new_y)
+        if refit_policy is None:
+            refit_policy = self._refit_policy
+        observations_since_refit = self._observations_since_refit + len(new_x)
+        if retrain and refit_policy is not None:
+            retrain = refit_policy.should_refit(observations_since_refit)
+            logger.debug(
+                "{} observations since last refit, retrain set to {}",
+                observations_since_refit,
+                retrain,
+            )
+
+        incremental = incremental and self._supports_incremental_updates()
+        annotate(
+            new_points=len(new_x),
+            retrain=bool(retrain),
+            incremental=bool(incremental and not retrain),
+        )
+        if not retrain and incremental:
+            new_model = self._condition_incremental(new_x, new_y)
+
+        else:
+            # For why we do it this way, see:
+            # github.com/pytorch/botorch/issues/1435#issuecomment-1265803038
+            new_model = self._condition(new_x, new_y)
+
+        new_model._observations_since_refit = observations_since_refit
 
         if retrain:
-            new_model.train_()
+            new_model.train_(refit_policy=refit_policy)
 
+        self._append_to_store(new_model, new_x, new_y, metadata)
         return new_model
 
     @_log_warnings
-    def dream(self, points_per_dimension=10, seed=123, **kwargs):
+    def sample_path(self, *, seed=None, num_features=1024):
+        """Draws a single sample of the posterior as a function, by pathwise
+        conditioning on random Fourier features of the prior (see
+        :mod:`easybo.sampling`). Unlike :meth:`sample`, which draws the
+        values of a sample jointly on a grid, in O(G^3) for G grid points,
+        the returned function can be evaluated at any points in
+        O(num_features + N) per point. The approximation error is of order
+        ``1 / sqrt(num_features)``.
+
+        Parameters
+        ----------
+        seed : int, optional
+            Seeds a private random number generator.
+        num_features : int, optional
+            The number of random Fourier features approximating the prior.
+
+        Returns
+        -------
+        easybo.sampling.PathwiseSample
+            A callable mapping inputs of shape ``n x d`` to values of shape
+            ``n x 1``.
+
+        Raises
+        ------
+        NotImplementedError
+            If the model is not an exact, single-output model with a
+            Gaussian likelihood and an RBF or Matern kernel.
+        """
+
+        if not self._supports_incremental_updates():
+            msg = (
+                "sample_path requires an exact, single-output model with a "
+                "Gaussian likelihood and without structured kernel "
+                "interpolation"
+            )
+            logger.error(msg)
+            raise NotImplementedError(msg)
+
+        factor, _ = self._get_training_factor()
+        return PathwiseSample(
+            self._model, factor, num_features=num_features, seed=seed
+        )
+
+    @_log_warnings
+    def dream(
+        self,
+        points_per_dimension=10,
+        seed=123,
+        *,
+        method="grid",
+        num_points=None,
+        num_features=1024,
+        retrain=True,
+        **kwargs,
+    ):
         """This is a simliar method to BoTorch's fantasize, but it's a bit
         simpler and is used for a specific purpose. This method returns a new
         instance of the :class:`EasyGP` (or its derived classes) which is
@@ -539,6 +2282,26 @@ class EasyGP:
             model.
         seed : int, optional
             The seed used during sample.
+        method : {"grid", "pathwise"}, optional
+            ``"grid"`` draws the sample jointly on the grid with
+            :meth:`sample`, which factorizes a grid-sized covariance matrix.
+            ``"pathwise"`` draws the sample as a function with
+            :meth:`sample_path`, and evaluates it on the training inputs of
+            the dream, which is far cheaper for large grids.
+        num_points : int, optional
+            Only with ``method="pathwise"``: if provided, the dream is
+            trained on this many scrambled Sobol points within the same
+            bounds, instead of on the ``points_per_dimension ** d`` points of
+            the grid.
+        num_features : int, optional
+            Only with ``method="pathwise"``: the number of random Fourier
+            features of the sample.
+        retrain : bool, optional
+            If False, the dream reuses the hyperparameters of this model
+            instead of being trained, which avoids the cost of training
+            many dreams. It then also reuses the input and outcome transforms
+            of this model, in whose normalized space the hyperparameters were
+            learned, and inherits its training state.
         **kwargs
             Keyword arguments for the training procedure.
 
@@ -549,30 +2312,105 @@ class EasyGP:
 
         # train_x is of shape N x dims
         # train_x.t is of shape dims x N
-        grids = [
-            np.linspace(xx.min(), xx.max(), points_per_dimension)
-            for xx in self.train_x.T
-        ]
-        coordinates = np.array([xx for xx in product(*grids)])
-
-        logger.debug(f"dreamed coordinates shape: {coordinates.shape}")
-
-        y = self.sample(grid=coordinates, samples=1, seed=seed).reshape(
-            -1, self.train_y.shape[1]
+        train_x = self.train_x
+        lower, upper = train_x.min(axis=0), train_x.max(axis=0)
+
+        if method == "pathwise" and num_points is not None:
+            bounds = torch.tensor(np.array([lower, upper]))
+            coordinates = (
+                draw_sobol_samples(bounds, n=num_points, q=1, seed=seed)
+                .squeeze(-2)
+                .numpy()
+            )
+        else:
+            grids = [
+                np.linspace(lo, hi, points_per_dimension)
+                for lo, hi in zip(lower, upper)
+            ]
+            coordinates = np.array([xx for xx in product(*grids)])
+
+        logger.debug("dreamed coordinates shape: {}", coordinates.shape)
+
+        if method == "grid":
+            y = self.sample(grid=coordinates, samples=1, seed=seed)
+        elif method == "pathwise":
+            path = self.sample_path(seed=seed, num_features=num_features)
+            y = path(coordinates)
+        else:
+            msg = f"Unknown dream method {method}, use 'grid' or 'pathwise'"
+            logger.error(msg)
+            raise ValueError(msg)
+        y = y.reshape(-1, self.train_y.shape[1])
+
+        initial_kwargs = deepcopy(self._initial_kwargs)
+        initial_kwargs["train_x"] = coordinates
+        initial_kwargs["train_y"] = y
+
+        new_model = self.__class__(**initial_kwargs)
+        if retrain:
+            new_model.train_(**kwargs)
+            return new_model
+
+        # The dreamed data is transformed with the transforms of this model,
+        # which the hyperparameters are only meaningful with
+        model = new_model._model
+        model.load_state_dict(self._model.state_dict())
+        x = new_model.x_to_tensor(coordinates)
+        targets = new_model.y_to_tensor(y)
+        with torch.no_grad():
+            if hasattr(model, "input_transform"):
+                model.input_transform.eval()
+                x = model.input_transform(x)
+            if hasattr(model, "outcome_transform"):
+                model.outcome_transform.eval()
+                targets, _ = model.outcome_transform(targets)
+        new_model._set_transformed_train_data(
+            coordinates, x, targets.squeeze(-1)
         )
-
-        kwargs = deepcopy(self._initial_kwargs)
-        kwargs["train_x"] = coordinates
-        kwargs["train_y"] = y
-
-        # Initialize and train...
-        new_model = self.__class__(**kwargs)
-        new_model.train_(**kwargs)
+        new_model._training_state_successful = self._training_state_successful
 
         return new_model
 
 
 class EasySingleTaskGPRegressor(EasyGP):
+    """An exact Gaussian Process regressor wrapping botorch's
+    ``SingleTaskGP``.
+
+    Parameters
+    ----------
+    train_x : array_like
+        The training inputs of shape ``N x d``.
+    train_y : array_like
+        The training targets of shape ``N x 1``.
+    likelihood, mean_module, covar_module : gpytorch.Module, optional
+        The modules of the ``SingleTaskGP``.
+    normalize_inputs_to_unity : bool, optional
+        Whether to normalize the inputs to the unit hypercube.
+    standardize_outputs : bool, optional
+        Whether to standardize the targets.
+    device : str, optional
+        The device on which to place the model.
+    precision : str, optional
+        ``"float32"``, ``"float64"`` or ``"mixed"``. Defaults to the global
+        precision policy, see :meth:`EasyGP.precision`.
+    ski : bool, optional
+        If True, uses structured kernel interpolation (KISS-GP): the kernel
+        is interpolated from a regular grid of inducing points, on which it
+        has Toeplitz (1d) or Kronecker-of-Toeplitz (2-3d) structure. Training
+        then relies on conjugate gradients and stochastic log determinants,
+        and costs close to O(N + G log G) per iteration for a grid of G
+        points, rather than O(N^3). This is only practical in 1-3
+        dimensions. In more than one dimension, the base kernel of a
+        ``ScaleKernel`` is applied separately in each dimension, i.e. it
+        becomes a product kernel. The cached exact factorization and the
+        incremental ``tell`` are disabled in this mode.
+    ski_grid_size : int or list of int, optional
+        The number of grid points per dimension. Defaults to
+        ``N^(1/d)``.
+    **kwargs
+        Extra keyword arguments passed to ``SingleTaskGP``.
+    """
+
     def __init__(
         self,
         *,
@@ -586,6 +2424,9 @@ class EasySingleTaskGPRegressor(EasyGP):
         normalize_inputs_to_unity=True,
         standardize_outputs=True,
         device=DEVICE,
+        precision=None,
+        ski=False,
+        ski_grid_size=None,
         **kwargs,
     ):
         self._initial_kwargs = deepcopy(
@@ -599,8 +2440,8 @@ class EasySingleTaskGPRegressor(EasyGP):
             {key: value for key, value in kwargs.items() if key != "__class__"}
         )
 
-        logger.debug(f"Initial kwargs: {kwargs.keys()}")
-        super().__init__()
+        logger.debug("Initial kwargs: {}", kwargs.keys())
+        super().__init__(precision=precision)
         self._initial_kwargs = {**self._initial_kwargs, **kwargs}
         self._device = device
         d = train_x.shape[1]  # Number of features
@@ -611,6 +2452,15 @@ class EasySingleTaskGPRegressor(EasyGP):
         )
         m = train_y.shape[1]  # Number of targets
         outcome_transform = Standardize(m) if standardize_outputs else None
+        if ski:
+            # The grid is fixed once chosen, so that the model can be
+            # reconstructed on more data with the same state dict
+            if ski_grid_size is None:
+                ski_grid_size = max(int(len(train_x) ** (1.0 / d)), 2)
+                self._initial_kwargs["ski_grid_size"] = ski_grid_size
+            covar_module = _grid_interpolation_kernel(
+                covar_module, d, ski_grid_size
+            )
         model = SingleTaskGP(
             train_X=self.x_to_tensor(train_x),
             train_Y=self.y_to_tensor(train_y),
@@ -621,7 +2471,909 @@ class EasySingleTaskGPRegressor(EasyGP):
             outcome_transform=outcome_transform,
             **kwargs,
         )
-        self._model = deepcopy(model.to(device))
+        self._model = deepcopy(model.to(device=device, dtype=self.dtype))
+
+
+def _grid_interpolation_kernel(covar_module, d, grid_size):
+    """Returns a copy of ``covar_module`` for structured kernel interpolation.
+    The grid interpolation is applied inside any ``ScaleKernel``, since the
+    grid kernel evaluates its base kernel once per dimension and would
+    otherwise apply the output scale once per dimension too."""
+
+    if d > 3:
+        logger.warning(
+            f"Structured kernel interpolation in {d} dimensions requires a "
+            "grid which grows exponentially with the dimension"
+        )
+    covar_module = deepcopy(covar_module)
+    if isinstance(covar_module, gpytorch.kernels.ScaleKernel):
+        covar_module.base_kernel = gpytorch.kernels.GridInterpolationKernel(
+            covar_module.base_kernel, grid_size=grid_size, num_dims=d
+        )
+        return covar_module
+    return gpytorch.kernels.GridInterpolationKernel(
+        covar_module, grid_size=grid_size, num_dims=d
+    )
+
+
+def _expand_batch_shape(module, batch_shape):
+    """Returns a copy of an unbatched gpytorch module (kernel, mean or
+    likelihood) in which every parameter has been given a leading
+    ``batch_shape``, so that each member of the batch has its own,
+    independent, hyperparameters."""
+
+    module = deepcopy(module)
+    for m in module.modules():
+        for name, p in list(m.named_parameters(recurse=False)):
+            value = p.detach().expand(*batch_shape, *p.shape).clone()
+            m._parameters[name] = torch.nn.Parameter(
+                value, requires_grad=p.requires_grad
+            )
+        if isinstance(m, gpytorch.kernels.Kernel):
+            m._batch_shape = batch_shape + m._batch_shape
+        elif isinstance(getattr(m, "batch_shape", None), torch.Size):
+            m.batch_shape = batch_shape + m.batch_shape
+    return module
+
+
+class EasyGPBatch(EasyGP):
+    """A batch of independent single-output Gaussian Processes, each with its
+    own hyperparameters, which are trained together. All datasets are
+    stacked into a single batched ``SingleTaskGP`` so that ``train_``
+    optimizes the sum of the marginal log likelihoods in one vectorized pass,
+    rather than in a Python loop over models.
+
+    All datasets must be compatible, i.e. have the same number of points and
+    features. Individual models can be accessed via indexing, e.g.
+    ``batch[3].predict(grid=grid)``, which returns an
+    :class:`EasySingleTaskGPRegressor` holding a copy of the hyperparameters
+    of that member of the batch.
+
+    Parameters
+    ----------
+    train_x : array_like
+        Either an array of shape ``batch x N x d`` or a list of ``N x d``
+        arrays.
+    train_y : array_like
+        Either an array of shape ``batch x N x 1`` or a list of ``N x 1``
+        arrays.
+    likelihood, mean_module, covar_module : gpytorch.Module, optional
+        The *unbatched* modules, as they would be passed to
+        :class:`EasySingleTaskGPRegressor`. Every member of the batch gets its
+        own copy of their hyperparameters.
+    precision : str, optional
+        ``"float32"``, ``"float64"`` or ``"mixed"``. Defaults to the global
+        precision policy, see :meth:`EasyGP.precision`.
+    """
+
+    def __init__(
+        self,
+        *,
+        train_x,
+        train_y,
+        likelihood=gpytorch.likelihoods.GaussianLikelihood(),
+        mean_module=gpytorch.means.ConstantMean(),
+        covar_module=gpytorch.kernels.ScaleKernel(
+            gpytorch.kernels.MaternKernel(nu=2.5)
+        ),
+        normalize_inputs_to_unity=True,
+        standardize_outputs=True,
+        device=DEVICE,
+        precision=None,
+        **kwargs,
+    ):
+        self._initial_kwargs = deepcopy(
+            {
+                key: value
+                for key, value in locals().items()
+                if key not in ["self", "kwargs", "__class__"]
+            }
+        )
+        kwargs = deepcopy(
+            {key: value for key, value in kwargs.items() if key != "__class__"}
+        )
+
+        super().__init__(precision=precision)
+        self._initial_kwargs = {**self._initial_kwargs, **kwargs}
+        self._device = device
+
+        if isinstance(train_x, (list, tuple)):
+            train_x = torch.stack([self.x_to_tensor(xx) for xx in train_x])
+        if isinstance(train_y, (list, tuple)):
+            train_y = torch.stack([self.y_to_tensor(yy) for yy in train_y])
+        train_x = self.x_to_tensor(train_x)
+        train_y = self.y_to_tensor(train_y)
+
+        batch_shape = train_x.shape[:-2]
+        d = train_x.shape[-1]
+        logger.debug("Batch of {} models initialized", batch_shape)
+        input_transform = (
+            Normalize(d, batch_shape=batch_shape, transform_on_eval=True)
+            if normalize_inputs_to_unity
+            else None
+        )
+        outcome_transform = (
+            Standardize(train_y.shape[-1], batch_shape=batch_shape)
+            if standardize_outputs
+            else None
+        )
+        model = SingleTaskGP(
+            train_X=train_x,
+            train_Y=train_y,
+            likelihood=_expand_batch_shape(likelihood, batch_shape),
+            mean_module=_expand_batch_shape(mean_module, batch_shape),
+            covar_module=_expand_batch_shape(covar_module, batch_shape),
+            input_transform=input_transform,
+            outcome_transform=outcome_transform,
+            **kwargs,
+        )
+        self._model = deepcopy(model.to(device=device, dtype=self.dtype))
+
+    @property
+    def batch_shape(self):
+        """The batch shape of the stacked models.
+
+        Returns
+        -------
+        torch.Size
+        """
+
+        return self._model.train_targets.shape[:-1]
+
+    def __len__(self):
+        return self.batch_shape.numel()
+
+    def __getitem__(self, index):
+        """Returns an :class:`EasySingleTaskGPRegressor` for one member of the
+        batch, which is initialized with that member's data,
+        hyperparameters and transforms.
+
+        Parameters
+        ----------
+        index : int
+
+        Returns
+        -------
+        EasySingleTaskGPRegressor
+        """
+
+        kwargs = deepcopy(self._initial_kwargs)
+        kwargs["train_x"] = self.train_x[index]
+        kwargs["train_y"] = self.train_y[index]
+        model = EasySingleTaskGPRegressor(**kwargs)
+
+        batch_state_dict = self._model.state_dict()
+        state_dict = {
+            key: (
+                batch_state_dict[key][index]
+                if batch_state_dict[key].shape != value.shape
+                else batch_state_dict[key]
+            )
+            for key, value in model.model.state_dict().items()
+        }
+        model.model.load_state_dict(state_dict)
+        model._training_state_successful = self._training_state_successful
+        return model
+
+    def nlpd(self, train_x=None, train_y=None):
+        """Gets the negative log predictive density of every model in the
+        batch.
+
+        Parameters
+        ----------
+        train_x : None, array_like
+            If None, uses ``self.train_x``.
+        train_y : None, array_like
+            If None, uses ``self.train_y``.
+
+        Returns
+        -------
+        numpy.ndarray
+            An array of shape ``batch``.
+        """
+
+        train_x, train_y = self._get_nlpd_data(train_x, train_y)
+
+        posterior = self._get_posterior(
+            train_x, observation_noise=True, full_precision=True
+        )
+        try:
+            _nlpd = -posterior.mvn.log_prob(train_y.squeeze(-1))
+            _nlpd = _nlpd.detach().cpu().numpy()
+        except NotPSDError:
+            logger.warning(_NOT_PSD_WARNING_MESSAGE_NLPD)
+            _nlpd = np.full(self.batch_shape, np.inf)
+        return _nlpd
+
+    @_log_warnings
+    @instrument("sample")
+    def sample(self, *, grid, samples=1, seed=None, generator=None):
+        """Samples from every model in the batch.
+
+        Parameters
+        ----------
+        grid : array_like
+            The grid from which to sample.
+        samples : int, optional
+            Number of samples to draw.
+        seed : None, optional
+            Seeds a private random number generator. Ignored if
+            ``generator`` is provided.
+        generator : torch.Generator, optional
+            The random number generator.
+
+        Returns
+        -------
+        numpy.array
+            The array of sampled data, of shape
+            ``batch x samples x len(grid)``.
+        """
+
+        annotate(grid_size=len(grid), samples=samples)
+        sampled = self._draw_samples(
+            grid,
+            samples,
+            method="exact",
+            generator=_get_generator(seed, generator),
+            observation_noise=True,
+            chunk_size=None,
+            num_features=None,
+            rank=None,
+        )
+        return sampled.squeeze(-1).swapaxes(0, 1)
+
+    def dream(self, *args, **kwargs):
+        raise NotImplementedError(
+            "dream is not supported for batches of models, use the individual "
+            "models, e.g. batch[0].dream(...)"
+        )
+
+
+class _SingleTaskVariationalGP(SingleTaskVariationalGP):
+    """``SingleTaskVariationalGP`` stores its training inputs already
+    transformed, on the wrapped gpytorch model. This disables botorch's
+    swapping of transformed and untransformed training inputs when switching
+    between train and eval mode, which only applies to exact models and
+    otherwise warns on every call to ``eval``."""
+
+    def _set_transformed_inputs(self):
+        pass
+
+    def _revert_to_original_inputs(self):
+        pass
+
+
+class EasySparseGPRegressor(EasyGP):
+    """A sparse variational Gaussian Process regressor (SVGP) wrapping
+    botorch's ``SingleTaskVariationalGP``, for datasets which are too large
+    for :class:`EasySingleTaskGPRegressor`. The posterior is summarized by
+    ``M`` inducing points, so that a training step on a minibatch of ``B``
+    points costs O(B M^2 + M^3) and predictions cost O(M^2) per point,
+    independently of the number of observations ``N``.
+
+    ``train_`` maximizes the variational ELBO with Adam on minibatches. For a
+    Gaussian likelihood, the variational distribution is then set to its
+    closed form optimum given the hyperparameters. This optimum only depends
+    on the data through two sufficient statistics of shape ``M x M`` and
+    ``M``, which are additive over observations. ``tell`` therefore
+    conditions on new data exactly in O(k M^2 + M^3), without revisiting
+    the old data.
+
+    Parameters
+    ----------
+    train_x : array_like
+        The training inputs of shape ``N x d``.
+    train_y : array_like
+        The training targets of shape ``N x 1``.
+    likelihood, mean_module, covar_module : gpytorch.Module, optional
+        The modules of the ``SingleTaskVariationalGP``.
+    num_inducing_points : int, optional
+        The number of inducing points, which are initialized from the training
+        inputs with the pivoted Cholesky heuristic.
+    learn_inducing_points : bool, optional
+        Whether the locations of the inducing points are optimized during
+        training.
+    normalize_inputs_to_unity : bool, optional
+        Whether to normalize the inputs to the unit hypercube.
+    standardize_outputs : bool, optional
+        Whether to standardize the targets.
+    device : str, optional
+        The device on which to place the model.
+    precision : str, optional
+        ``"float32"``, ``"float64"`` or ``"mixed"``. Defaults to the global
+        precision policy, see :meth:`EasyGP.precision`.
+    **kwargs
+        Extra keyword arguments passed to ``SingleTaskVariationalGP``.
+    """
+
+    def __init__(
+        self,
+        *,
+        train_x,
+        train_y,
+        likelihood=gpytorch.likelihoods.GaussianLikelihood(),
+        mean_module=gpytorch.means.ConstantMean(),
+        covar_module=gpytorch.kernels.ScaleKernel(
+            gpytorch.kernels.MaternKernel(nu=2.5)
+        ),
+        num_inducing_points=512,
+        learn_inducing_points=True,
+        normalize_inputs_to_unity=True,
+        standardize_outputs=True,
+        device=DEVICE,
+        precision=None,
+        **kwargs,
+    ):
+        self._initial_kwargs = deepcopy(
+            {
+                key: value
+                for key, value in locals().items()
+                if key not in ["self", "kwargs", "__class__"]
+            }
+        )
+        kwargs = deepcopy(
+            {key: value for key, value in kwargs.items() if key != "__class__"}
+        )
+
+        super().__init__(precision=precision)
+        self._initial_kwargs = {**self._initial_kwargs, **kwargs}
+        self._device = device
+        d = train_x.shape[1]  # Number of features
+        input_transform = (
+            Normalize(d, transform_on_eval=True)
+            if normalize_inputs_to_unity
+            else None
+        )
+        m = train_y.shape[1]  # Number of targets
+        outcome_transform = Standardize(m) if standardize_outputs else None
+        model = _SingleTaskVariationalGP(
+            train_X=self.x_to_tensor(train_x),
+            train_Y=self.y_to_tensor(train_y),
+            likelihood=likelihood,
+            mean_module=deepcopy(mean_module),
+            covar_module=deepcopy(covar_module),
+            inducing_points=min(num_inducing_points, len(train_x)),
+            learn_inducing_points=learn_inducing_points,
+            input_transform=input_transform,
+            outcome_transform=outcome_transform,
+            **kwargs,
+        )
+        self._model = deepcopy(model.to(device=device, dtype=self.dtype))
+
+        # The transforms are fit once, on the initial data, and are frozen
+        # from then on
+        self._model.eval()
+
+    @property
+    def num_inducing_points(self):
+        """The number of inducing points.
+
+        Returns
+        -------
+        int
+        """
+
+        return self._variational_strategy.inducing_points.shape[-2]
+
+    @property
+    def _variational_strategy(self):
+        return self._model.model.variational_strategy
+
+    def _get_current_train_x(self, untransform=False):
+        # Unlike exact models, the training inputs are always stored
+        # transformed, regardless of the mode of the model
+        x = self._model.model.train_inputs[0].clone()
+        if untransform and hasattr(self._model, "input_transform"):
+            x = self._model.input_transform.untransform(x)
+        return x
+
+    def _get_current_train_y(self, untransform=False):
+        y = self._model.model.train_targets.unsqueeze(-1).clone()
+        if untransform and hasattr(self._model, "outcome_transform"):
+            y, _ = self._model.outcome_transform.untransform(y)
+        return y
+
+    def _get_stored_train_data(self):
+        model = self._model.model
+        return model.train_inputs[0], model.train_targets
+
+    def _get_train_inputs_shape(self):
+        return self._model.model.train_inputs[0].shape
+
+    def _get_output_batch_shape(self):
+        return torch.Size([])
+
+    def _supports_incremental_updates(self):
+        return False
+
+    def _supports_closed_form_updates(self):
+        """Whether the optimal variational distribution is available in
+        closed form, which requires a homoskedastic Gaussian likelihood."""
+
+        return isinstance(
+            self._model.likelihood, gpytorch.likelihoods.GaussianLikelihood
+        )
+
+    def _transform_data(self, x, y):
+        """Applies the frozen input and outcome transforms to new data."""
+
+        self._model.eval()
+        with torch.no_grad():
+            x = self._model.transform_inputs(x)
+            if hasattr(self._model, "outcome_transform"):
+                y, _ = self._model.outcome_transform(y)
+        return x, y.squeeze(-1)
+
+    def _get_statistics(self, x, y, chunk_size=4096):
+        """Computes the sufficient statistics ``Phi^T Phi`` and
+        ``Phi^T (y - m(x))`` of (transformed) data, where
+        ``Phi = K(x, Z) L^{-T}`` are the whitened features of the inducing
+        points ``Z`` and ``L L^T = K(Z, Z)``. Costs O(N M^2)."""
+
+        model = self._model.model
+        Z = self._variational_strategy.inducing_points
+        M = Z.shape[-2]
+
+        with torch.no_grad():
+            # Matches the jitter used by gpytorch's variational strategy
+            K_zz = model.covar_module(Z).add_jitter().to_dense()
+            L = psd_safe_cholesky(K_zz)
+
+            PhiT_Phi = Z.new_zeros(M, M)
+            PhiT_r = Z.new_zeros(M)
+            for start in range(0, len(x), chunk_size):
+                xx = x[start : start + chunk_size]
+                K_zx = model.covar_module(Z, xx).to_dense()
+                PhiT = torch.linalg.solve_triangular(L, K_zx, upper=False)
+                r = y[start : start + chunk_size] - model.mean_module(xx)
+                PhiT_Phi += PhiT @ PhiT.transpose(-1, -2)
+                PhiT_r += PhiT @ r
+
+        return PhiT_Phi, PhiT_r
+
+    def _get_training_factor(self):
+        """Gets the cached sufficient statistics of the training data (see
+        :meth:`_get_statistics`). These are computed once, O(N M^2), and
+        reused until the hyperparameters change.
+
+        Returns
+        -------
+        tuple of torch.tensor
+        """
+
+        if self._training_factor is None:
+            self._training_factor = self._get_statistics(
+                self._model.model.train_inputs[0],
+                self._model.model.train_targets,
+            )
+        return self._training_factor
+
+    def _set_optimal_variational_distribution(self):
+        """Sets the whitened variational distribution ``q(v) = N(mu, S)`` to
+        its optimum given the hyperparameters, i.e. the exact posterior of
+        ``v`` in the model ``y = m(x) + Phi v + noise`` with ``v ~ N(0, I)``:
+        ``S^{-1} = I + Phi^T Phi / sigma^2`` and
+        ``mu = S Phi^T (y - m(x)) / sigma^2``."""
+
+        PhiT_Phi, PhiT_r = self._get_training_factor()
+        noise = self._model.likelihood.noise.detach().squeeze()
+
+        with torch.no_grad():
+            precision = PhiT_Phi / noise
+            precision.diagonal().add_(1.0)
+            L = psd_safe_cholesky(precision)
+            mean = torch.cholesky_solve(
+                (PhiT_r / noise).unsqueeze(-1), L
+            ).squeeze(-1)
+            chol_covar = psd_safe_cholesky(torch.cholesky_inverse(L))
+
+            strategy = self._variational_strategy
+            distribution = strategy._variational_distribution
+            distribution.variational_mean.copy_(mean)
+            distribution.chol_variational_covar.copy_(chol_covar)
+            strategy.variational_params_initialized.fill_(1)
+
+        self._prediction_model = None
+        self._prediction_cache.clear()
+
+    def _optimize(
+        self,
+        batches,
+        parameters,
+        *,
+        lr,
+        maxiter=None,
+        timeout=None,
+        rtol=None,
+        window=1,
+    ):
+        """Maximizes the variational ELBO with Adam over the provided
+        minibatches of indices into the training data.
+
+        Parameters
+        ----------
+        batches : iterable of torch.tensor
+            The indices of the training points in each step.
+        parameters : iterable of torch.nn.Parameter
+            The parameters to optimize.
+        lr : float
+            The learning rate.
+        maxiter : int, optional
+            The maximum number of steps.
+        timeout : float, optional
+            The maximum wall time in seconds.
+        rtol : float, optional
+            Stop once the relative change of the average loss between two
+            consecutive windows of ``window`` steps falls below this value.
+        window : int, optional
+            The number of steps per window, e.g. the number of steps in an
+            epoch.
+
+        Returns
+        -------
+        list of float
+            The loss at every step.
+
+        Raises
+        ------
+        ModelFittingError
+            If the loss is not finite.
+        """
+
+        model = self._model.model
+        likelihood = self._model.likelihood
+        x = model.train_inputs[0]
+        y = model.train_targets
+
+        mll = gpytorch.mlls.VariationalELBO(likelihood, model, num_data=len(y))
+        optimizer = torch.optim.Adam(parameters, lr=lr)
+        deadline = None if timeout is None else perf_counter() + timeout
+
+        losses = []
+        model.train()
+        likelihood.train()
+        try:
+            for step, index in enumerate(batches):
+                if maxiter is not None and step >= maxiter:
+                    break
+                if deadline is not None and perf_counter() > deadline:
+                    logger.debug("Training timed out after {} steps", step)
+                    break
+
+                optimizer.zero_grad()
+                loss = -mll(model(x[index]), y[index])
+                if not torch.isfinite(loss):
+                    raise ModelFittingError(f"Non-finite ELBO at step {step}")
+                loss.backward()
+                optimizer.step()
+                losses.append(loss.item())
+
+                if rtol is not None and len(losses) % window == 0:
+                    if len(losses) >= 2 * window:
+                        current = np.mean(losses[-window:])
+                        previous = np.mean(losses[-2 * window : -window])
+                        change = abs(current - previous) / abs(previous)
+                        if change < rtol:
+                            logger.debug("Converged after {} steps", step + 1)
+                            break
+        finally:
+            self._model.eval()
+
+        return losses
+
+    def _replay_batches(self, num_new, num_steps, batch_size, generator):
+        """Minibatches for streaming updates. Each one contains the newest
+        ``num_new`` observations (subsampled if there are more than half a
+        batch of them), topped up with observations drawn uniformly from the
+        older data."""
+
+        N = len(self._model.model.train_targets)
+        device = self._model.model.train_targets.device
+        new = torch.arange(N - num_new, N, device=device)
+        num_old = N - num_new
+        for _ in range(num_steps):
+            index = new
+            if num_new > batch_size // 2:
+                choice = torch.randperm(num_new, generator=generator)
+                index = new[choice[: batch_size // 2].to(device)]
+            if num_old > 0:
+                old = torch.randint(
+                    num_old, (batch_size - len(index),), generator=generator
+                )
+                index = torch.cat([index, old.to(device)])
+            yield index
+
+    @_log_warnings
+    @instrument("train_")
+    def train_(
+        self,
+        *,
+        num_epochs=None,
+        batch_size=512,
+        lr=0.05,
+        seed=None,
+        log_error_on_fail=False,
+        terminate_on_fail=False,
+        refit_policy=None,
+    ):
+        """Trains the model by maximizing the variational ELBO with Adam on
+        minibatches of the training data. Training always starts from the
+        current hyperparameters and variational distribution.
+
+        Parameters
+        ----------
+        num_epochs : int, optional
+            The number of passes over the training data. Defaults to as many
+            as are needed for at least 500 steps.
+        batch_size : int, optional
+            The number of observations per minibatch.
+        lr : float, optional
+            The learning rate of Adam.
+        seed : int, optional
+            Seeds the shuffling of the training data.
+        refit_policy : RefitPolicy, optional
+            Overrides :meth:`refit_policy` for this call. ``maxiter`` is the
+            maximum number of Adam steps and ``rtol`` is compared to the
+            relative change of the average loss between consecutive epochs.
+        """
+
+        self._training_state_successful = True
+        self._reset_training_factor()
+
+        maxiter, timeout, rtol = None, None, None
+        if refit_policy is None:
+            refit_policy = self._refit_policy
+        if refit_policy is not None:
+            maxiter = refit_policy.maxiter
+            timeout = refit_policy.timeout
+            rtol = refit_policy.rtol
+            logger.debug("Training with {}", refit_policy)
+
+        N = len(self._model.model.train_targets)
+        device = self._model.model.train_targets.device
+        generator = torch.Generator()
+        if seed is not None:
+            generator.manual_seed(seed)
+
+        steps_per_epoch = -(-N // batch_size)
+        if num_epochs is None:
+            num_epochs = -(-500 // steps_per_epoch)
+
+        def batches():
+            for _ in range(num_epochs):
+                index = torch.randperm(N, generator=generator).to(device)
+                yield from index.split(batch_size)
+
+        logger.debug("------- PARAMETER INFO BEFORE TRAINING -------")
+        self._log_training_debug_information()
+
+        try:
+            with Timer() as timer:
+                losses = self._optimize(
+                    batches(),
+                    self._model.parameters(),
+                    lr=lr,
+                    maxiter=maxiter,
+                    timeout=timeout,
+                    rtol=rtol,
+                    window=steps_per_epoch,
+                )
+                if self._supports_closed_form_updates():
+                    self._set_optimal_variational_distribution()
+
+        except (ModelFittingError, NotPSDError):
+            self._on_training_error(log_error_on_fail, terminate_on_fail)
+
+        logger.debug("------- PARAMETER INFO AFTER TRAINING -------")
+        self._log_training_debug_information()
+
+        annotate(
+            fit_time=timer.seconds,
+            attempts=1,
+            restarts=0,
+            success=self._training_state_successful,
+        )
+        if self._training_state_successful:
+            # No step is taken e.g. with num_epochs=0 or an expired timeout
+            final = ""
+            annotate(iterations=len(losses))
+            if losses:
+                annotate(loss=float(losses[-1]))
+                final = f", final loss: {losses[-1]:.02f}"
+            self._observations_since_refit = 0
+            logger.success(
+                f"Model fit on {N} points with {self.num_inducing_points} "
+                f"inducing points in {len(losses)} steps and "
+                f"{timer.dt:.01f} {timer.units}{final}"
+            )
+
+    def nlpd(self, train_x=None, train_y=None, chunk_size=4096):
+        """Gets the negative log predictive density of the model. Since the
+        joint predictive density of a large dataset is intractable, this is
+        the sum of the negative log marginal predictive densities of the
+        points, evaluated in chunks of ``chunk_size`` points.
+
+        Parameters
+        ----------
+        train_x : None, array_like
+            If None, uses ``self.train_x``.
+        train_y : None, array_like
+            If None, uses ``self.train_y``.
+        chunk_size : int, optional
+            The number of points per chunk.
+        """
+
+        if train_x is None:
+            train_x = self.train_x
+        train_x = self.x_to_tensor(train_x)
+
+        if train_y is None:
+            train_y = self.train_y
+        train_y = self.y_to_tensor(train_y)
+
+        _nlpd = 0.0
+        for start in range(0, len(train_x), chunk_size):
+            block = slice(start, start + chunk_size)
+            posterior = self._get_posterior(
+                train_x[block], observation_noise=True, full_precision=True
+            )
+            dist = torch.distributions.Normal(
+                posterior.mean.squeeze(-1),
+                posterior.variance.sqrt().squeeze(-1),
+            )
+            _nlpd -= dist.log_prob(train_y[block].squeeze(-1)).sum().item()
+        return _nlpd
+
+    @_log_warnings
+    @instrument("tell")
+    def tell(
+        self,
+        *,
+        new_x,
+        new_y,
+        retrain=True,
+        refit_policy=None,
+        num_steps=100,
+        batch_size=512,
+        lr=0.05,
+        seed=None,
+        metadata=None,
+        log_error_on_fail=False,
+        terminate_on_fail=False,
+    ):
+        """Informs the GP about new data, which is streamed into the model
+        without revisiting the old data where possible. The input and outcome
+        transforms are kept fixed at their initial values.
+
+        Parameters
+        ----------
+        new_x : array_like
+            The new input data.
+        new_y : array_like
+            The new target data.
+        retrain : bool, optional
+            If True, the hyperparameters are updated with ``num_steps`` Adam
+            steps on minibatches which replay the new data together with a
+            random subset of the old data, after which the optimal
+            variational distribution is recomputed in O(N M^2). If False, the
+            hyperparameters are kept, and for a Gaussian likelihood the model
+            is conditioned on the new data exactly in O(k M^2 + M^3), without
+            revisiting the old data. If a :class:`RefitPolicy`
+            is in use, the retraining only happens once the policy asks for
+            it.
+        refit_policy : RefitPolicy, optional
+            Overrides :meth:`refit_policy` for this call. ``maxiter`` and
+            ``timeout`` cap the number of replay steps and their wall time.
+        num_steps : int, optional
+            The number of Adam steps used to retrain.
+        batch_size : int, optional
+            The number of observations per replay minibatch.
+        lr : float, optional
+            The learning rate of Adam.
+        seed : int, optional
+            Seeds the sampling of the replay minibatches.
+        metadata : list, optional
+            The metadata of the new observations, stored in the
+            :meth:`store`, if any, once the model has been conditioned on
+            them.
+        log_error_on_fail, terminate_on_fail : bool, optional
+            How a failure of the Adam steps is handled, as in
+            :meth:`train_`. Unless ``terminate_on_fail`` is True, the failed
+            model is returned with ``training_state_successful`` set to
+            False.
+
+        Returns
+        -------
+        EasySparseGPRegressor
+        """
+
+        new_x = self.x_to_tensor(new_x)
+        new_y = self.y_to_tensor(new_y)
+
+        if refit_policy is None:
+            refit_policy = self._refit_policy
+        observations_since_refit = self._observations_since_refit + len(new_x)
+        if retrain and refit_policy is not None:
+            retrain = refit_policy.should_refit(observations_since_refit)
+            logger.debug(
+                "{} observations since last refit, retrain set to {}",
+                observations_since_refit,
+                retrain,
+            )
+
+        x, y = self._transform_data(new_x, new_y)
+        closed_form = self._supports_closed_form_updates()
+        annotate(
+            new_points=len(new_x),
+            retrain=bool(retrain),
+            incremental=bool(closed_form and not retrain),
+        )
+        if closed_form and not retrain:
+            PhiT_Phi, PhiT_r = self._get_training_factor()
+            new_PhiT_Phi, new_PhiT_r = self._get_statistics(x, y)
+
+        new_model = copy(self)
+        new_model._model = deepcopy(self._model)
+        new_model._prediction_cache = PredictionCache(
+            self._prediction_cache.maxsize,
+            self._prediction_cache.max_grid_size,
+        )
+        new_model._prediction_model = None
+        new_model._train_data_cache = dict()
+        new_model._observations_since_refit = observations_since_refit
+
+        model = new_model._model.model
+        model.train_inputs = (torch.cat([model.train_inputs[0], x], axis=0),)
+        model.train_targets = torch.cat([model.train_targets, y], axis=0)
+
+        if closed_form and not retrain:
+            new_model._training_factor = (
+                PhiT_Phi + new_PhiT_Phi,
+                PhiT_r + new_PhiT_r,
+            )
+            new_model._set_optimal_variational_distribution()
+            self._append_to_store(new_model, new_x, new_y, metadata)
+            return new_model
+
+        # Either retrain everything, or only the variational distribution if
+        # it is not available in closed form
+        if retrain:
+            parameters = new_model._model.parameters()
+        else:
+            strategy = new_model._variational_strategy
+            parameters = strategy._variational_distribution.parameters()
+
+        maxiter, timeout = None, None
+        if refit_policy is not None:
+            maxiter, timeout = refit_policy.maxiter, refit_policy.timeout
+
+        generator = torch.Generator()
+        if seed is not None:
+            generator.manual_seed(seed)
+
+        new_model._training_state_successful = True
+        new_model._reset_training_factor()
+        batches = new_model._replay_batches(
+            len(x), num_steps, batch_size, generator
+        )
+        try:
+            new_model._optimize(
+                batches,
+                parameters,
+                lr=lr,
+                maxiter=maxiter,
+                timeout=timeout,
+            )
+            if closed_form:
+                new_model._set_optimal_variational_distribution()
+        except (ModelFittingError, NotPSDError):
+            new_model._on_training_error(log_error_on_fail, terminate_on_fail)
+
+        if retrain and new_model._training_state_successful:
+            new_model._observations_since_refit = 0
+
+        self._append_to_store(new_model, new_x, new_y, metadata)
+        return new_model
 
 
 # class MostLikelyHeteroskedasticGPRegressor(EasyGP):
@@ -0,0 +1,238 @@
+"""Small dense linear algebra helpers used to cache and update the exact GP
+posterior factorization.
+
+The exact GP posterior only ever needs the training covariance
+``K_hat = K(X, X) + sigma^2 I`` through its inverse. We store the inverse of
+its lower Cholesky factor, ``L^{-1}``, which is exactly the "covariance
+cache" that gpytorch uses for fast predictive variances
+(``S S^T = K_hat^{-1}`` with ``S = L^{-T}``). Keeping the inverse factor
+rather than ``L`` itself means that every quantity we need (solves, the
+diagonal of the inverse and appending new rows) is a matrix multiplication.
+"""
+
+import torch
+from linear_operator.utils.cholesky import psd_safe_cholesky
+
+
+class InverseCholesky:
+    """Stores the inverse lower Cholesky factor ``L^{-1}`` of a symmetric
+    positive definite matrix ``A = L L^T``.
+
+    Parameters
+    ----------
+    L_inv : torch.tensor
+        The lower triangular inverse Cholesky factor of shape ``N x N``.
+    """
+
+    def __init__(self, L_inv):
+        self._L_inv = L_inv
+
+    @classmethod
+    def from_matrix(cls, A):
+        """Factorizes a dense symmetric positive definite matrix. This is the
+        only O(N^3) operation in this class.
+
+        Parameters
+        ----------
+        A : torch.tensor
+            The ``N x N`` matrix to factorize.
+
+        Returns
+        -------
+        InverseCholesky
+        """
+
+        L = psd_safe_cholesky(A)
+        eye = torch.eye(L.shape[-1], dtype=L.dtype, device=L.device)
+        L_inv = torch.linalg.solve_triangular(L, eye, upper=False)
+        return cls(L_inv)
+
+    def __len__(self):
+        return self._L_inv.shape[-1]
+
+    @property
+    def L_inv(self):
+        """The lower triangular inverse Cholesky factor ``L^{-1}``.
+
+        Returns
+        -------
+        torch.tensor
+        """
+
+        return self._L_inv
+
+    @property
+    def root_inv(self):
+        """A root ``S = L^{-T}`` of the inverse matrix, such that
+        ``S S^T = A^{-1}``. This is the form gpytorch expects for its
+        predictive covariance cache.
+
+        Returns
+        -------
+        torch.tensor
+        """
+
+        return self._L_inv.transpose(-1, -2)
+
+    def solve(self, rhs):
+        """Computes ``A^{-1} rhs`` in O(N^2) per right hand side.
+
+        Parameters
+        ----------
+        rhs : torch.tensor
+            Either a vector of length ``N`` or a matrix of shape ``N x k``.
+
+        Returns
+        -------
+        torch.tensor
+        """
+
+        return self._L_inv.transpose(-1, -2) @ (self._L_inv @ rhs)
+
+    def inv_diag(self):
+        """The diagonal of ``A^{-1} = L^{-T} L^{-1}``, i.e. the squared column
+        norms of ``L^{-1}``.
+
+        Returns
+        -------
+        torch.tensor
+        """
+
+        return (self._L_inv**2).sum(dim=-2)
+
+    def logdet(self):
+        """The log determinant of ``A``.
+
+        Returns
+        -------
+        torch.tensor
+        """
+
+        return -2.0 * torch.diagonal(self._L_inv).log().sum()
+
+    def append(self, cross, block):
+        """Appends ``k`` rows and columns to the factorized matrix, i.e.
+        returns the factor of
+
+        .. code-block::
+
+            [[A,       cross],
+             [cross^T, block]]
+
+        using the bordered Cholesky update. Only the ``k x k`` Schur
+        complement is factorized, so the total cost is O(N^2 k + k^3) instead
+        of O((N + k)^3).
+
+        Parameters
+        ----------
+        cross : torch.tensor
+            The ``N x k`` off-diagonal block.
+        block : torch.tensor
+            The ``k x k`` new diagonal block.
+
+        Returns
+        -------
+        InverseCholesky
+        """
+
+        N = len(self)
+        k = block.shape[-1]
+
+        # B = L^{-1} cross, so that the new lower factor is [[L, 0], [B^T, Ls]]
+        B = self._L_inv @ cross
+        schur = block - B.transpose(-1, -2) @ B
+        Ls = psd_safe_cholesky(schur)
+        eye = torch.eye(k, dtype=Ls.dtype, device=Ls.device)
+        Ls_inv = torch.linalg.solve_triangular(Ls, eye, upper=False)
+
+        L_inv = self._L_inv.new_zeros(N + k, N + k)
+        L_inv[:N, :N] = self._L_inv
+        L_inv[N:, :N] = -Ls_inv @ B.transpose(-1, -2) @ self._L_inv
+        L_inv[N:, N:] = Ls_inv
+        return self.__class__(L_inv)
+
+
+def lanczos_root(
+    matmul,
+    size,
+    rank,
+    *,
+    like,
+    block_size=None,
+    generator=None,
+    tol=1e-10,
+):
+    """Approximates a low rank root ``R``, with ``R R^T ~ A``, of a symmetric
+    positive semi-definite matrix ``A`` which is only available through its
+    products with matrices. The block Lanczos algorithm, with full
+    reorthogonalization, builds an orthonormal basis ``Q`` of the Krylov
+    subspace spanned by a random ``size x block_size`` matrix ``V`` and
+    ``A V, A^2 V, ...``, and the Rayleigh-Ritz root ``R = Q (Q^T A Q)^{1/2}``.
+    The leading eigenvalues of ``A`` converge first, which makes this
+    accurate for the fast decaying spectra of kernel matrices.
+
+    Each iteration is a single product of ``A`` with a block, i.e. a single
+    pass over ``A``, and there are ``ceil(rank / block_size)`` of them. Apart
+    from these products, the cost is O(size rank^2) time and O(size rank)
+    memory.
+
+    Parameters
+    ----------
+    matmul : callable
+        Maps a matrix of shape ``size x k`` to its product with ``A``.
+    size : int
+        The size of ``A``.
+    rank : int
+        The maximum rank of the root. The iterations stop early if the
+        Krylov subspace is exhausted.
+    like : torch.tensor
+        A tensor with the dtype and device of ``A``.
+    block_size : int, optional
+        The number of vectors multiplied by ``A`` at once. Defaults to
+        ``ceil(rank / 8)``, i.e. to 8 iterations.
+    generator : torch.Generator, optional
+        The generator of the random starting block.
+    tol : float, optional
+        The iterations stop when the new block is smaller than ``tol`` times
+        the previous ones.
+
+    Returns
+    -------
+    torch.tensor
+        The root, of shape ``size x k`` with ``k <= rank``.
+    """
+
+    rank = min(rank, size)
+    if block_size is None:
+        block_size = -(-rank // 8)
+    block_size = min(block_size, rank)
+    V = torch.randn(size, block_size, generator=generator, dtype=like.dtype)
+    V, _ = torch.linalg.qr(V.to(like.device))
+
+    basis, products = [], []
+    scale = None
+    while True:
+        basis.append(V)
+        products.append(matmul(V))
+        k = sum(block.shape[-1] for block in basis)
+        if k >= rank:
+            break
+
+        # Reorthogonalizing twice against the whole basis is enough to keep
+        # it orthonormal to working precision
+        Q = torch.cat(basis, dim=-1)
+        W = products[-1]
+        for _ in range(2):
+            W = W - Q @ (Q.T @ W)
+
+        norm = W.norm()
+        scale = norm if scale is None else max(scale, norm)
+        if norm <= tol * scale:
+            break
+        V, _ = torch.linalg.qr(W[:, : rank - k])
+        V, _ = torch.linalg.qr(V - Q @ (Q.T @ V))
+
+    Q = torch.cat(basis, dim=-1)
+    T = Q.T @ torch.cat(products, dim=-1)
+    evals, evecs = torch.linalg.eigh(0.5 * (T + T.T))
+    return Q @ (evecs * evals.clamp(min=0.0).sqrt())
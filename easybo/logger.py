@@ -1,7 +1,10 @@
 from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
 import sys
-from warnings import catch_warnings
+from threading import Lock
+from time import monotonic
+import warnings
 
 from loguru import logger
 
@@ -44,6 +47,13 @@ def set_logger_style(
     critical=True,
     critical_simple=False,
 ):
+    """Replaces the loguru handlers by one handler per enabled level.
+
+    Every handler is also given a minimum level, so that loguru discards
+    records below the lowest enabled level before doing any work. In
+    particular, messages logged with ``logger.opt(lazy=True)`` are never
+    formatted when their level is disabled.
+    """
 
     logger.remove(None)
 
@@ -51,6 +61,7 @@ def set_logger_style(
         logger.add(
             sys.stdout,
             colorize=True,
+            level="DEBUG",
             filter=generic_filter(["DEBUG"]),
             format=SIMPLE_LOGGER_FMT if debug_simple else LOGGER_FMT,
         )
@@ -59,6 +70,7 @@ def set_logger_style(
         logger.add(
             sys.stdout,
             colorize=True,
+            level="INFO",
             filter=generic_filter(["INFO"]),
             format=SIMPLE_LOGGER_FMT if info_simple else LOGGER_FMT,
         )
@@ -67,6 +79,7 @@ def set_logger_style(
         logger.add(
             sys.stdout,
             colorize=True,
+            level="SUCCESS",
             filter=generic_filter(["SUCCESS"]),
             format=SIMPLE_LOGGER_FMT if success_simple else LOGGER_FMT,
         )
@@ -75,6 +88,7 @@ def set_logger_style(
         logger.add(
             sys.stdout,
             colorize=True,
+            level="WARNING",
             filter=generic_filter(["WARNING"]),
             format=SIMPLE_LOGGER_FMT if warning_simple else LOGGER_FMT,
         )
@@ -83,6 +97,7 @@ def set_logger_style(
         logger.add(
             sys.stdout,
             colorize=True,
+            level="ERROR",
             filter=generic_filter(["ERROR"]),
             format=SIMPLE_LOGGER_FMT if error_simple else LOGGER_FMT,
         )
@@ -91,24 +106,111 @@ def set_logger_style(
         logger.add(
             sys.stdout,
             colorize=True,
+            level="CRITICAL",
             filter=generic_filter(["CRITICAL"]),
             format=SIMPLE_LOGGER_FMT if critical_simple else LOGGER_FMT,
         )
 
 
-def _log_warnings(f):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        with catch_warnings(record=True) as w:
-            output = f(*args, **kwargs)
-        for warning in w:
-            klass = warning.category.__name__
-            message = str(warning.message)
-            v = vars(warning)
-            logger.warning(f"{klass}: {message} | {v}")
-        return output
+class WarningRouter:
+    """Routes the warnings raised inside easybo calls to the logger.
+
+    The router replaces ``warnings.showwarning`` once, instead of entering
+    ``warnings.catch_warnings`` (which mutates the global warning filters and
+    is not thread-safe) on every call. Whether a warning was raised inside a
+    routed call is tracked with a context variable, so that routing is local
+    to the current thread or asyncio task. Warnings raised anywhere else are
+    passed on to the previous handler untouched.
+
+    Repeated warnings are deduplicated by category and location: the first
+    occurrence is logged immediately, and further occurrences are counted
+    and reported at most once every ``interval`` seconds.
+
+    .. note::
+
+        Code which replaces ``warnings.showwarning`` itself, such as
+        ``warnings.catch_warnings(record=True)``, takes precedence over the
+        router for as long as it is active.
+
+    Parameters
+    ----------
+    interval : float, optional
+        The minimum number of seconds between two reports of the same
+        warning.
+    """
+
+    def __init__(self, interval=60.0):
+        self.interval = interval
+        self._lock = Lock()
+        self._depth = ContextVar("easybo_warning_depth", default=0)
+        self._previous = warnings.showwarning
+        self._handler = self._showwarning
+        self._seen = dict()
+
+    def install(self):
+        """Installs the router as ``warnings.showwarning``, if it is not
+        already installed. Routed calls reinstall the router if something
+        else has replaced the handler in the meantime."""
+
+        if warnings.showwarning is self._handler:
+            return
+        with self._lock:
+            if warnings.showwarning is not self._handler:
+                self._previous = warnings.showwarning
+                warnings.showwarning = self._handler
+
+    def reset(self):
+        """Forgets every warning seen so far."""
+
+        with self._lock:
+            self._seen.clear()
+
+    def route(self, f):
+        """Decorates ``f`` so that the warnings it raises are routed to the
+        logger. The wrapper only costs a context variable update per call.
+        """
+
+        depth = self._depth
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if warnings.showwarning is not self._handler:
+                self.install()
+            token = depth.set(depth.get() + 1)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                depth.reset(token)
+
+        return wrapper
+
+    def _showwarning(
+        self, message, category, filename, lineno, file=None, line=None
+    ):
+        if self._depth.get() == 0:
+            self._previous(message, category, filename, lineno, file, line)
+            return
+
+        key = (category, filename, lineno)
+        now = monotonic()
+        with self._lock:
+            last_report, suppressed = self._seen.get(key, (None, 0))
+            if last_report is not None and now - last_report < self.interval:
+                self._seen[key] = (last_report, suppressed + 1)
+                return
+            self._seen[key] = (now, 0)
+
+        msg = f"{category.__name__}: {message} | {filename}:{lineno}"
+        if suppressed > 0:
+            msg = f"{msg} (repeated {suppressed} more time(s))"
+        logger.warning(msg)
+
+
+_WARNING_ROUTER = WarningRouter()
 
-    return wrapper
+
+def _log_warnings(f):
+    return _WARNING_ROUTER.route(f)
 
 
 @contextmanager
@@ -121,6 +223,7 @@ def logging_mode(**kwargs):
 
 
 set_logger_style()
+_WARNING_ROUTER.install()
 
 
 # class LimitedLogger:
@@ -0,0 +1,326 @@
+"""Structured performance telemetry for the main entry points of the library
+(``train_``, ``predict``, ``sample``, ``tell`` and ``ask``).
+
+Every instrumented call produces one record, a flat dictionary with at
+least the following keys:
+
+- ``"event"``: the name of the call, e.g. ``"train_"``.
+- ``"timestamp"``: the unix time at which the call started.
+- ``"wall_time"``: the duration of the call in seconds.
+- ``"error"``: only if the call raised, the name of the exception.
+- ``"peak_cuda_memory"``: only if CUDA is in use, the peak number of bytes
+  allocated by torch since the outermost instrumented call started.
+
+Calls made on a model also record the model class, the number of training
+points ``N``, the input dimension ``d`` and the precision, and each call
+adds its own fields (e.g. the number of optimizer iterations and restarts
+and the NLPD for ``train_``, or the grid size for ``predict``).
+
+Recording is disabled by default, so that instrumented calls cost a single
+attribute lookup. Enable it with :func:`enable`, then either consume the
+records as they are produced with :func:`add_callback`, or export them with
+:func:`to_jsonl` or :func:`to_prometheus`.
+
+.. code-block:: python
+
+    from easybo import metrics
+
+    metrics.enable()
+    model.train_()
+    model.predict(grid=grid)
+    print(metrics.to_prometheus())
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+import json
+from threading import Lock
+from time import perf_counter, time
+
+import torch
+
+from easybo.logger import logger
+
+
+_CURRENT = ContextVar("easybo_metrics_record", default=None)
+
+
+class MetricsRegistry:
+    """A thread-safe, bounded store of metric records.
+
+    Parameters
+    ----------
+    maxlen : int, optional
+        The maximum number of records kept. The oldest records are dropped
+        first.
+    """
+
+    def __init__(self, maxlen=10000):
+        self.enabled = False
+        self._records = deque(maxlen=maxlen)
+        self._callbacks = []
+        self._lock = Lock()
+
+    def record(self, record):
+        """Stores a record and passes it to every callback. Exceptions raised
+        by callbacks are logged and otherwise ignored.
+
+        Parameters
+        ----------
+        record : dict
+        """
+
+        with self._lock:
+            self._records.append(record)
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(record)
+            except Exception as err:
+                logger.error(f"Metrics callback {callback} failed: {err}")
+
+    def add_callback(self, callback):
+        """Registers ``callback``, which is called with every new record.
+
+        Parameters
+        ----------
+        callback : callable
+        """
+
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        """Unregisters a callback added with :meth:`add_callback`.
+
+        Parameters
+        ----------
+        callback : callable
+        """
+
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def records(self, event=None):
+        """The stored records, oldest first.
+
+        Parameters
+        ----------
+        event : str, optional
+            If provided, only the records of this event are returned.
+
+        Returns
+        -------
+        list of dict
+        """
+
+        with self._lock:
+            records = list(self._records)
+        if event is not None:
+            records = [r for r in records if r["event"] == event]
+        return records
+
+    def clear(self):
+        """Removes every stored record."""
+
+        with self._lock:
+            self._records.clear()
+
+    def to_jsonl(self, path=None):
+        """Exports the stored records as JSON lines.
+
+        Parameters
+        ----------
+        path : os.PathLike, optional
+            If provided, the lines are appended to this file.
+
+        Returns
+        -------
+        str
+        """
+
+        text = "".join(
+            json.dumps(record, default=str) + "\n" for record in self.records()
+        )
+        if path is not None:
+            with open(path, "a") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, prefix="easybo"):
+        """Exports the stored records in the Prometheus text exposition
+        format. The wall time of each event is exported as a summary (count,
+        sum and maximum), and every other numeric field of the latest record
+        of each event as a gauge.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            The prefix of every metric name.
+
+        Returns
+        -------
+        str
+        """
+
+        summaries = dict()
+        latest = dict()
+        for record in self.records():
+            event = record["event"]
+            count, total, worst = summaries.get(event, (0, 0.0, 0.0))
+            summaries[event] = (
+                count + 1,
+                total + record["wall_time"],
+                max(worst, record["wall_time"]),
+            )
+            latest[event] = record
+
+        name = f"{prefix}_wall_time_seconds"
+        lines = [
+            f"# HELP {name} Wall time of easybo calls.",
+            f"# TYPE {name} summary",
+        ]
+        for event, (count, total, _) in summaries.items():
+            lines.append(f'{name}_count{{event="{event}"}} {count}')
+            lines.append(f'{name}_sum{{event="{event}"}} {total!r}')
+
+        name = f"{prefix}_wall_time_max_seconds"
+        lines += [
+            f"# HELP {name} Longest wall time of easybo calls.",
+            f"# TYPE {name} gauge",
+        ]
+        for event, (_, _, worst) in summaries.items():
+            lines.append(f'{name}{{event="{event}"}} {worst!r}')
+
+        name = f"{prefix}_last"
+        lines += [
+            f"# HELP {name} Numeric fields of the latest easybo call.",
+            f"# TYPE {name} gauge",
+        ]
+        for event, record in latest.items():
+            for field, value in record.items():
+                if field in ["timestamp", "wall_time"]:
+                    continue
+                if isinstance(value, bool) or not isinstance(
+                    value, (int, float)
+                ):
+                    continue
+                lines.append(
+                    f'{name}{{event="{event}",field="{field}"}} {value!r}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def enable():
+    """Enables recording in the global registry."""
+
+    REGISTRY.enabled = True
+
+
+def disable():
+    """Disables recording in the global registry."""
+
+    REGISTRY.enabled = False
+
+
+def add_callback(callback):
+    """See :meth:`MetricsRegistry.add_callback`."""
+
+    REGISTRY.add_callback(callback)
+
+
+def remove_callback(callback):
+    """See :meth:`MetricsRegistry.remove_callback`."""
+
+    REGISTRY.remove_callback(callback)
+
+
+def records(event=None):
+    """See :meth:`MetricsRegistry.records`."""
+
+    return REGISTRY.records(event=event)
+
+
+def clear():
+    """See :meth:`MetricsRegistry.clear`."""
+
+    REGISTRY.clear()
+
+
+def to_jsonl(path=None):
+    """See :meth:`MetricsRegistry.to_jsonl`."""
+
+    return REGISTRY.to_jsonl(path=path)
+
+
+def to_prometheus(prefix="easybo"):
+    """See :meth:`MetricsRegistry.to_prometheus`."""
+
+    return REGISTRY.to_prometheus(prefix=prefix)
+
+
+def annotate(**fields):
+    """Adds fields to the record of the innermost instrumented call in
+    progress. Does nothing if recording is disabled or no instrumented call
+    is in progress. Values should be JSON serializable scalars.
+    """
+
+    record = _CURRENT.get()
+    if record is not None:
+        record.update(fields)
+
+
+def instrument(event):
+    """Decorates a function so that every call to it is recorded in the
+    global registry under ``event``. If the first argument of the function
+    has a ``_metrics_fields`` method (as models do), the fields it returns
+    are included in the record.
+
+    Parameters
+    ----------
+    event : str
+
+    Returns
+    -------
+    callable
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return f(*args, **kwargs)
+
+            record = {"event": event, "timestamp": time()}
+            if args and hasattr(args[0], "_metrics_fields"):
+                record.update(args[0]._metrics_fields())
+
+            outermost = _CURRENT.get() is None
+            cuda = torch.cuda.is_available() and torch.cuda.is_initialized()
+            if cuda and outermost:
+                torch.cuda.reset_peak_memory_stats()
+
+            token = _CURRENT.set(record)
+            t0 = perf_counter()
+            try:
+                return f(*args, **kwargs)
+            except BaseException as err:
+                record["error"] = err.__class__.__name__
+                raise
+            finally:
+                record["wall_time"] = perf_counter() - t0
+                _CURRENT.reset(token)
+                if cuda:
+                    record["peak_cuda_memory"] = (
+                        torch.cuda.max_memory_allocated()
+                    )
+                REGISTRY.record(record)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,148 @@
+"""Parallel training of collections of independent models which cannot be
+stacked into a single :class:`easybo.gp.EasyGPBatch`, e.g. because their
+datasets have different sizes or their kernels differ. Each model is
+reconstructed from its construction keyword arguments and data in a worker
+process, trained there, and only the fitted state is sent back."""
+
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+import multiprocessing
+import os
+
+import torch
+
+from easybo.logger import logger
+
+
+def _construction_kwargs(model, device):
+    """The keyword arguments required to rebuild ``model`` from scratch on
+    its current data."""
+
+    kwargs = deepcopy(model._initial_kwargs)
+    kwargs["train_x"] = model.train_x
+    kwargs["train_y"] = model.train_y
+    kwargs["device"] = device
+    return kwargs
+
+
+def _fit_one(klass, kwargs, state_dict, threads, train_kwargs):
+    """Worker function: rebuilds a model, warm-starts it from the provided
+    hyperparameters and trains it."""
+
+    torch.set_num_threads(threads)
+
+    model = klass(**kwargs)
+    model.model.load_state_dict(state_dict, strict=False)
+    model.train_(**train_kwargs)
+
+    return {
+        "state_dict": {
+            key: value.cpu() for key, value in model.model.state_dict().items()
+        },
+        "training_state_successful": model.training_state_successful,
+        "nlpd": model.nlpd(),
+    }
+
+
+def fit_many(
+    models,
+    *,
+    workers=None,
+    threads_per_worker=None,
+    start_method="spawn",
+    train_kwargs=dict(),
+):
+    """Trains a list of independent models in parallel in a pool of worker
+    processes. Every model is trained exactly as ``model.train_()`` would,
+    warm-started from its current hyperparameters.
+
+    .. note::
+
+        Each worker limits torch to ``threads_per_worker`` threads, so that
+        the processes do not oversubscribe the available cores. The
+        ``"spawn"`` start method is used by default, since forking a process
+        after torch has started its thread pools can deadlock. As with any
+        use of ``multiprocessing``, scripts calling this function should
+        guard their entry point with ``if __name__ == "__main__":``.
+
+    Parameters
+    ----------
+    models : list of EasyGP
+        The models to train. The models themselves are left untouched.
+    workers : int, optional
+        The number of worker processes. Defaults to the smaller of the number
+        of models and the number of available cores. If 1, the models are
+        trained serially in the current process.
+    threads_per_worker : int, optional
+        The number of torch threads used by each worker. Defaults to the
+        number of available cores divided by ``workers``.
+    start_method : str, optional
+        The ``multiprocessing`` start method used for the workers.
+    train_kwargs : dict, optional
+        Keyword arguments passed to every ``train_`` call.
+
+    Returns
+    -------
+    list of dict
+        One dictionary per model, in order, with the following keys:
+        - ``"model"``: a new instance of the model, loaded with the fitted
+        state.
+        - ``"state_dict"``: the fitted state dictionary.
+        - ``"training_state_successful"``: the training state of the fit.
+        - ``"nlpd"``: the negative log predictive density of the fit.
+    """
+
+    cores = os.cpu_count() or 1
+    if workers is None:
+        workers = min(len(models), cores)
+    workers = max(1, workers)
+    if threads_per_worker is None:
+        threads_per_worker = max(1, cores // workers)
+
+    jobs = []
+    for model in models:
+        state_dict = {
+            key: value.cpu()
+            for key, value in model.model.state_dict().items()
+            if "outcome_transform" not in key and "input_transform" not in key
+        }
+        jobs.append(
+            (
+                model.__class__,
+                _construction_kwargs(model, "cpu"),
+                state_dict,
+                threads_per_worker,
+                train_kwargs,
+            )
+        )
+
+    logger.debug(
+        f"Fitting {len(models)} models on {workers} worker(s) with "
+        f"{threads_per_worker} thread(s) each"
+    )
+
+    if workers == 1:
+        # Fitting in this process: the thread count of the caller is restored
+        threads = torch.get_num_threads()
+        try:
+            results = [_fit_one(*job) for job in jobs]
+        finally:
+            torch.set_num_threads(threads)
+    else:
+        context = multiprocessing.get_context(start_method)
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            futures = [executor.submit(_fit_one, *job) for job in jobs]
+            results = [future.result() for future in futures]
+
+    for model, result in zip(models, results):
+        new_model = model.__class__(
+            **_construction_kwargs(model, model.device)
+        )
+        new_model.model.load_state_dict(result["state_dict"])
+        new_model._training_state_successful = result[
+            "training_state_successful"
+        ]
+        new_model._refit_policy = model._refit_policy
+        result["model"] = new_model
+
+    return results
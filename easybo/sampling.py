@@ -0,0 +1,488 @@
+"""Function-space samples of Gaussian Process posteriors by pathwise
+conditioning (Wilson et al., "Efficiently sampling functions from Gaussian
+process posteriors", ICML 2020).
+
+A sample of the posterior is written as a sample of the prior, approximated
+with random Fourier features, plus a data-dependent update,
+
+.. math::
+
+    f(x) = m + \\phi(x)^T w + k(x, X) (K + \\sigma^2 I)^{-1}
+    (y - m - \\Phi w - \\epsilon),
+
+where :math:`w \\sim N(0, I)` and :math:`\\epsilon \\sim N(0, \\sigma^2 I)`.
+Once drawn, the sample is a deterministic function, which can be evaluated
+at any point in O(L + N) for L features and N training points, instead of
+requiring the Cholesky factorization of a grid-sized covariance matrix.
+
+Two other scalable samplers are provided: :class:`WeightSpaceSample`, which
+approximates the whole posterior with the random Fourier features, and
+:func:`lanczos_samples`, which samples a grid jointly from a low rank root of
+the posterior covariance.
+"""
+
+from copy import deepcopy
+from math import pi, sqrt
+
+import gpytorch
+import torch
+from linear_operator.utils.cholesky import psd_safe_cholesky
+
+from easybo.linalg import lanczos_root
+from easybo.logger import logger
+from easybo.utils import _to_tensor
+
+
+def _split_kernel(kernel):
+    """Splits a kernel into its outputscale and its stationary base kernel.
+
+    Raises
+    ------
+    NotImplementedError
+        If the base kernel is neither an RBF nor a Matern kernel.
+    """
+
+    outputscale = None
+    if isinstance(kernel, gpytorch.kernels.ScaleKernel):
+        outputscale = kernel.outputscale.detach()
+        kernel = kernel.base_kernel
+
+    if not isinstance(
+        kernel, (gpytorch.kernels.RBFKernel, gpytorch.kernels.MaternKernel)
+    ):
+        msg = (
+            "Pathwise sampling requires an RBF or Matern kernel, optionally "
+            f"wrapped in a ScaleKernel, got {kernel.__class__.__name__}"
+        )
+        logger.error(msg)
+        raise NotImplementedError(msg)
+
+    return outputscale, kernel
+
+
+class RandomFourierFeatures:
+    """A random Fourier feature map ``phi`` such that ``phi(x)^T phi(x')``
+    approximates a stationary kernel ``k(x, x')``, with an error of order
+    ``1 / sqrt(num_features)``.
+
+    Parameters
+    ----------
+    kernel : gpytorch.kernels.Kernel
+        An RBF or Matern kernel, optionally wrapped in a ``ScaleKernel``.
+    d : int
+        The input dimension.
+    num_features : int
+        The number of features.
+    generator : torch.Generator, optional
+        The generator of the random frequencies and phases.
+    """
+
+    def __init__(self, kernel, d, num_features, generator=None):
+        outputscale, base_kernel = _split_kernel(kernel)
+        lengthscale = base_kernel.lengthscale.detach().reshape(-1)
+        dtype, device = lengthscale.dtype, lengthscale.device
+
+        # Samples of the spectral density of the kernel: a Gaussian for the
+        # RBF kernel, a Student's t with 2 nu degrees of freedom for Matern
+        frequencies = torch.randn(
+            d, num_features, generator=generator, dtype=dtype
+        )
+        if isinstance(base_kernel, gpytorch.kernels.MaternKernel):
+            # gpytorch only supports nu = 1/2, 3/2 and 5/2, for which the
+            # chi-squared variable is a sum of 2 nu squared normals
+            nu = base_kernel.nu
+            chi2 = torch.randn(
+                int(round(2 * nu)),
+                num_features,
+                generator=generator,
+                dtype=dtype,
+            )
+            chi2 = (chi2**2).sum(dim=0)
+            frequencies = frequencies * torch.sqrt(2.0 * nu / chi2)
+
+        phases = (
+            2.0
+            * pi
+            * torch.rand(num_features, generator=generator, dtype=dtype)
+        )
+
+        self.frequencies = frequencies.to(device) / lengthscale.unsqueeze(-1)
+        self.phases = phases.to(device)
+        self.scale = sqrt(2.0 / num_features)
+        if outputscale is not None:
+            self.scale = self.scale * outputscale.sqrt()
+
+    @property
+    def num_features(self):
+        return self.phases.shape[-1]
+
+    def __call__(self, x):
+        """Evaluates the features.
+
+        Parameters
+        ----------
+        x : torch.tensor
+            The inputs, of shape ``n x d``.
+
+        Returns
+        -------
+        torch.tensor
+            The features, of shape ``n x num_features``.
+        """
+
+        features = torch.addmm(self.phases, x, self.frequencies).cos_()
+        return features.mul_(self.scale)
+
+    def project(self, x, weights):
+        """Computes ``phi(x) @ weights`` without scaling the features, which
+        saves a pass over the ``n x num_features`` matrix.
+
+        Parameters
+        ----------
+        x : torch.tensor
+            The inputs, of shape ``n x d``.
+        weights : torch.tensor
+            The weights, of length ``num_features`` or of shape
+            ``num_features x k``.
+
+        Returns
+        -------
+        torch.tensor
+            Of length ``n``, or of shape ``n x k``.
+        """
+
+        features = torch.addmm(self.phases, x, self.frequencies).cos_()
+        return features @ (self.scale * weights)
+
+
+def _get_generator(seed=None, generator=None):
+    """A private random number generator: ``generator`` if provided,
+    otherwise a new one seeded with ``seed``, or randomly if ``seed`` is
+    None. The global generator of torch is never touched."""
+
+    if generator is not None:
+        return generator
+    generator = torch.Generator()
+    if seed is None:
+        generator.seed()
+    else:
+        generator.manual_seed(seed)
+    return generator
+
+
+def _randn(*shape, generator, like):
+    """Standard normals drawn on the CPU by ``generator`` (torch generators
+    are bound to a device), then moved to the device and dtype of ``like``.
+    """
+
+    return torch.randn(*shape, generator=generator, dtype=like.dtype).to(
+        like.device
+    )
+
+
+class _FunctionSample:
+    """Base class of samples of the posterior which are deterministic
+    functions of the inputs. Subclasses set ``_model`` and ``_train_x`` and
+    implement ``_latent``.
+    """
+
+    samples = 1
+
+    def _latent(self, x):
+        """The values of the samples at the transformed inputs ``x``, of
+        shape ``n x samples``, in the transformed units of the targets."""
+
+        raise NotImplementedError
+
+    def __call__(
+        self, x, chunk_size=4096, observation_noise=False, generator=None
+    ):
+        """Evaluates the sample(s).
+
+        Parameters
+        ----------
+        x : array_like or torch.tensor
+            The inputs, of shape ``n x d``, in the units of the training
+            inputs of the model.
+        chunk_size : int, optional
+            The number of inputs evaluated at once, which bounds the memory
+            used by the intermediate ``chunk_size x num_features`` (and
+            ``chunk_size x N``) matrices.
+        observation_noise : bool, optional
+            If True, independent Gaussian observation noise is added to every
+            value, which is then a sample of the posterior predictive
+            distribution rather than of the latent function.
+        generator : torch.Generator, optional
+            The generator of the observation noise.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values of the sample(s), of shape ``n x samples``, in the
+            units of the training targets.
+        """
+
+        model = self._model
+        x = _to_tensor(
+            x, device=self._train_x.device, dtype=self._train_x.dtype
+        )
+        if observation_noise:
+            generator = _get_generator(generator=generator)
+            noise_std = model.likelihood.noise.detach().sqrt()
+        values = []
+        with torch.no_grad():
+            for chunk in x.split(chunk_size):
+                f = self._latent(model.transform_inputs(chunk))
+                if observation_noise:
+                    f = f + noise_std * _randn(
+                        *f.shape, generator=generator, like=f
+                    )
+                if hasattr(model, "outcome_transform"):
+                    f, _ = model.outcome_transform.untransform(f.unsqueeze(-1))
+                    f = f.squeeze(-1)
+                values.append(f.cpu())
+        return torch.cat(values).numpy()
+
+
+class PathwiseSample(_FunctionSample):
+    """Samples of the posterior of an exact Gaussian Process, drawn by
+    pathwise conditioning. Calling the sample evaluates the same function(s)
+    at any points, in O(num_features + N) per point and sample.
+
+    The sample keeps a copy of the model, so that it is not affected by
+    later training or conditioning of the model.
+
+    Parameters
+    ----------
+    model : botorch.models.SingleTaskGP
+        The model, with a homoskedastic Gaussian likelihood and an RBF or
+        Matern kernel.
+    factor : easybo.linalg.InverseCholesky
+        The factorization of ``K(X, X) + sigma^2 I`` for the transformed
+        training inputs of ``model``.
+    num_features : int, optional
+        The number of random Fourier features approximating the prior.
+    seed : int, optional
+        Seeds a private random number generator, so that the global one is
+        left untouched. Ignored if ``generator`` is provided.
+    samples : int, optional
+        The number of independent samples drawn at once, which share the
+        same features.
+    generator : torch.Generator, optional
+        The random number generator.
+    """
+
+    def __init__(
+        self,
+        model,
+        factor,
+        num_features=1024,
+        seed=None,
+        samples=1,
+        generator=None,
+    ):
+        model = deepcopy(model)
+        model.eval()
+        train_x = model.train_inputs[0]
+        generator = _get_generator(seed, generator)
+
+        self._model = model
+        self._features = RandomFourierFeatures(
+            model.covar_module,
+            train_x.shape[-1],
+            num_features,
+            generator=generator,
+        )
+        self._train_x = train_x.detach()
+        self.samples = samples
+
+        with torch.no_grad():
+            weights = _randn(
+                num_features, samples, generator=generator, like=train_x
+            )
+            noise = _randn(
+                train_x.shape[0], samples, generator=generator, like=train_x
+            )
+            noise = noise * model.likelihood.noise.detach().sqrt()
+            mean = model.mean_module(train_x).unsqueeze(-1)
+            prior = self._features.project(train_x, weights)
+            residuals = model.train_targets.unsqueeze(-1) - mean
+            self._weights = weights
+            self._update = factor.solve(residuals - prior - noise)
+
+    @property
+    def num_features(self):
+        return self._features.num_features
+
+    def _latent(self, x):
+        model = self._model
+        prior = self._features.project(x, self._weights)
+        cross = model.covar_module(x, self._train_x).to_dense()
+        mean = model.mean_module(x).unsqueeze(-1)
+        return torch.addmm(mean + prior, cross, self._update)
+
+
+class WeightSpaceSample(_FunctionSample):
+    """Samples of the posterior of an exact Gaussian Process, approximated
+    by Bayesian linear regression on random Fourier features ("weight-space"
+    sampling). The posterior of the weights is computed once, in
+    O(N num_features^2 + num_features^3), after which evaluating the samples
+    costs O(num_features) per point and sample, independently of N.
+
+    Unlike :class:`PathwiseSample`, the whole posterior is approximated by
+    the features, so that the variance of the samples tends to be
+    underestimated far from the data when ``num_features`` is small
+    compared to N.
+
+    Parameters
+    ----------
+    model : botorch.models.SingleTaskGP
+        The model, with a homoskedastic Gaussian likelihood and an RBF or
+        Matern kernel.
+    num_features : int, optional
+        The number of random Fourier features.
+    seed : int, optional
+        Seeds a private random number generator. Ignored if ``generator`` is
+        provided.
+    samples : int, optional
+        The number of independent samples drawn at once.
+    generator : torch.Generator, optional
+        The random number generator.
+    """
+
+    def __init__(
+        self, model, num_features=1024, seed=None, samples=1, generator=None
+    ):
+        model = deepcopy(model)
+        model.eval()
+        train_x = model.train_inputs[0]
+        generator = _get_generator(seed, generator)
+
+        self._model = model
+        self._features = RandomFourierFeatures(
+            model.covar_module,
+            train_x.shape[-1],
+            num_features,
+            generator=generator,
+        )
+        self._train_x = train_x.detach()
+        self.samples = samples
+
+        with torch.no_grad():
+            # The posterior of the weights is N(A^{-1} Phi^T r, s^2 A^{-1})
+            # with A = Phi^T Phi + s^2 I and r the centered targets
+            noise = model.likelihood.noise.detach().reshape(())
+            features = self._features(train_x)
+            residuals = model.train_targets - model.mean_module(train_x)
+            A = features.T @ features
+            A.diagonal().add_(noise)
+            L = psd_safe_cholesky(A)
+            mean = torch.cholesky_solve(
+                (features.T @ residuals).unsqueeze(-1), L
+            )
+            z = _randn(num_features, samples, generator=generator, like=L)
+            z = torch.linalg.solve_triangular(L.T, z, upper=True)
+            self._weights = mean + noise.sqrt() * z
+
+    @property
+    def num_features(self):
+        return self._features.num_features
+
+    def _latent(self, x):
+        prior = self._features(x) @ self._weights
+        return prior + self._model.mean_module(x).unsqueeze(-1)
+
+
+def lanczos_samples(
+    model,
+    factor,
+    alpha,
+    x,
+    samples=1,
+    *,
+    rank=128,
+    chunk_size=4096,
+    observation_noise=False,
+    generator=None,
+):
+    """Jointly samples the posterior of an exact Gaussian Process at the
+    inputs ``x`` from a low rank root of the posterior covariance, computed
+    by :func:`easybo.linalg.lanczos_root`. The G x G covariance is never
+    formed: its products with vectors are computed in chunks of
+    ``chunk_size`` rows, so that the memory is O(G (rank + samples +
+    chunk_size)) instead of O(G^2), and the time O(rank G^2) instead of
+    O(G^3).
+
+    Parameters
+    ----------
+    model : botorch.models.SingleTaskGP
+        The model, with a homoskedastic Gaussian likelihood.
+    factor : easybo.linalg.InverseCholesky
+        The factorization of ``K(X, X) + sigma^2 I`` for the transformed
+        training inputs of ``model``.
+    alpha : torch.tensor
+        ``(K(X, X) + sigma^2 I)^{-1} (y - m(X))``.
+    x : array_like or torch.tensor
+        The inputs, of shape ``G x d``, in the units of the training inputs.
+    samples : int, optional
+        The number of samples.
+    rank : int, optional
+        The maximum rank of the root of the posterior covariance.
+    chunk_size : int, optional
+        The number of rows of the covariance computed at once.
+    observation_noise : bool, optional
+        Whether to add independent Gaussian observation noise to the samples.
+    generator : torch.Generator, optional
+        The random number generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        The samples, of shape ``G x samples``, in the units of the training
+        targets.
+    """
+
+    model.eval()
+    train_x = model.train_inputs[0].detach()
+    generator = _get_generator(generator=generator)
+    kernel = model.covar_module
+    x = _to_tensor(x, device=train_x.device, dtype=train_x.dtype)
+
+    with torch.no_grad():
+        x = model.transform_inputs(x)
+        chunks = x.split(chunk_size)
+
+        def matmul(v):
+            # K(x, x) v - K(x, X) (K(X, X) + sigma^2 I)^{-1} K(X, x) v
+            prior = []
+            cross_v = v.new_zeros(train_x.shape[0], v.shape[-1])
+            for chunk, v_chunk in zip(chunks, v.split(chunk_size)):
+                prior.append(kernel(chunk, x).to_dense() @ v)
+                cross_v += kernel(train_x, chunk).to_dense() @ v_chunk
+            update = factor.solve(cross_v)
+            return torch.cat(
+                [
+                    p - kernel(chunk, train_x).to_dense() @ update
+                    for p, chunk in zip(prior, chunks)
+                ]
+            )
+
+        root = lanczos_root(
+            matmul, x.shape[0], rank, like=x, generator=generator
+        )
+        mean = torch.cat(
+            [
+                model.mean_module(chunk)
+                + kernel(chunk, train_x).to_dense() @ alpha
+                for chunk in chunks
+            ]
+        )
+        z = _randn(root.shape[-1], samples, generator=generator, like=root)
+        f = torch.addmm(mean.unsqueeze(-1), root, z)
+        if observation_noise:
+            noise_std = model.likelihood.noise.detach().sqrt()
+            f += noise_std * _randn(*f.shape, generator=generator, like=f)
+        if hasattr(model, "outcome_transform"):
+            f, _ = model.outcome_transform.untransform(f.unsqueeze(-1))
+            f = f.squeeze(-1)
+    return f.cpu().numpy()
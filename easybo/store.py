@@ -0,0 +1,317 @@
+"""An append-only, memory-mapped store of observations, which keeps the
+history of a campaign on disk and can back an :class:`easybo.gp.EasyGP`
+(see :meth:`easybo.gp.EasyGP.attach_store`).
+
+A store is a directory holding:
+
+- ``store.json``, the header (format version, dimensions and dtype).
+- ``x.bin``, ``y.bin`` and ``t.bin``, the inputs, targets and timestamps of
+  the observations, as raw row-major arrays which are memory-mapped. Their
+  capacity doubles whenever it is exceeded, so that appending ``k``
+  observations costs amortized O(k).
+- ``log.jsonl``, the commit log, with one line per call to
+  :meth:`ObservationStore.append`, holding the number of observations and
+  their metadata.
+
+The rows are written before their line of the log, and only rows covered by
+the log are considered committed. After a crash, opening the store replays
+the log, discarding a partially written last line and any row it does not
+cover.
+"""
+
+import json
+import os
+from threading import Lock
+from time import time
+
+import numpy as np
+
+from easybo.logger import logger
+
+
+_STORE_FORMAT = "easybo.store"
+_STORE_VERSION = 1
+
+
+class ObservationStore:
+    """An append-only, memory-mapped store of observations.
+
+    .. code-block:: python
+
+        store = ObservationStore("campaign", d=2)
+        store.append(x, y, metadata=[{"sample": "A"}])
+        store.x  # read-only view of every input so far
+
+    Parameters
+    ----------
+    path : os.PathLike
+        The directory of the store. It is created if it does not exist, in
+        which case ``d`` is required. Otherwise the existing store is opened.
+    d : int, optional
+        The input dimension.
+    m : int, optional
+        The number of targets.
+    dtype : str, optional
+        The dtype of the inputs and targets.
+    capacity : int, optional
+        The initial number of rows allocated on disk.
+    durable : bool, optional
+        If True, every append is flushed to disk (``msync`` and ``fsync``)
+        before returning, so that it survives a power loss and not only a
+        crash of the process.
+
+    Raises
+    ------
+    ValueError
+        If the directory holds a store of another format or version, or with
+        other dimensions than ``d`` and ``m``.
+    """
+
+    def __init__(
+        self,
+        path,
+        *,
+        d=None,
+        m=1,
+        dtype="float64",
+        capacity=1024,
+        durable=False,
+    ):
+        self._path = os.fspath(path)
+        self._durable = durable
+        self._lock = Lock()
+        header_path = os.path.join(self._path, "store.json")
+
+        if os.path.exists(header_path):
+            with open(header_path) as f:
+                header = json.load(f)
+            if (
+                header.get("format") != _STORE_FORMAT
+                or header.get("version", 0) > _STORE_VERSION
+            ):
+                msg = f"{self._path} is not a supported observation store"
+                logger.error(msg)
+                raise ValueError(msg)
+            if d is not None and (d, m) != (header["d"], header["m"]):
+                msg = (
+                    f"{self._path} stores observations of shape "
+                    f"({header['d']}, {header['m']}), not ({d}, {m})"
+                )
+                logger.error(msg)
+                raise ValueError(msg)
+        else:
+            if d is None:
+                msg = f"d is required to create a new store at {self._path}"
+                logger.error(msg)
+                raise ValueError(msg)
+            os.makedirs(self._path, exist_ok=True)
+            header = dict(
+                format=_STORE_FORMAT, version=_STORE_VERSION, d=d, m=m
+            )
+            header["dtype"] = np.dtype(dtype).name
+            with open(header_path, "w") as f:
+                json.dump(header, f)
+
+        self._d, self._m = header["d"], header["m"]
+        self._dtype = np.dtype(header["dtype"])
+        self._n, self._metadata = self._replay()
+        self._log = open(self._log_path, "a")
+        self._capacity = 0
+        self._arrays = dict()
+        self._reserve(max(capacity, self._n, 1))
+
+    @property
+    def _log_path(self):
+        return os.path.join(self._path, "log.jsonl")
+
+    def _replay(self):
+        """Reads the commit log. A partially written last line, left by a
+        crash, is truncated away.
+
+        Returns
+        -------
+        int, list
+            The number of committed observations and their metadata.
+        """
+
+        n, metadata, valid = 0, [], 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    n += entry["n"]
+                    metadata += entry["metadata"] or [None] * entry["n"]
+                    valid += len(line)
+            if valid < os.path.getsize(self._log_path):
+                logger.warning(
+                    f"Discarding a partially written entry of {self._log_path}"
+                )
+                os.truncate(self._log_path, valid)
+        return n, metadata
+
+    def _reserve(self, capacity):
+        """Grows the files and their memory maps to hold at least
+        ``capacity`` rows. Views handed out before keep referencing the old
+        maps, whose committed rows never change."""
+
+        if capacity <= self._capacity:
+            return
+        capacity = max(capacity, 2 * self._capacity)
+        for name, width, dtype in [
+            ("x", self._d, self._dtype),
+            ("y", self._m, self._dtype),
+            ("t", 1, np.dtype("float64")),
+        ]:
+            filename = os.path.join(self._path, f"{name}.bin")
+            size = capacity * width * dtype.itemsize
+            with open(filename, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self._arrays[name] = np.memmap(
+                filename, dtype=dtype, mode="r+", shape=(capacity, width)
+            )
+        self._capacity = capacity
+
+    def _view(self, name):
+        view = self._arrays[name][: self._n].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def __len__(self):
+        return self._n
+
+    def __deepcopy__(self, memo):
+        # A store is a shared resource: copies of a model share it
+        return self
+
+    @property
+    def path(self):
+        """The directory of the store.
+
+        Returns
+        -------
+        str
+        """
+
+        return self._path
+
+    @property
+    def x(self):
+        """A read-only view of the inputs, of shape ``N x d``.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+
+        return self._view("x")
+
+    @property
+    def y(self):
+        """A read-only view of the targets, of shape ``N x m``.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+
+        return self._view("y")
+
+    @property
+    def timestamps(self):
+        """A read-only view of the unix times at which the observations
+        were appended, of length ``N``.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+
+        return self._view("t")[:, 0]
+
+    @property
+    def metadata(self):
+        """The metadata of every observation (None if not provided).
+
+        Returns
+        -------
+        list
+        """
+
+        return list(self._metadata)
+
+    def append(self, x, y, *, metadata=None, timestamp=None):
+        """Appends observations, in amortized O(k) for k observations.
+
+        Parameters
+        ----------
+        x : array_like
+            The inputs, of shape ``k x d``.
+        y : array_like
+            The targets, of shape ``k x m``.
+        metadata : list, optional
+            JSON serializable metadata, one per observation.
+        timestamp : float, optional
+            The unix time of the observations. Defaults to now.
+
+        Returns
+        -------
+        slice
+            The rows of the new observations.
+        """
+
+        x = np.asarray(x, dtype=self._dtype).reshape(-1, self._d)
+        y = np.asarray(y, dtype=self._dtype).reshape(-1, self._m)
+        k = len(x)
+        if len(y) != k or (metadata is not None and len(metadata) != k):
+            msg = (
+                f"Got {k} inputs, {len(y)} targets and "
+                f"{len(metadata) if metadata is not None else k} metadata"
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+        line = json.dumps({"n": k, "metadata": metadata}) + "\n"
+        if timestamp is None:
+            timestamp = time()
+
+        with self._lock:
+            start = self._n
+            self._reserve(start + k)
+            rows = slice(start, start + k)
+            self._arrays["x"][rows] = x
+            self._arrays["y"][rows] = y
+            self._arrays["t"][rows] = timestamp
+            if self._durable:
+                for array in self._arrays.values():
+                    array.flush()
+
+            # Committing: the rows only count once their line is written
+            self._log.write(line)
+            self._log.flush()
+            if self._durable:
+                os.fsync(self._log.fileno())
+            self._metadata += metadata or [None] * k
+            self._n += k
+
+        return rows
+
+    def flush(self):
+        """Writes every observation to disk."""
+
+        with self._lock:
+            for array in self._arrays.values():
+                array.flush()
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def close(self):
+        """Flushes and closes the store. Views handed out before remain
+        valid."""
+
+        self.flush()
+        self._log.close()
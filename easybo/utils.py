@@ -1,4 +1,5 @@
 from time import perf_counter
+from warnings import catch_warnings, simplefilter
 
 import numpy as np
 import torch
@@ -8,13 +9,20 @@ DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
 class Timer:
+    """Context manager timing the wall time of its body. :meth:`dt` and
+    :meth:`units` are meant for display, with units switching between ms, s
+    and m, while :meth:`seconds` is the raw duration."""
+
     def __enter__(self):
-        self._time = perf_counter()
+        self._start = perf_counter()
+        self._seconds = None
+        self._time = None
         self._units = "s"
         return self
 
     def __exit__(self, type, value, traceback):
-        self._time = perf_counter() - self._time
+        self._seconds = perf_counter() - self._start
+        self._time = self._seconds
         if self._time > 60.0:
             self._time = self._time / 60.0
             self._units = "m"
@@ -22,6 +30,10 @@ class Timer:
             self._time = self._time * 1000.0
             self._units = "ms"
 
+    @property
+    def seconds(self):
+        return self._seconds
+
     @property
     def dt(self):
         return self._time
@@ -31,30 +43,137 @@ class Timer:
         return self._units
 
 
-def _to_float32_tensor(x, device=DEVICE):
+# The dtype in which models of each precision are stored and trained. In
+# "mixed" precision, predictions are made in float32 (see
+# get_prediction_dtype)
+PRECISIONS = {
+    "float32": torch.float32,
+    "float64": torch.float64,
+    "mixed": torch.float64,
+}
 
-    if x is None:
-        return None
+_PRECISION = "float64"
 
-    if isinstance(x, np.ndarray):
-        x = torch.tensor(x.copy()).double()
 
-    x = x.clone().double()
-    x = x.to(device)
-    return x
+def _validate_precision(precision):
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unknown precision {precision}, choose from {list(PRECISIONS)}"
+        )
+    return precision
 
 
-def _to_long_tensor(x, device=DEVICE):
+def set_precision(precision):
+    """Sets the global floating point precision policy. This determines the
+    dtype of every model constructed afterwards, of the tensors passed to
+    them, and of the tensors used by :func:`easybo.bo.ask`. The default is
+    ``"float64"``.
+
+    Parameters
+    ----------
+    precision : str
+        One of ``"float32"``, ``"float64"`` or ``"mixed"``.
+    """
+
+    global _PRECISION
+    _PRECISION = _validate_precision(precision)
+
+
+def get_precision():
+    """The current global floating point precision policy.
+
+    Returns
+    -------
+    str
+    """
+
+    return _PRECISION
+
+
+def get_dtype(precision=None):
+    """The torch dtype in which models are stored and trained for a given
+    precision. This is float64 for both ``"float64"`` and ``"mixed"``.
+
+    Parameters
+    ----------
+    precision : str, optional
+        If None, uses the global precision policy.
+
+    Returns
+    -------
+    torch.dtype
+    """
+
+    return PRECISIONS[_PRECISION if precision is None else precision]
+
+
+def get_prediction_dtype(precision=None):
+    """The torch dtype in which predictions on a grid are made for a given
+    precision. This is float32 for both ``"float32"`` and ``"mixed"``.
+
+    Parameters
+    ----------
+    precision : str, optional
+        If None, uses the global precision policy.
+
+    Returns
+    -------
+    torch.dtype
+    """
+
+    precision = _PRECISION if precision is None else precision
+    return torch.float64 if precision == "float64" else torch.float32
+
+
+def _to_tensor(x, device=DEVICE, dtype=None, copy=False):
+    """Converts array_like data to a tensor of the requested dtype on the
+    requested device. NumPy arrays and tensors which already have the correct
+    dtype and device are wrapped without copying, so the result may share
+    memory with ``x``.
+
+    Parameters
+    ----------
+    x : array_like
+    device : str or torch.device, optional
+    dtype : torch.dtype, optional
+        If None, uses the global precision policy (see :func:`get_dtype`).
+    copy : bool, optional
+        If True, the result never shares memory with ``x``.
+
+    Returns
+    -------
+    torch.tensor
+    """
 
     if x is None:
         return None
 
+    if dtype is None:
+        dtype = get_dtype()
+
+    if isinstance(x, torch.Tensor):
+        return x.to(device=device, dtype=dtype, copy=copy)
+
+    if copy:
+        return torch.tensor(np.asarray(x), dtype=dtype, device=device)
+
     if isinstance(x, np.ndarray):
-        x = torch.tensor(x.copy()).long()
+        # torch cannot wrap arrays with negative strides
+        if any(stride < 0 for stride in x.strides):
+            x = np.ascontiguousarray(x)
+
+        # Read-only arrays (e.g. memmaps or cached predictions) can be wrapped
+        # safely since we never write to them, but torch warns about it
+        if not x.flags.writeable:
+            with catch_warnings():
+                simplefilter("ignore", category=UserWarning)
+                return torch.as_tensor(x, dtype=dtype, device=device)
 
-    x = x.clone().long()
-    x = x.to(device)
-    return x
+    return torch.as_tensor(x, dtype=dtype, device=device)
+
+
+def _to_long_tensor(x, device=DEVICE):
+    return _to_tensor(x, device=device, dtype=torch.long)
 
 
 def grids_to_coordinates(grids):